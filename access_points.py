@@ -0,0 +1,243 @@
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+
+class AccessPoint:
+    """
+    A Wi-Fi network cameras join, and the streams placed on it.
+    """
+    def __init__(self, ssid: str, password: str, capacity_kbps: Optional[int] = None):
+        """
+        Initialize an access point.
+
+        :param ssid: The SSID of the network.
+        :param password: The password of the network.
+        :param capacity_kbps: The aggregate bitrate the access point can carry, or None for no limit.
+        """
+        self.ssid = ssid
+        self.password = password
+        self.capacity_kbps = capacity_kbps
+        # Planned bitrate of every camera placed here, in kbps
+        self.cameras: Dict[str, int] = {}
+
+    @property
+    def load(self) -> int:
+        """
+        Get the aggregate planned bitrate of the cameras on the access point.
+
+        :return: The bitrate in kbps.
+        """
+        return sum(self.cameras.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get a JSON serializable summary of the access point, without its password.
+
+        :return: The summary dictionary.
+        """
+        return {'ssid': self.ssid, 'capacity_kbps': self.capacity_kbps, 'load_kbps': self.load, 'cameras': sorted(self.cameras)}
+
+
+class AccessPointPlan:
+    """
+    Spread cameras across several Wi-Fi access points by aggregate bitrate.
+
+    Wi-Fi airtime, not the uplink, limits how many streams one access point carries, so
+    each camera goes to the access point whose planned bitrate is the smallest fraction
+    of its capacity, largest streams first. Cameras pinned to an access point always join
+    it. Placements are sticky: a camera only moves when joining its access point fails,
+    or when its feed keeps dropping there, and then avoids that access point until every
+    other one failed it too.
+    """
+    def __init__(self, log_callback, access_points: List[AccessPoint], pinned: Optional[Dict[str, str]] = None,
+                 max_drops: int = 3, drop_window: float = 600.0):
+        """
+        Initialize the plan.
+
+        :param log_callback: A callback function for logging messages.
+        :param access_points: The access points, in order of preference.
+        :param pinned: The SSID each pinned camera must join, keyed by stream name.
+        :param max_drops: How many feed drops within drop_window move a camera to another access point.
+        :param drop_window: Seconds over which feed drops are counted.
+        """
+        self.log = log_callback
+        self.access_points = access_points
+        self.pinned = pinned or {}
+        self.max_drops = max_drops
+        self.drop_window = drop_window
+        self.placement: Dict[str, AccessPoint] = {}
+        self._avoid: Dict[str, Set[str]] = {}
+        self._drops: Dict[str, Deque[float]] = {}
+
+    @classmethod
+    def from_config(cls, log_callback, config: Dict[str, Any]) -> "AccessPointPlan":
+        """
+        Build a plan from a saved configuration.
+
+        The "access_points" list holds dictionaries with "ssid", "password" and optional
+        "capacity_kbps". Without it every camera joins "ssid". A camera entry with an
+        "access_point" SSID is pinned to it.
+
+        :param log_callback: A callback function for logging messages.
+        :param config: The configuration, as saved by the GUI.
+        :return: The plan.
+        """
+        access_points = []
+        for entry in config.get('access_points') or [{'ssid': config['ssid'], 'password': config['password']}]:
+            capacity = entry.get('capacity_kbps')
+            access_points.append(AccessPoint(entry['ssid'], entry.get('password', ''), int(capacity) if capacity else None))
+        ssids = {access_point.ssid for access_point in access_points}
+        pinned = {}
+        for gopro in config.get('gopros', []):
+            if gopro.get('access_point') in ssids:
+                pinned[gopro['name']] = gopro['access_point']
+            elif gopro.get('access_point'):
+                log_callback(f"{gopro['target']}: Access point {gopro['access_point']} is not configured, placing it automatically")
+        return cls(log_callback, access_points, pinned, config.get('ap_max_drops', 3), config.get('ap_drop_window', 600.0))
+
+    def ssid(self, name: str) -> Optional[str]:
+        """
+        Get the access point a camera is placed on.
+
+        :param name: The name of the stream.
+        :return: The SSID, or None if the camera is not placed.
+        """
+        access_point = self.placement.get(name)
+        return access_point.ssid if access_point is not None else None
+
+    def credentials(self, name: str, kbps: Optional[int] = None) -> Tuple[str, str]:
+        """
+        Get the network a camera should join, placing it if needed.
+
+        :param name: The name of the stream.
+        :param kbps: The camera's planned bitrate, used if it has to be placed.
+        :return: The SSID and password.
+        """
+        access_point = self.placement.get(name)
+        if access_point is None:
+            access_point = self._put(name, kbps or self._typical())
+        elif kbps is not None:
+            access_point.cameras[name] = kbps
+        return access_point.ssid, access_point.password
+
+    def place(self, demand: Dict[str, int]) -> Dict[str, str]:
+        """
+        Place cameras, keeping placed cameras where they are and updating their planned bitrate.
+
+        :param demand: The planned bitrate of every camera in kbps, keyed by stream name.
+        :return: The SSID of every placed camera.
+        """
+        for name in sorted(demand, key=lambda name: (name not in self.pinned, -demand[name])):
+            access_point = self.placement.get(name)
+            if access_point is not None:
+                access_point.cameras[name] = demand[name]
+            else:
+                self._put(name, demand[name])
+        for access_point in self.access_points:
+            if access_point.capacity_kbps and access_point.load > access_point.capacity_kbps:
+                self.log(f"Access point {access_point.ssid} is planned over capacity: {access_point.load}/{access_point.capacity_kbps} kbps")
+        return {name: access_point.ssid for name, access_point in self.placement.items()}
+
+    def restore(self, placement: Dict[str, str]) -> None:
+        """
+        Keep cameras on the access points they were placed on before, e.g. by a plan for an older configuration.
+
+        :param placement: The SSID of every camera, SSIDs that are not in this plan and changed pins are ignored.
+        :return: None
+        """
+        access_points = {access_point.ssid: access_point for access_point in self.access_points}
+        for name, ssid in placement.items():
+            access_point = access_points.get(ssid)
+            if access_point is not None and self.pinned.get(name, ssid) == ssid:
+                self.release(name)
+                access_point.cameras[name] = 0
+                self.placement[name] = access_point
+
+    def release(self, name: str) -> None:
+        """
+        Forget the placement of a camera.
+
+        :param name: The name of the stream.
+        :return: None
+        """
+        access_point = self.placement.pop(name, None)
+        if access_point is not None:
+            access_point.cameras.pop(name, None)
+
+    def move(self, name: str, reason: str) -> Optional[str]:
+        """
+        Move a camera off its access point, e.g. because joining it failed.
+
+        :param name: The name of the stream.
+        :param reason: Why the camera moves, for the log.
+        :return: The new SSID, or None if the camera is pinned or there is nowhere else to go.
+        """
+        current = self.placement.get(name)
+        if current is None or len(self.access_points) == 1:
+            return None
+        if name in self.pinned:
+            self.log(f"{name}: {reason} on {current.ssid}, staying there because it is pinned")
+            return None
+        avoid = self._avoid.setdefault(name, set())
+        avoid.add(current.ssid)
+        if len(avoid) >= len(self.access_points):
+            # Every access point failed this camera, cycle through the others again
+            avoid.clear()
+            avoid.add(current.ssid)
+        kbps = current.cameras.get(name) or self._typical()
+        self.release(name)
+        self._drops.pop(name, None)
+        access_point = self._put(name, kbps)
+        self.log(f"{name}: {reason} on {current.ssid}, moving to {access_point.ssid}")
+        return access_point.ssid
+
+    def record_drop(self, name: str) -> Optional[str]:
+        """
+        Count a feed drop, moving the camera once its feed keeps dropping on the same access point.
+
+        :param name: The name of the stream.
+        :return: The new SSID if the camera moved, otherwise None.
+        """
+        now = time.monotonic()
+        drops = self._drops.setdefault(name, deque())
+        drops.append(now)
+        while drops and drops[0] < now - self.drop_window:
+            drops.popleft()
+        if len(drops) < self.max_drops:
+            return None
+        return self.move(name, f"Feed dropped {len(drops)} times in {self.drop_window / 60:.0f} minutes")
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get a JSON serializable summary of every access point.
+
+        :return: A list of access point summaries, in configured order.
+        """
+        return [access_point.to_dict() for access_point in self.access_points]
+
+    def _typical(self) -> int:
+        loads = [kbps for access_point in self.access_points for kbps in access_point.cameras.values() if kbps]
+        return sum(loads) // len(loads) if loads else 1
+
+    def _put(self, name: str, kbps: int) -> AccessPoint:
+        access_point = self._pick(name, kbps)
+        access_point.cameras[name] = kbps
+        self.placement[name] = access_point
+        return access_point
+
+    def _pick(self, name: str, kbps: int) -> AccessPoint:
+        pinned = self.pinned.get(name)
+        if pinned is not None:
+            return next(access_point for access_point in self.access_points if access_point.ssid == pinned)
+        avoid = self._avoid.get(name, set())
+        candidates = [access_point for access_point in self.access_points if access_point.ssid not in avoid] or self.access_points
+        # Access points without a capacity are weighted like the average configured one
+        capacities = [access_point.capacity_kbps for access_point in candidates if access_point.capacity_kbps]
+        weight = sum(capacities) / len(capacities) if capacities else 1
+
+        def fill(access_point: AccessPoint) -> float:
+            return (access_point.load + kbps) / (access_point.capacity_kbps or weight)
+
+        # min() keeps the first access point on ties, so configured order breaks them
+        return min(candidates, key=fill)
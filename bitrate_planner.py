@@ -0,0 +1,252 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set
+from open_gopro import proto
+from setup_state import CameraSetup, SetupState
+
+# Limits accepted by set_livestream_mode, in kbps
+MIN_BITRATE = 800
+MAX_BITRATE = 8000
+
+# Fraction of the uplink budget the streams may use
+HEADROOM = 0.8
+
+RESOLUTIONS = {
+    "480": proto.EnumWindowSize.WINDOW_SIZE_480,
+    "720": proto.EnumWindowSize.WINDOW_SIZE_720,
+    "1080": proto.EnumWindowSize.WINDOW_SIZE_1080,
+}
+
+LENSES = {
+    "wide": proto.EnumLens.LENS_WIDE,
+    "linear": proto.EnumLens.LENS_LINEAR,
+    "superview": proto.EnumLens.LENS_SUPERVIEW,
+}
+
+
+class BitrateProfile(NamedTuple):
+    """
+    Livestream settings for one camera.
+    """
+    minimum: int = MIN_BITRATE
+    maximum: int = MAX_BITRATE
+    starting: int = 5000
+    resolution: Optional[str] = None
+    fov: Optional[str] = None
+
+    @property
+    def window_size(self) -> Optional[int]:
+        """
+        Get the resolution as a proto.EnumWindowSize value.
+
+        :return: The window size, or None to use the camera default.
+        """
+        return RESOLUTIONS[self.resolution] if self.resolution else None
+
+    @property
+    def lens(self) -> Optional[int]:
+        """
+        Get the field of view as a proto.EnumLens value.
+
+        :return: The lens, or None to use the camera default.
+        """
+        return LENSES[self.fov] if self.fov else None
+
+
+# The profile sent before bitrate planning existed, used when no uplink budget is configured
+DEFAULT_PROFILE = BitrateProfile()
+
+
+def _clamp(value: float, low: int = MIN_BITRATE, high: int = MAX_BITRATE) -> int:
+    return int(max(low, min(high, value)))
+
+
+def check_settings(name: str, resolution: Optional[str], fov: Optional[str]) -> None:
+    """
+    Check the resolution and field of view configured for a camera.
+
+    :param name: The name of the camera, used in the error message.
+    :param resolution: A key of RESOLUTIONS, "auto" or None.
+    :param fov: A key of LENSES or None.
+    :return: None
+    :raises ValueError: If either value is not supported.
+    """
+    if resolution and resolution != "auto" and resolution not in RESOLUTIONS:
+        raise ValueError(f"{name}: Unsupported resolution {resolution!r}, use one of {', '.join(RESOLUTIONS)} or auto")
+    if fov and fov not in LENSES:
+        raise ValueError(f"{name}: Unsupported field of view {fov!r}, use one of {', '.join(LENSES)}")
+
+
+def auto_resolution(share: int) -> str:
+    """
+    Pick the highest resolution that streams well within a per-camera bitrate share.
+
+    :param share: The per-camera bitrate budget in kbps.
+    :return: A key of RESOLUTIONS.
+    """
+    if share >= 4000:
+        return "1080"
+    if share >= 2000:
+        return "720"
+    return "480"
+
+
+def plan_bitrates(names: List[str], uplink_kbps: Optional[int] = None, overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                  resolution: Optional[str] = None, fov: Optional[str] = None, headroom: float = HEADROOM) -> Dict[str, BitrateProfile]:
+    """
+    Split an uplink budget between cameras sharing an access point.
+
+    Cameras with an override keep their configured values and the rest of the budget is
+    shared evenly between the others. Each camera starts at three quarters of its share so
+    the aggregate starting bitrate leaves room for the cameras to ramp up.
+
+    :param names: The stream names of the cameras sharing the uplink.
+    :param uplink_kbps: The uplink budget in kbps, or None to use DEFAULT_PROFILE for every camera.
+    :param overrides: Optional per-camera settings keyed by stream name, with "min", "max", "start", "resolution" and "fov" keys.
+    :param resolution: Default resolution, a key of RESOLUTIONS or "auto" to pick one from the bitrate share.
+    :param fov: Default field of view, a key of LENSES.
+    :param headroom: Fraction of the uplink budget the streams may use.
+    :return: A profile per stream name.
+    :raises ValueError: If a camera has an unsupported resolution or field of view.
+    """
+    overrides = overrides or {}
+    planned = [name for name in names if not {"min", "max", "start"} & set(overrides.get(name, {}))]
+    if uplink_kbps:
+        reserved = sum(_clamp(overrides[name].get("max", MAX_BITRATE)) for name in names if name not in planned)
+        share = (uplink_kbps * headroom - reserved) / max(1, len(planned))
+    else:
+        share = None
+
+    profiles = {}
+    for name in names:
+        override = overrides.get(name, {})
+        if share is None:
+            base = DEFAULT_PROFILE
+        else:
+            maximum = _clamp(share)
+            base = BitrateProfile(MIN_BITRATE, maximum, _clamp(share * 0.75, high=maximum))
+        maximum = _clamp(override.get("max", base.maximum))
+        minimum = _clamp(override.get("min", base.minimum), high=maximum)
+        starting = _clamp(override.get("start", base.starting), low=minimum, high=maximum)
+        camera_resolution = override.get("resolution", resolution)
+        check_settings(name, camera_resolution, override.get("fov", fov))
+        if camera_resolution == "auto":
+            camera_resolution = auto_resolution(maximum)
+        profiles[name] = BitrateProfile(minimum, maximum, starting, camera_resolution, override.get("fov", fov))
+    return profiles
+
+
+def over_budget(profiles: Dict[str, BitrateProfile], uplink_kbps: int, headroom: float = HEADROOM) -> int:
+    """
+    Get how far the planned maximum bitrates exceed the uplink budget.
+
+    A plan goes over budget when overrides reserve more than the budget, or when the share
+    of each camera is below MIN_BITRATE and is raised to it.
+
+    :param profiles: The planned profile of every camera.
+    :param uplink_kbps: The uplink budget in kbps.
+    :param headroom: Fraction of the uplink budget the streams may use.
+    :return: The excess in kbps, 0 if the plan fits.
+    """
+    return max(0, sum(profile.maximum for profile in profiles.values()) - int(uplink_kbps * headroom))
+
+
+class BitratePlanner:
+    """
+    Keep a bitrate plan for the cameras currently sharing the uplink.
+
+    The plan is recomputed whenever a camera joins or leaves. Cameras configured after a
+    re-plan, such as re-armed feeds, pick up the new values.
+    """
+    def __init__(self, log_callback, uplink_kbps: Optional[int] = None, overrides: Optional[Dict[str, Dict[str, Any]]] = None,
+                 resolution: Optional[str] = None, fov: Optional[str] = None):
+        """
+        Initialize the planner.
+
+        :param log_callback: A callback function for logging messages.
+        :param uplink_kbps: The uplink budget in kbps, or None to keep the fixed default bitrates.
+        :param overrides: Optional per-camera settings keyed by stream name.
+        :param resolution: Default resolution for every camera.
+        :param fov: Default field of view for every camera.
+        """
+        self.log = log_callback
+        self.uplink_kbps = uplink_kbps
+        self.overrides = overrides or {}
+        self.resolution = resolution
+        self.fov = fov
+        self.members: Set[str] = set()
+        self.plan: Dict[str, BitrateProfile] = {}
+
+    @classmethod
+    def from_config(cls, log_callback, config: Dict[str, Any]) -> "BitratePlanner":
+        """
+        Build a planner from a saved configuration.
+
+        :param log_callback: A callback function for logging messages.
+        :param config: The configuration, as saved by the GUI.
+        :return: The planner.
+        :raises ValueError: If a camera has an unsupported resolution or field of view.
+        """
+        check_settings("Default", config.get('resolution'), config.get('fov'))
+        overrides = {}
+        for gopro in config.get('gopros', []):
+            override = dict(gopro.get('bitrate', {}))
+            for key in ('resolution', 'fov'):
+                if gopro.get(key):
+                    override[key] = gopro[key]
+            check_settings(gopro['name'], override.get('resolution'), override.get('fov'))
+            if override:
+                overrides[gopro['name']] = override
+        uplink = config.get('uplink_kbps')
+        return cls(log_callback, int(uplink) if uplink else None, overrides, config.get('resolution'), config.get('fov'))
+
+    def expect(self, names: Iterable[str]) -> None:
+        """
+        Plan for a new set of cameras that are about to be brought up.
+
+        :param names: The stream names of the cameras.
+        :return: None
+        """
+        self.members = set(names)
+        self.replan()
+
+    def profile(self, name: str) -> BitrateProfile:
+        """
+        Get the planned settings of a camera, adding it to the plan if it is new.
+
+        :param name: The name of the stream.
+        :return: The camera's profile.
+        """
+        if name not in self.members:
+            self.members.add(name)
+            self.replan()
+        return self.plan[name]
+
+    def replan(self) -> None:
+        """
+        Recompute the plan for the current members and log it if it changed.
+
+        :return: None
+        """
+        plan = plan_bitrates(sorted(self.members), self.uplink_kbps, self.overrides, self.resolution, self.fov)
+        if plan != self.plan and self.uplink_kbps:
+            per_camera = ", ".join(f"{name} {p.minimum}-{p.maximum} (start {p.starting})" for name, p in plan.items())
+            self.log(f"Bitrate plan for {len(plan)} cameras on {self.uplink_kbps} kbps: {per_camera}")
+            excess = over_budget(plan, self.uplink_kbps)
+            if excess:
+                self.log(f"Warning: the bitrate plan exceeds the uplink budget of {int(self.uplink_kbps * HEADROOM)} kbps by {excess} kbps, "
+                         f"lower the bitrate overrides, stream fewer cameras or raise the uplink")
+        self.plan = plan
+
+    def on_state_change(self, setup: CameraSetup) -> None:
+        """
+        State listener re-planning when a camera leaves (fails or stops) or joins again.
+
+        :param setup: The camera's setup state machine.
+        :return: None
+        """
+        if setup.state in (SetupState.FAILED, SetupState.IDLE):
+            if setup.name in self.members:
+                self.members.discard(setup.name)
+                self.replan()
+        elif setup.name not in self.members:
+            self.members.add(setup.name)
+            self.replan()
@@ -0,0 +1,210 @@
+"""
+Headless command line for GoPro Stream Relay.
+
+Runs the same orchestration as the GUI from a saved configuration, without Tk:
+
+    python cli.py start config.json
+    python cli.py stop config.json
+    python cli.py start config.json --synchronized
+    python cli.py daemon config.json --port 8765
+    python cli.py arm && python cli.py live
+    python cli.py restart "GoPro 1234"
+    python cli.py harvest config.json --dest media/
+    python cli.py status --api http://127.0.0.1:8765
+    python cli.py metrics --json
+"""
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from urllib.parse import quote
+import requests
+from control_api import ControlAPI
+from log_pipeline import LogPipeline, LogRecord
+
+DEFAULT_API = 'http://127.0.0.1:8765'
+
+
+def print_record(record: LogRecord) -> None:
+    """
+    Print a log record to standard output.
+
+    :param record: The log record.
+    :return: None
+    """
+    print(record.format(), flush=True)
+
+
+# Nothing drains a queue on the command line, records are printed as they are logged
+log = LogPipeline(buffered=False, echo=print_record)
+
+
+async def run_once(action: str, config: dict, synchronized: bool = False) -> int:
+    """
+    Start or stop streaming in this process and return once done.
+
+    :param action: Either 'start' or 'stop'.
+    :param config: The configuration dictionary.
+    :param synchronized: Whether to arm every camera first and then start them all at once.
+    :return: The process exit code.
+    """
+    from relay_controller import RelayController
+    controller = RelayController(log)
+    try:
+        if action == 'start' and synchronized:
+            report = await controller.start(config, arm=True)
+            live = await controller.go_live()
+            return 0 if not live.failed and len(live.streaming) == len(report.setups) else 1
+        if action == 'start':
+            report = await controller.start(config)
+            return 0 if len(report.streaming()) == len(report.setups) else 1
+        await controller.stop(config)
+        return 0
+    finally:
+        await controller.close()
+
+
+async def run_harvest(config: dict, destination: str) -> int:
+    """
+    Download the media recorded on every camera's SD card and return once done.
+
+    :param config: The configuration dictionary.
+    :param destination: The directory files are saved to.
+    :return: The process exit code.
+    """
+    from relay_controller import RelayController
+    controller = RelayController(log)
+    try:
+        report = await controller.harvest(config, destination)
+        return 0 if not report.failed() and not report.errors else 1
+    finally:
+        await controller.close()
+
+
+async def run_daemon(config: dict, host: str, port: int, autostart: bool) -> int:
+    """
+    Run the relay until interrupted, controlled through the local HTTP API.
+
+    :param config: The configuration dictionary.
+    :param host: The address the API listens on.
+    :param port: The port the API listens on.
+    :param autostart: Whether to start streaming right away.
+    :return: The process exit code.
+    """
+    from relay_controller import RelayController
+    controller = RelayController(log)
+    api = ControlAPI(controller, config, host, port)
+    await api.start()
+    log(f"Control API listening on http://{api.host}:{api.port}")
+
+    stopped = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopped.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Not available on Windows, KeyboardInterrupt still ends the loop
+
+    if autostart:
+        api.run_operation('start')
+    try:
+        await stopped.wait()
+    finally:
+        await api.close()
+        await controller.close()
+    return 0
+
+
+def call_api(api: str, method: str, path: str) -> int:
+    """
+    Send a request to a running daemon and print its answer.
+
+    :param api: The base URL of the daemon's control API.
+    :param method: The HTTP method.
+    :param path: The endpoint path.
+    :return: The process exit code.
+    """
+    try:
+        response = requests.request(method, api.rstrip('/') + path, timeout=(3, 10))
+    except requests.exceptions.RequestException as e:
+        print(f"Failed to reach daemon at {api}: {e}", file=sys.stderr)
+        return 2
+    if response.headers.get('Content-Type', '').startswith('application/json'):
+        print(json.dumps(response.json(), indent=2))
+    else:
+        print(response.text, end='')
+    return 0 if response.ok else 1
+
+
+def main(argv=None) -> int:
+    """
+    Parse the command line and run the requested command.
+
+    :param argv: Optional argument list, defaults to sys.argv.
+    :return: The process exit code.
+    """
+    parser = argparse.ArgumentParser(description="Control a GoPro Stream Relay without the GUI.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    for action in ('start', 'stop'):
+        command = commands.add_parser(action, help=f"{action} streaming for every camera in a config")
+        command.add_argument('config', nargs='?', help="configuration JSON saved by the GUI")
+        command.add_argument('--api', help="send the command to a running daemon instead")
+        command.add_argument('--log-file', help="also write the log to this rotating file")
+        command.add_argument('--timeline', help="write a trace of every setup phase to this file")
+        if action == 'start':
+            command.add_argument('--synchronized', action='store_true', help="arm every camera, then start them all at once")
+    for action, description in (('arm', "set up every camera of a running daemon and hold it ready"),
+                                 ('live', "start streaming on every armed camera of a running daemon at once")):
+        command = commands.add_parser(action, help=description)
+        command.add_argument('--api', default=DEFAULT_API, help=f"daemon control API (default {DEFAULT_API})")
+    restart = commands.add_parser('restart', help="stop one camera of a running daemon and set it up again")
+    restart.add_argument('target', help="the GoPro target of the camera")
+    restart.add_argument('--api', default=DEFAULT_API, help=f"daemon control API (default {DEFAULT_API})")
+    cancel = commands.add_parser('cancel', help="cancel the running and queued operations of a running daemon")
+    cancel.add_argument('--api', default=DEFAULT_API, help=f"daemon control API (default {DEFAULT_API})")
+    harvest = commands.add_parser('harvest', help="download the media recorded on every camera's SD card, resuming partial files")
+    harvest.add_argument('config', help="configuration JSON saved by the GUI")
+    harvest.add_argument('--dest', default='media', help="directory to save the files to (default media)")
+    harvest.add_argument('--log-file', help="also write the log to this rotating file")
+    status = commands.add_parser('status', help="show the status reported by a running daemon")
+    status.add_argument('--api', default=DEFAULT_API, help=f"daemon control API (default {DEFAULT_API})")
+    metrics = commands.add_parser('metrics', help="show the phase timings and counters of a running daemon")
+    metrics.add_argument('--api', default=DEFAULT_API, help=f"daemon control API (default {DEFAULT_API})")
+    metrics.add_argument('--json', action='store_true', help="print a JSON snapshot instead of Prometheus text")
+    daemon = commands.add_parser('daemon', help="run the relay with a local control API")
+    daemon.add_argument('config', help="configuration JSON saved by the GUI")
+    daemon.add_argument('--host', default='127.0.0.1', help="address the control API listens on")
+    daemon.add_argument('--port', type=int, default=8765, help="port the control API listens on")
+    daemon.add_argument('--autostart', action='store_true', help="start streaming as soon as the daemon is up")
+    daemon.add_argument('--log-file', help="also write the log to this rotating file")
+    daemon.add_argument('--timeline', help="write a trace of every setup phase to this file")
+    args = parser.parse_args(argv)
+
+    if args.command == 'status':
+        return call_api(args.api, 'GET', '/status')
+    if args.command == 'restart':
+        return call_api(args.api, 'POST', '/restart/' + quote(args.target, safe=''))
+    if args.command == 'cancel':
+        return call_api(args.api, 'POST', '/cancel')
+    if args.command == 'metrics':
+        return call_api(args.api, 'GET', '/metrics.json' if args.json else '/metrics')
+    if args.command in ('start', 'stop', 'arm', 'live') and args.api:
+        return call_api(args.api, 'POST', f'/{args.command}')
+    if not args.config:
+        parser.error("a config file is required unless --api is given")
+    # The camera stack is only imported by commands that drive cameras from this process
+    from relay_controller import load_config
+    config = load_config(args.config)
+    log.set_log_file(args.log_file or config.get('log_file'))
+    if getattr(args, 'timeline', None):
+        config['timeline_file'] = args.timeline
+    if args.command == 'harvest':
+        return asyncio.run(run_harvest(config, args.dest))
+    if args.command == 'daemon':
+        return asyncio.run(run_daemon(config, args.host, args.port, args.autostart))
+    return asyncio.run(run_once(args.command, config, getattr(args, 'synchronized', False)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Set
+from ingest import IngestTimeout, IngestVerifier
+from setup_state import CameraSetup, SetupState
+
+# States in which a camera's stream has ended. A camera that is reconciled while streaming
+# passes through the other setup states without interrupting its stream.
+DROPPED_STATES = {SetupState.IDLE, SetupState.SHUTTER_OFF, SetupState.FAILED}
+
+
+class CompositorFeed:
+    """
+    Keep the server-side compositor in step with the cameras that are actually streaming.
+
+    The compositor is started as soon as the first camera reaches STREAMING and updated
+    whenever a camera joins or drops, so time-to-first-frame does not depend on the slowest
+    camera and inputs from cameras that failed are never sent to the server. With a verifier,
+    a camera only joins once its stream is seen arriving at the ingest server, so the
+    compositor never waits on an input that reports STREAMING but delivers nothing.
+    """
+    def __init__(self, manager, server_address: str, names: List[str], output_stream: str,
+                 settle: float = 0.5, update_action: str = 'start', input_url: Optional[Callable[[str], str]] = None,
+                 verifier: Optional[IngestVerifier] = None):
+        """
+        Initialize the compositor feed.
+
+        :param manager: The GoProManager whose state changes drive the feed.
+        :param server_address: The address of the streaming server.
+        :param names: The configured stream names, in compositor input order.
+        :param output_stream: The output stream URL.
+        :param settle: Seconds to wait after a change so cameras arriving together cause a single update.
+        :param update_action: The server action used to change the inputs of a running compositor.
+        :param input_url: Optional function giving the ingest URL of a stream, when streams are spread across relays.
+        :param verifier: Optional verifier confirming each stream arrives before it is used.
+        """
+        self.manager = manager
+        self.server_address = server_address
+        self.names = list(names)
+        self.output_stream = output_stream
+        self.settle = settle
+        self.update_action = update_action
+        self._input_url = input_url
+        self.verifier = verifier
+        self.live: Set[str] = set()
+        self.first_packet: Dict[str, float] = {}
+        self._verifying: Dict[str, asyncio.Task] = {}
+        self.sent: Optional[List[str]] = None
+        self._changed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def input_url(self, name: str) -> str:
+        """
+        Get the ingest URL of a stream.
+
+        :param name: The name of the stream.
+        :return: The RTMP URL.
+        """
+        if self._input_url is not None:
+            return self._input_url(name)
+        return f"rtmp://{self.server_address}/live/{name}"
+
+    def input_streams(self) -> List[str]:
+        """
+        Get the input URLs of the live streams, in configured order.
+
+        :return: A list of RTMP URLs.
+        """
+        return [self.input_url(name) for name in self.names if name in self.live]
+
+    def start(self) -> None:
+        """
+        Start following camera state changes.
+
+        :return: None
+        """
+        self.manager.state_listeners.append(self._on_state_change)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """
+        Stop following camera state changes and stop the compositor if it was started.
+
+        :return: None
+        """
+        if self._on_state_change in self.manager.state_listeners:
+            self.manager.state_listeners.remove(self._on_state_change)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._verifying.values():
+            task.cancel()
+        self._verifying.clear()
+        if self.sent:
+            self.manager.log("Stopping stream script on server")
+            await self.manager.run_script_on_server(action='stop', server_address=self.server_address)
+        self.sent = None
+
+    async def sync(self) -> None:
+        """
+        Send the current set of live inputs to the server if it changed since the last update.
+
+        :return: None
+        """
+        input_streams = self.input_streams()
+        if input_streams == (self.sent or []):
+            return
+        if not input_streams:
+            self.manager.log("No cameras are streaming, stopping stream script on server")
+            await self.manager.run_script_on_server(action='stop', server_address=self.server_address)
+        else:
+            action = self.update_action if self.sent else 'start'
+            self.manager.log(f"Sending '{action}' to stream script on server with input streams: {input_streams} and output stream: {self.output_stream}")
+            await self.manager.run_script_on_server(action=action, server_address=self.server_address,
+                                                    input_streams=input_streams, output_stream=self.output_stream)
+        self.sent = input_streams
+
+    def _on_state_change(self, setup: CameraSetup) -> None:
+        if setup.name not in self.names:
+            return
+        if setup.state in DROPPED_STATES:
+            if setup.name in self._verifying:
+                self._verifying.pop(setup.name).cancel()
+            if setup.name in self.live:
+                self.live.discard(setup.name)
+                self._changed.set()
+        elif setup.state == SetupState.STREAMING and setup.name not in self.live:
+            if self.verifier is None:
+                self.live.add(setup.name)
+                self._changed.set()
+            elif setup.name not in self._verifying:
+                # The stream joins once _verify saw it arrive at its ingest server
+                self._verifying[setup.name] = asyncio.create_task(self._verify(setup.name, setup.target))
+
+    async def _verify(self, name: str, target: str) -> None:
+        try:
+            self.first_packet[name] = await self.verifier.wait_for_stream(target, self.input_url(name))
+        except IngestTimeout:
+            # Logged by the verifier, the camera is verified again when it next reports STREAMING
+            return
+        except Exception as e:
+            # e.g. a reply the probe cannot decode, which says nothing about the camera's stream
+            self.manager.log(f"{target}: Could not verify the stream, using it unverified: {e!r}")
+        finally:
+            if self._verifying.get(name) is asyncio.current_task():
+                del self._verifying[name]
+        self.live.add(name)
+        self._changed.set()
+
+    async def _run(self) -> None:
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.settle)
+            self._changed.clear()
+            try:
+                await self.sync()
+            except Exception as e:
+                self.manager.log(f"Failed to update stream script on server: {e}")
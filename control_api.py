@@ -0,0 +1,141 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib.parse import unquote
+from runtime import CommandQueue
+
+
+class ControlAPI:
+    """
+    Local HTTP API for a headless relay.
+
+    Runs on the same event loop as the cameras and answers:
+
+    - ``GET /status``: the controller status as JSON
+    - ``GET /metrics``: phase timings and outcome counters in the Prometheus text format
+    - ``GET /metrics.json``: the same metrics as JSON
+    - ``POST /start``: start streaming with the loaded configuration
+    - ``POST /arm``: set every camera up to a READY livestream and hold it there
+    - ``POST /live``: start streaming on every armed camera at once
+    - ``POST /stop``: stop streaming
+    - ``POST /restart/<target>``: stop one camera and set it up again
+    - ``POST /cancel``: cancel the running and queued operations
+
+    Operations are queued and run in the background; the response only confirms they were
+    accepted. Start, arm and stop supersede the operation in progress, so stopping during a
+    slow start cancels the start instead of racing it.
+    """
+    def __init__(self, controller, config: Dict[str, Any], host: str = '127.0.0.1', port: int = 8765):
+        """
+        Initialize the control API.
+
+        :param controller: The RelayController to drive.
+        :param config: The configuration used by start and stop.
+        :param host: The address to listen on.
+        :param port: The port to listen on.
+        """
+        self.controller = controller
+        self.config = config
+        self.host = host
+        self.port = port
+        self.commands = CommandQueue(controller.log)
+        self.operation: Optional[asyncio.Future] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """
+        Start listening for requests.
+
+        :return: None
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        """
+        Stop listening for requests.
+
+        :return: None
+        """
+        await self.commands.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def run_operation(self, action: str, target: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+        """
+        Queue an operation to run in the background.
+
+        :param action: One of 'start', 'arm', 'live', 'stop' or 'restart'.
+        :param target: The camera to restart.
+        :return: The HTTP status and JSON body of the response.
+        """
+        if action == 'restart':
+            if target not in [camera.target for camera in self.controller.cameras(self.config)]:
+                return 404, {'error': f'unknown camera {target}'}
+            self.operation = self.commands.submit(f'restart {target}', lambda: self.controller.restart_camera(target), scope=target)
+            return 202, {'accepted': action, 'target': target}
+        if action == 'start':
+            self.operation = self.commands.submit(action, lambda: self.controller.start(self.config))
+        elif action == 'arm':
+            self.operation = self.commands.submit(action, lambda: self.controller.start(self.config, arm=True))
+        elif action == 'live':
+            # Going live waits for an arm in progress instead of cancelling it
+            self.operation = self.commands.submit(action, self.controller.go_live, supersede=False)
+        else:
+            self.operation = self.commands.submit(action, lambda: self.controller.stop(self.config))
+        return 202, {'accepted': action}
+
+    def route(self, method: str, path: str) -> Tuple[int, Union[Dict[str, Any], str]]:
+        """
+        Answer a request.
+
+        :param method: The HTTP method.
+        :param path: The request path.
+        :return: The HTTP status and the JSON body, or plain text body, of the response.
+        """
+        if method == 'GET' and path == '/status':
+            status = self.controller.status()
+            status['busy'] = self.commands.busy
+            return 200, status
+        if method == 'GET' and path == '/metrics':
+            return 200, self.controller.manager.metrics.prometheus()
+        if method == 'GET' and path == '/metrics.json':
+            return 200, self.controller.manager.metrics.snapshot()
+        if method == 'POST' and path in ('/start', '/arm', '/live', '/stop'):
+            return self.run_operation(path[1:])
+        if method == 'POST' and path.startswith('/restart/'):
+            return self.run_operation('restart', unquote(path[len('/restart/'):]))
+        if method == 'POST' and path == '/cancel':
+            return 200, {'cancelled': self.commands.cancel()}
+        return 404, {'error': f'unknown endpoint {method} {path}'}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            content_length = 0
+            while True:
+                header = await reader.readline()
+                if header in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = header.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    content_length = int(value.strip())
+            if content_length:
+                await reader.readexactly(content_length)
+            if len(request_line) < 2:
+                status, body = 400, {'error': 'bad request'}
+            else:
+                status, body = self.route(request_line[0], request_line[1].split('?')[0])
+        except Exception as e:
+            status, body = 500, {'error': str(e)}
+        if isinstance(body, str):
+            payload, content_type = body.encode(), 'text/plain; version=0.0.4'
+        else:
+            payload, content_type = json.dumps(body).encode(), 'application/json'
+        writer.write(f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+                     f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode())
+        writer.write(payload)
+        await writer.drain()
+        writer.close()
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from typing import Dict, List, NamedTuple, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ServerResult(NamedTuple):
+    """
+    The outcome of a request to the server control endpoint.
+    """
+    ok: bool
+    status_code: Optional[int]
+    text: str
+    elapsed: float
+    error: Optional[str] = None
+
+
+class ControlClient:
+    """
+    HTTP client for the stream script control endpoint on the server.
+
+    Connections are pooled and reused across requests, every request has explicit connect
+    and read timeouts, and requests run in a worker thread so they never block the event
+    loop that drives the cameras.
+    """
+    def __init__(self, port: int = 8080, connect_timeout: float = 3.0, read_timeout: float = 30.0,
+                 retries: int = 3, backoff: float = 0.5, pool_size: int = 4):
+        """
+        Initialize the control client.
+
+        :param port: The port of the control endpoint.
+        :param connect_timeout: Seconds to wait for a connection to the server.
+        :param read_timeout: Seconds to wait for the server to answer.
+        :param retries: How many times a failed connection or a 502/503/504 answer is retried.
+        :param backoff: Backoff factor in seconds between retries.
+        :param pool_size: How many connections are kept open per server.
+        """
+        self.port = port
+        self.timeout = (connect_timeout, read_timeout)
+        # Reads are not retried: the server may already have acted on the request
+        retry = Retry(total=retries, connect=retries, read=0, backoff_factor=backoff,
+                      status_forcelist=(502, 503, 504), allowed_methods=["GET"], raise_on_status=False)
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry))
+
+    @staticmethod
+    def build_params(action: str, input_streams: Optional[List[str]] = None, output_stream: Optional[str] = None) -> Dict[str, str]:
+        """
+        Build the query parameters of a control request.
+
+        :param action: The action to perform.
+        :param input_streams: Optional list of input streams.
+        :param output_stream: Optional output stream.
+        :return: The query parameters, to be URL encoded by the HTTP client.
+        """
+        params = {'action': action}
+        if input_streams:
+            for i, stream in enumerate(input_streams):
+                if stream:  # Validate non-empty stream
+                    params[f'input{i}'] = stream
+        if output_stream:
+            params['output'] = output_stream
+        return params
+
+    def url(self, server_address: str) -> str:
+        """
+        Get the URL of the control endpoint on a server.
+
+        :param server_address: The address of the server.
+        :return: The URL.
+        """
+        return f'http://{server_address}:{self.port}/'
+
+    def request(self, server_address: str, params: Dict[str, str]) -> ServerResult:
+        """
+        Send a control request, blocking until it completes.
+
+        :param server_address: The address of the server.
+        :param params: The query parameters.
+        :return: The structured result.
+        """
+        started = time.monotonic()
+        try:
+            response = self.session.get(self.url(server_address), params=params, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            return ServerResult(False, None, "", time.monotonic() - started, str(e))
+        return ServerResult(response.status_code == 200, response.status_code, response.text, time.monotonic() - started)
+
+    async def run_script(self, action: str, server_address: str, input_streams: Optional[List[str]] = None,
+                         output_stream: Optional[str] = None) -> ServerResult:
+        """
+        Send a control request without blocking the event loop.
+
+        :param action: The action to perform.
+        :param server_address: The address of the server.
+        :param input_streams: Optional list of input streams.
+        :param output_stream: Optional output stream.
+        :return: The structured result.
+        """
+        params = self.build_params(action, input_streams, output_stream)
+        return await asyncio.to_thread(self.request, server_address, params)
+
+    def close(self) -> None:
+        """
+        Close all pooled connections.
+
+        :return: None
+        """
+        self.session.close()
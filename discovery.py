@@ -0,0 +1,126 @@
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Service every GoPro advertises, used to ignore other BLE devices while scanning
+GOPRO_SERVICE_UUID = "0000fea6-0000-1000-8000-00805f9b34fb"
+
+# A scanner calls on_device(name, device) for every advertisement until it returns True or the timeout expires
+Scanner = Callable[[Callable[[str, Any], bool], float], Awaitable[None]]
+
+
+async def bleak_scan(on_device: Callable[[str, Any], bool], timeout: float) -> None:
+    """
+    Scan for GoPros with the host BLE adapter.
+
+    :param on_device: Called with the advertised name and device, returns True once nothing more is wanted.
+    :param timeout: The longest time to scan, in seconds.
+    :return: None
+    """
+    import bleak
+
+    done = asyncio.Event()
+
+    def detection_callback(device: Any, advertisement: Any) -> None:
+        name = advertisement.local_name or device.name
+        if name and on_device(name, device):
+            done.set()
+
+    async with bleak.BleakScanner(detection_callback=detection_callback, service_uuids=[GOPRO_SERVICE_UUID]):
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+class DiscoveryCache:
+    """
+    Resolve GoPro targets to BLE devices with one shared scan.
+
+    ``WirelessGoPro`` normally scans for its own target, so N cameras opened together run N
+    scans competing for one radio. Instead, every target requested while a scan is running
+    is looked for by that same scan, and resolved devices are cached for ``ttl`` seconds so
+    a known camera can connect without scanning at all.
+    """
+    def __init__(self, log_callback, scanner: Scanner = bleak_scan, ttl: float = 300.0, scan_timeout: float = 10.0):
+        """
+        Initialize the discovery cache.
+
+        :param log_callback: A callback function for logging messages.
+        :param scanner: The BLE scan implementation.
+        :param ttl: Seconds a resolved device is trusted before it is looked up again.
+        :param scan_timeout: The longest time a scan runs while targets are still missing.
+        """
+        self.log = log_callback
+        self.scanner = scanner
+        self.ttl = ttl
+        self.scan_timeout = scan_timeout
+        self.scans = 0
+        self._devices: Dict[str, Tuple[Any, float]] = {}
+        self._wanted: Set[str] = set()
+        self._scan: Optional[asyncio.Task] = None
+
+    def get(self, target: str) -> Optional[Any]:
+        """
+        Get the cached device of a target without scanning.
+
+        :param target: The target GoPro device.
+        :return: The BLE device, or None if it is unknown or expired.
+        """
+        entry = self._devices.get(target)
+        if entry is None:
+            return None
+        device, seen = entry
+        if time.monotonic() - seen > self.ttl:
+            del self._devices[target]
+            return None
+        return device
+
+    def invalidate(self, target: str) -> None:
+        """
+        Forget the device of a target, e.g. after connecting to it failed.
+
+        :param target: The target GoPro device.
+        :return: None
+        """
+        self._devices.pop(target, None)
+
+    async def resolve(self, targets: Iterable[str]) -> Dict[str, Any]:
+        """
+        Resolve targets to BLE devices, scanning once for all of the ones not cached.
+
+        :param targets: The target GoPro devices, as passed to WirelessGoPro.
+        :return: The devices that were found, keyed by target.
+        """
+        targets = list(targets)
+        missing = {target for target in targets if self.get(target) is None}
+        if missing:
+            self._wanted |= missing
+            if self._scan is None or self._scan.done():
+                self._scan = asyncio.create_task(self._run_scan())
+            # A scan that is already running picks up the new targets from _wanted
+            await asyncio.shield(self._scan)
+        return {target: device for target in targets if (device := self.get(target)) is not None}
+
+    async def _run_scan(self) -> None:
+        self.scans += 1
+        patterns: Dict[str, re.Pattern] = {}
+
+        def on_device(name: str, device: Any) -> bool:
+            for target in list(self._wanted):
+                pattern = patterns.get(target)
+                if pattern is None:
+                    pattern = patterns[target] = re.compile(target)
+                if pattern.match(name):
+                    self._devices[target] = (device, time.monotonic())
+                    self._wanted.discard(target)
+            return not self._wanted
+
+        try:
+            await self.scanner(on_device, self.scan_timeout)
+        except Exception as e:
+            self.log(f"BLE discovery failed, cameras will scan on their own: {e}")
+        if self._wanted:
+            self.log(f"BLE discovery did not find: {', '.join(sorted(self._wanted))}")
+        self._wanted.clear()
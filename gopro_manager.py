@@ -1,21 +1,85 @@
 # gopro_manager.py
 import asyncio
+import random
+import time
 from open_gopro import WirelessGoPro, constants, proto
-from typing import Any, List, Optional
-import requests
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+from control_client import ControlClient, ServerResult
+from discovery import DiscoveryCache
+from log_pipeline import current_camera
+from media_harvest import HarvestError, MediaEndpoint
+from metrics import Metrics
+from session_pool import GoProSession, GoProSessionPool
+from access_points import AccessPointPlan
+from bitrate_planner import DEFAULT_PROFILE, BitratePlanner, BitrateProfile
+from setup_state import CameraSetup, SetupState, SetupTimeout
+
+class LivestreamConfig(NamedTuple):
+    """
+    The livestream settings sent to a camera with set_livestream_mode.
+    """
+    url: str
+    encode: bool
+    profile: BitrateProfile
+
+
+# The steps of a full setup, a reconcile runs only the ones a camera is missing
+ALL_STEPS = frozenset({SetupState.SHUTTER_OFF, SetupState.JOINING_AP, SetupState.CONFIGURING, SetupState.READY})
+
 
 class GoProManager:
-    def __init__(self, log_callback):
+    def __init__(self, log_callback, idle_timeout: float = 600.0, timeouts: Optional[Dict[SetupState, float]] = None, open_retries: int = 5,
+                 control: Optional[ControlClient] = None, metrics: Optional[Metrics] = None,
+                 discovery: Optional[DiscoveryCache] = None):
         """
         Initialize the GoProManager with a logging callback.
 
         :param log_callback: A callback function for logging messages.
+        :param idle_timeout: Seconds an unused camera connection is kept open.
+        :param timeouts: Optional per-state setup timeouts in seconds.
+        :param open_retries: How many BLE connection attempts each connect makes before giving up.
+        :param control: The client for the server control endpoint.
+        :param metrics: Where phase timings and outcome counts are recorded.
+        :param discovery: Optional shared BLE discovery, otherwise every camera scans for itself.
         """
         self.log = log_callback
+        self.timeouts = timeouts
+        self.setups: Dict[str, CameraSetup] = {}
+        self.state_listeners: List[Callable[[CameraSetup], None]] = []
+        self.control = control or ControlClient()
+        self.metrics = metrics or Metrics()
+        self.discovery = discovery
+        # The camera does not report its RTMP URL, so remember what was last sent to it
+        self.applied: Dict[str, LivestreamConfig] = {}
+        # The pooled session of every armed camera, held so it is not closed as idle before go_live
+        self.armed: Dict[str, GoProSession] = {}
+        self.pool = GoProSessionPool(self._new_gopro, log_callback, idle_timeout=idle_timeout, open_retries=open_retries)
+
+    def _new_gopro(self, gopro_target: str) -> WirelessGoPro:
+        # A device resolved by discovery is connected to directly, without scanning for it again
+        device = self.discovery.get(gopro_target) if self.discovery is not None else None
+        return WirelessGoPro(target=device or gopro_target, enable_wifi=False)
+
+    async def _discover(self, gopro_target: str) -> None:
+        """
+        Resolve the camera through the shared discovery scan, unless it is already connected.
+
+        :param gopro_target: The target GoPro device.
+        :return: None
+        """
+        if self.discovery is None or self.pool.get(gopro_target) is not None or self.discovery.get(gopro_target) is not None:
+            return
+        with self.metrics.timed('discovery', gopro_target):
+            await self.discovery.resolve([gopro_target])
 
-    async def setup_gopro(self, name: str, gopro_target: str, ssid: str, password: str, server_address: str, encode: bool = False) -> None:
+    async def setup_gopro(self, name: str, gopro_target: str, ssid: str, password: str, server_address: str, encode: bool = False,
+                          profile: BitrateProfile = DEFAULT_PROFILE, arm: bool = False, reconcile: bool = False) -> CameraSetup:
         """
-        Set up the GoPro to stream.
+        Set up the GoPro to stream, or only arm it so go_live can start it together with the others.
+
+        In reconcile mode the camera's current Wi-Fi network and livestream status are read
+        first and only the steps it is missing are run, so a camera that already streams
+        with the desired settings is left alone.
 
         :param name: The name of the stream.
         :param gopro_target: The target GoPro device.
@@ -23,55 +87,300 @@ class GoProManager:
         :param password: The password of the Wi-Fi network.
         :param server_address: The address of the streaming server.
         :param encode: Whether to save the stream to gopro sd card or not.
+        :param profile: The bitrate, resolution and field of view to stream with.
+        :param arm: Whether to stop once the livestream is READY, holding it there until go_live.
+        :param reconcile: Whether to skip the steps the camera does not need.
+        :return: The camera's setup state machine, in the STREAMING (READY when arming) or FAILED state.
+        """
+        current_camera.set(gopro_target)
+        self._disarm(gopro_target)
+        setup = CameraSetup(name, gopro_target, self.timeouts, self._on_state_change)
+        self.setups[gopro_target] = setup
+        with self.metrics.timed('setup', gopro_target):
+            try:
+                await self._setup(setup, ssid, password, server_address, encode, profile, arm, reconcile)
+            except asyncio.CancelledError:
+                # Superseded, e.g. by Stop pressed during a slow Start. The connection is kept for the next command.
+                setup.fail(Exception("Setup cancelled"))
+                self.metrics.count('setups', gopro_target, 'cancelled')
+                self.log(f"{gopro_target}: Setup cancelled")
+                raise
+        self.metrics.count('setups', gopro_target, setup.state.value)
+        return setup
+
+    async def _setup(self, setup: CameraSetup, ssid: str, password: str, server_address: str, encode: bool,
+                     profile: BitrateProfile, arm: bool = False, reconcile: bool = False) -> None:
+        """
+        Walk a camera through the setup states, timing each phase.
+
+        :param setup: The camera's setup state machine.
+        :param ssid: The SSID of the Wi-Fi network.
+        :param password: The password of the Wi-Fi network.
+        :param server_address: The address of the streaming server.
+        :param encode: Whether to save the stream to gopro sd card or not.
+        :param profile: The bitrate, resolution and field of view to stream with.
+        :param arm: Whether to stop once the livestream is READY.
+        :param reconcile: Whether to skip the steps the camera does not need.
         :return: None
         """
+        gopro_target = setup.target
+        config = LivestreamConfig(f"rtmp://{server_address}/live/{setup.name}", encode, profile)
+        timed = self.metrics.timed
         try:
-            gopro_obj = WirelessGoPro(target=gopro_target, enable_wifi=False)
-            await gopro_obj.open(retries=100)
+            gopro_obj = await self._connect(setup)
         except Exception as e:
+            setup.fail(e)
             self.log(f"Failed to connect to {gopro_target}: {e}")
             return
 
+        gopro_obj.register_update(setup.on_livestream_status, constants.ActionId.LIVESTREAM_STATUS_NOTIF)
+        armed = False
         try:
-            await gopro_obj.ble_command.set_shutter(shutter=constants.Toggle.DISABLE)
-            await asyncio.sleep(2)
-            await gopro_obj.ble_command.register_livestream_status(
-                register=[proto.EnumRegisterLiveStreamStatus.REGISTER_LIVE_STREAM_STATUS_STATUS]
-            )
+            if reconcile:
+                with timed('observe', gopro_target):
+                    steps = await self._plan(setup, gopro_obj, ssid, config)
+                if not steps:
+                    self.log(f"{gopro_target}: Already streaming with the desired settings")
+                else:
+                    self.log(f"{gopro_target}: Reconciling: {', '.join(step.value for step in sorted(steps, key=list(SetupState).index))}")
+            else:
+                steps = ALL_STEPS
+
+            # Commands are held back by the camera's ready lock, so the next step only
+            # runs once the camera has actually stopped encoding.
+            if SetupState.SHUTTER_OFF in steps:
+                with timed('shutter_off', gopro_target):
+                    await setup.step(SetupState.SHUTTER_OFF, gopro_obj.ble_command.set_shutter(shutter=constants.Toggle.DISABLE))
+            if not reconcile:
+                with timed('register_status', gopro_target):
+                    await self._register_status(gopro_obj)
+
+            if SetupState.JOINING_AP in steps:
+                self.log(f"{gopro_target}: Connecting to {ssid}...")
+                with timed('join_ap', gopro_target):
+                    await setup.step(SetupState.JOINING_AP, gopro_obj.connect_to_access_point(ssid, password))
+
+            if SetupState.CONFIGURING in steps:
+                self.log(f"{gopro_target}: Configuring livestream for...")
+                self.applied.pop(gopro_target, None)
+                await setup.step(SetupState.CONFIGURING, self._configure_livestream(setup, gopro_obj, setup.name, server_address, encode, profile))
+                self.applied[gopro_target] = config
+
+            if steps and arm:
+                # Keep the status callback registered so go_live only has to fire the shutter
+                setup.transition(SetupState.READY)
+                armed = True
+                self.armed[gopro_target] = self.pool.get(gopro_target)
+                self.armed[gopro_target].hold()
+                self.log(f"{gopro_target}: Armed, waiting to go live")
+                return
+
+            if steps:
+                self.log(f"{gopro_target}: Starting livestream")
+                await setup.step(SetupState.READY, self._start_livestream(setup, gopro_obj))
+            setup.transition(SetupState.STREAMING)
+            self.log(f"{gopro_target}: Livestream is now streaming and should be available for viewing.")
+        except Exception as e:
+            setup.fail(e)
+            self.log(f"Error during setup for {gopro_target}: {e}")
+            # Drop the connection so the next attempt starts from a clean one
+            await self.pool.release(gopro_target)
+        finally:
+            if not armed:
+                gopro_obj.unregister_update(setup.on_livestream_status, constants.ActionId.LIVESTREAM_STATUS_NOTIF)
+
+    async def go_live(self, gopro_targets: Optional[List[str]] = None) -> "GoLiveReport":
+        """
+        Fire the shutter on every armed camera at once.
+
+        :param gopro_targets: Optional targets to start, defaults to every armed camera.
+        :return: When each camera was triggered and started streaming.
+        """
+        armed = [setup for setup in self.setups.values()
+                 if setup.state == SetupState.READY and (gopro_targets is None or setup.target in gopro_targets)]
+        report = GoLiveReport()
+        self.log(f"Going live with {len(armed)} armed cameras")
+        # Every shutter command is sent in the same loop iteration, nothing else is awaited before it
+        await asyncio.gather(*(self._go_live(setup, report) for setup in armed))
+        self.log(report.summary())
+        return report
+
+    async def _go_live(self, setup: CameraSetup, report: "GoLiveReport") -> None:
+        """
+        Fire the shutter on an armed camera and wait for it to report STREAMING.
+
+        :param setup: The camera's setup state machine, in the READY state.
+        :param report: The report to record the trigger and streaming times in.
+        :return: None
+        """
+        current_camera.set(setup.target)
+        session = self.pool.get(setup.target)
+        held = self.armed.pop(setup.target, None)
+        try:
+            if session is None or not session.is_alive():
+                raise Exception("Connection lost while armed")
+            gopro_obj = session.gopro
+            session.touch()
+            try:
+                with self.metrics.timed('shutter_on', setup.target):
+                    await gopro_obj.ble_command.set_shutter(shutter=constants.Toggle.ENABLE)
+                report.triggered[setup.target] = time.monotonic()
+                timeout = setup.timeouts.get(SetupState.READY)
+                try:
+                    with self.metrics.timed('wait_streaming', setup.target):
+                        await asyncio.wait_for(setup.wait_for_livestream(proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING), timeout)
+                except asyncio.TimeoutError:
+                    raise SetupTimeout(SetupState.READY, timeout) from None
+            finally:
+                gopro_obj.unregister_update(setup.on_livestream_status, constants.ActionId.LIVESTREAM_STATUS_NOTIF)
+            report.streaming[setup.target] = time.monotonic()
+            setup.transition(SetupState.STREAMING)
+            self.log(f"{setup.target}: Livestream is now streaming and should be available for viewing.")
+        except Exception as e:
+            report.failed[setup.target] = str(e)
+            setup.fail(e)
+            self.log(f"Error going live for {setup.target}: {e}")
+            await self.pool.release(setup.target)
+        finally:
+            if held is not None:
+                held.let_go()
+
+    @staticmethod
+    async def _register_status(gopro_obj: WirelessGoPro) -> Any:
+        return await gopro_obj.ble_command.register_livestream_status(
+            register=[proto.EnumRegisterLiveStreamStatus.REGISTER_LIVE_STREAM_STATUS_STATUS]
+        )
 
-            self.log(f"{gopro_target}: Connecting to {ssid}...")
-            await gopro_obj.connect_to_access_point(ssid, password)
+    async def _plan(self, setup: CameraSetup, gopro_obj: WirelessGoPro, ssid: str, config: LivestreamConfig) -> Set[SetupState]:
+        """
+        Read the camera's current state and work out which setup steps it still needs.
+
+        :param setup: The camera's setup state machine.
+        :param gopro_obj: The connected GoPro.
+        :param ssid: The SSID of the Wi-Fi network the camera should be on.
+        :param config: The livestream settings the camera should have.
+        :return: The steps to run, empty if the camera already streams as desired.
+        """
+        response = await self._register_status(gopro_obj)
+        status = response.data.live_stream_status if isinstance(response.data, proto.NotifyLiveStreamStatus) else None
+        setup.livestream_status = status
+        try:
+            connected_ssid = (await gopro_obj.ble_status.connected_wifi_ssid.get_value()).data
+        except Exception as e:
+            self.log(f"{setup.target}: Could not read the connected network: {e}")
+            connected_ssid = None
+
+        if connected_ssid != ssid:
+            return set(ALL_STEPS)
+        # A camera that lost its livestream configuration (e.g. after a reboot) reports IDLE
+        configured = self.applied.get(setup.target) == config and status in (
+            proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_READY, proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING)
+        if not configured:
+            return {SetupState.SHUTTER_OFF, SetupState.CONFIGURING, SetupState.READY}
+        if status == proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING:
+            return set()
+        return {SetupState.READY}
 
-            # Start livestream
-            livestream_is_ready = asyncio.Event()
+    def _disarm(self, gopro_target: str) -> None:
+        # An armed camera still has its setup's status callback registered, and holds its connection
+        held = self.armed.pop(gopro_target, None)
+        if held is not None:
+            held.let_go()
+        setup = self.setups.get(gopro_target)
+        session = self.pool.get(gopro_target)
+        if setup is not None and setup.state == SetupState.READY and session is not None:
+            session.gopro.unregister_update(setup.on_livestream_status, constants.ActionId.LIVESTREAM_STATUS_NOTIF)
 
-            async def wait_for_livestream_start(_: Any, update: proto.NotifyLiveStreamStatus) -> None:
-                if update.live_stream_status == proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_READY:
-                    livestream_is_ready.set()
+    async def _connect(self, setup: CameraSetup) -> WirelessGoPro:
+        """
+        Get a connection to the camera, waiting in QUEUED for a free BLE handshake slot if a new one is needed.
+
+        :param setup: The camera's setup state machine.
+        :return: The connected GoPro.
+        """
+        setup.transition(SetupState.QUEUED)
+        await self._discover(setup.target)
+        timeout = setup.timeouts.get(SetupState.CONNECTING)
+        queued = time.monotonic()
+        connecting = []
 
-            self.log(f"{gopro_target}: Configuring livestream for...")
-            gopro_obj.register_update(wait_for_livestream_start, constants.ActionId.LIVESTREAM_STATUS_NOTIF)
+        def on_connect() -> None:
+            connecting.append(time.monotonic())
+            self.metrics.observe('handshake_queue', setup.target, connecting[0] - queued, started=queued)
+            setup.transition(SetupState.CONNECTING)
+
+        outcome = 'error'
+        try:
+            gopro_obj = await self.pool.acquire(setup.target, on_connect=on_connect, timeout=timeout)
+            outcome = 'ok'
+            return gopro_obj
+        except asyncio.TimeoutError:
+            raise SetupTimeout(SetupState.CONNECTING, timeout) from None
+        except Exception:
+            # The camera may have moved or changed address, scan for it again next time
+            if self.discovery is not None:
+                self.discovery.invalidate(setup.target)
+            raise
+        finally:
+            # Only a new connection goes through the BLE handshake, a pooled one is handed out directly
+            if connecting:
+                self.metrics.observe('ble_open', setup.target, time.monotonic() - connecting[0], outcome, connecting[0])
+
+    async def _configure_livestream(self, setup: CameraSetup, gopro_obj: WirelessGoPro, name: str, server_address: str, encode: bool,
+                                    profile: BitrateProfile) -> None:
+        """
+        Send the livestream configuration and wait for the camera to report READY.
+
+        :param setup: The camera's setup state machine.
+        :param gopro_obj: The connected GoPro.
+        :param name: The name of the stream.
+        :param server_address: The address of the streaming server.
+        :param encode: Whether to save the stream to gopro sd card or not.
+        :param profile: The bitrate, resolution and field of view to stream with.
+        :return: None
+        """
+        # Only a READY reported after this configuration counts
+        setup.livestream_status = None
+        with self.metrics.timed('set_livestream_mode', setup.target):
             await gopro_obj.ble_command.set_livestream_mode(
                 url=f"rtmp://{server_address}/live/{name}",
-                minimum_bitrate=800,
-                maximum_bitrate=8000,
-                starting_bitrate=5000,
+                minimum_bitrate=profile.minimum,
+                maximum_bitrate=profile.maximum,
+                starting_bitrate=profile.starting,
                 encode = encode,
+                window_size=profile.window_size,
+                lens=profile.lens,
             )
+        self.log(f"{setup.target}: Waiting for livestream to be ready...\n")
+        with self.metrics.timed('wait_ready', setup.target):
+            await setup.wait_for_livestream(proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_READY)
 
-            self.log(f"{gopro_target}: Waiting for livestream to be ready...\n")
-            await livestream_is_ready.wait()
-
-            # Optional delay
-            await asyncio.sleep(2)
+    async def _start_livestream(self, setup: CameraSetup, gopro_obj: WirelessGoPro) -> None:
+        """
+        Enable the shutter and wait for the camera to report STREAMING.
 
-            self.log(f"{gopro_target}: Starting livestream")
+        :param setup: The camera's setup state machine.
+        :param gopro_obj: The connected GoPro.
+        :return: None
+        """
+        with self.metrics.timed('shutter_on', setup.target):
             await gopro_obj.ble_command.set_shutter(shutter=constants.Toggle.ENABLE)
-            self.log(f"{gopro_target}: Livestream is now streaming and should be available for viewing.")
-        except Exception as e:
-            self.log(f"Error during setup for {gopro_target}: {e}")
-        finally:
-            await gopro_obj.close()
+        with self.metrics.timed('wait_streaming', setup.target):
+            await setup.wait_for_livestream(proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING)
+
+    def get_state(self, gopro_target: str) -> SetupState:
+        """
+        Get the current setup state of a GoPro.
+
+        :param gopro_target: The target GoPro device.
+        :return: The camera's setup state, IDLE if it has not been set up.
+        """
+        setup = self.setups.get(gopro_target)
+        return setup.state if setup else SetupState.IDLE
+
+    def _on_state_change(self, setup: CameraSetup) -> None:
+        for listener in list(self.state_listeners):
+            listener(setup)
 
     async def stop_live_stream(self, gopro_target: str) -> None:
         """
@@ -80,18 +389,63 @@ class GoProManager:
         :param gopro_target: The target GoPro device.
         :return: None
         """
+        current_camera.set(gopro_target)
+        self._disarm(gopro_target)
+        # Leave STREAMING first so the end of the stream is not mistaken for a dropped feed
+        if gopro_target in self.setups:
+            self.setups[gopro_target].transition(SetupState.IDLE)
         try:
-            gopro_obj = WirelessGoPro(target=gopro_target, enable_wifi=False)
-            await gopro_obj.open(retries=100)
-            await gopro_obj.ble_command.set_shutter(shutter=constants.Toggle.DISABLE)
+            await self._discover(gopro_target)
+            with self.metrics.timed('stop', gopro_target):
+                async with self.pool.session(gopro_target) as gopro_obj:
+                    await gopro_obj.ble_command.set_shutter(shutter=constants.Toggle.DISABLE)
+            self.metrics.count('stops', gopro_target)
         except Exception as e:
+            self.metrics.count('stops', gopro_target, 'error')
             self.log(f"Error stopping livestream for {gopro_target}: {e}")
+            await self.pool.release(gopro_target)
         finally:
-            await gopro_obj.close()
             self.log(f"{gopro_target}: Livestream has been stopped.")
         return
 
-    def run_script_on_server(self, action: str, server_address: str, input_streams: Optional[List[str]] = None, output_stream: Optional[str] = None):
+    async def media_endpoint(self, gopro_target: str) -> MediaEndpoint:
+        """
+        Ask a camera over BLE where its media API can be reached on the Wi-Fi network.
+
+        The camera serves its media over HTTPS once it is provisioned for camera on the home
+        network (COHN), with the address, credentials and certificate it reports here. The relay
+        does not provision cameras, those that are not need a "media_url" in the config.
+
+        :param gopro_target: The target GoPro device.
+        :return: The camera's media endpoint.
+        :raises HarvestError: If the camera is not provisioned for COHN or not on the network.
+        """
+        current_camera.set(gopro_target)
+        await self._discover(gopro_target)
+        with self.metrics.timed('media_endpoint', gopro_target):
+            async with self.pool.session(gopro_target) as gopro_obj:
+                response = await gopro_obj.ble_command.cohn_get_status(register=False)
+                status = response.data
+                if not response.ok or not isinstance(status, proto.NotifyCOHNStatus) or status.status != proto.EnumCOHNStatus.COHN_PROVISIONED:
+                    raise HarvestError(f"{gopro_target} is not provisioned for camera on the home network (COHN), "
+                                       f"set \"media_url\" for it in the config")
+                if not status.ipaddress:
+                    raise HarvestError(f"{gopro_target} is provisioned for camera on the home network but not connected to it, "
+                                       f"set \"media_url\" for it in the config")
+                certificate = (await gopro_obj.ble_command.cohn_get_certificate()).data
+        return MediaEndpoint(f"https://{status.ipaddress}", (status.username, status.password),
+                             certificate.cert if isinstance(certificate, proto.ResponseCOHNCert) else None)
+
+    async def close(self) -> None:
+        """
+        Close every open camera connection and server connection.
+
+        :return: None
+        """
+        await self.pool.close_all()
+        self.control.close()
+
+    async def run_script_on_server(self, action: str, server_address: str, input_streams: Optional[List[str]] = None, output_stream: Optional[str] = None) -> ServerResult:
         """
         Run a Python script on the server with optional arguments.
 
@@ -99,23 +453,305 @@ class GoProManager:
         :param server_address: The address of the server.
         :param input_streams: Optional list of input streams.
         :param output_stream: Optional output stream.
+        :return: The structured result of the request.
+        """
+        result = await self.control.run_script(action, server_address, input_streams, output_stream)
+        outcome = 'ok' if result.ok else 'error'
+        self.metrics.observe(f'server_{action}', 'server', result.elapsed, outcome)
+        self.metrics.count('server_requests', 'server', outcome)
+        if result.error is not None:
+            self.log(f"Failed to connect to server: {result.error}")
+        elif result.ok:
+            self.log(f"Script output: {result.text}")
+        else:
+            self.log(f"Error: {result.status_code}\n{result.text}")
+        return result
+
+
+class FleetCamera(NamedTuple):
+    """
+    A camera to bring up with the FleetScheduler.
+    """
+    name: str
+    target: str
+    priority: int = 0
+    # The relay this camera streams to, instead of the server passed to the scheduler
+    server: Optional[str] = None
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for per-camera setup retries.
+    """
+    def __init__(self, attempts: int = 5, base_delay: float = 1.0, max_delay: float = 30.0, jitter: float = 0.5):
+        """
+        Initialize the retry policy.
+
+        :param attempts: Total number of setup attempts per camera.
+        :param base_delay: Delay in seconds before the first retry.
+        :param max_delay: Upper bound for the delay between attempts.
+        :param jitter: Fraction of each delay that is randomized, so cameras do not retry in lockstep.
+        """
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        """
+        Get the delay to wait after a failed attempt.
+
+        :param attempt: The zero-based index of the attempt that failed.
+        :return: The delay in seconds.
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return delay * (1 - self.jitter * random.random())
+
+
+class FleetReport:
+    """
+    The outcome of bringing up a fleet of cameras.
+    """
+    def __init__(self):
+        """
+        Initialize an empty report, starting the bring-up clock.
+        """
+        self.setups: Dict[str, List[CameraSetup]] = {}
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.peak_handshakes = 0
+
+    def add(self, setup: CameraSetup) -> None:
+        """
+        Record a finished setup attempt.
+
+        :param setup: The camera's setup state machine after the attempt.
         :return: None
         """
-        try:
-            # Construct the query parameters
-            query_params = f'action={action}'
-            if input_streams:
-                for i, stream in enumerate(input_streams):
-                    if stream:  # Validate non-empty stream
-                        query_params += f'&input{i}={stream}'
-            if output_stream:
-                query_params += f'&output={output_stream}'
-            
-            # Send the request to the server
-            response = requests.get(f'http://{server_address}:8080?{query_params}')
-            if response.status_code == 200:
-                self.log(f"Script output: {response.text}")
-            else:
-                self.log(f"Error: {response.status_code}\n{response.text}")
-        except requests.exceptions.RequestException as e:
-            self.log(f"Failed to connect to server: {e}")
\ No newline at end of file
+        self.setups.setdefault(setup.target, []).append(setup)
+
+    @property
+    def elapsed(self) -> float:
+        """
+        Get the wall-clock duration of the bring-up.
+
+        :return: The duration in seconds.
+        """
+        return (self.finished or time.monotonic()) - self.started
+
+    def final_states(self) -> Dict[str, SetupState]:
+        """
+        Get the state each camera ended in after its last attempt.
+
+        :return: A mapping of gopro_target to SetupState.
+        """
+        return {target: attempts[-1].state for target, attempts in self.setups.items()}
+
+    def streaming(self) -> List[str]:
+        """
+        Get the cameras that ended up streaming.
+
+        :return: A list of gopro_target identifiers.
+        """
+        return [target for target, state in self.final_states().items() if state == SetupState.STREAMING]
+
+    def armed(self) -> List[str]:
+        """
+        Get the cameras that ended up armed, holding a READY livestream.
+
+        :return: A list of gopro_target identifiers.
+        """
+        return [target for target, state in self.final_states().items() if state == SetupState.READY]
+
+    def phase_totals(self) -> Dict[SetupState, float]:
+        """
+        Get the time spent in each phase, summed across all cameras and attempts.
+
+        :return: A mapping of SetupState to seconds.
+        """
+        totals: Dict[SetupState, float] = {}
+        for attempts in self.setups.values():
+            for setup in attempts:
+                for state, duration in setup.phase_durations().items():
+                    if state != SetupState.IDLE:
+                        totals[state] = totals.get(state, 0.0) + duration
+        return totals
+
+    def summary(self) -> str:
+        """
+        Build a human readable summary of the bring-up.
+
+        :return: The summary text.
+        """
+        attempts = sum(len(a) for a in self.setups.values())
+        armed = self.armed()
+        done = f"Armed {len(armed)}" if armed else f"Brought up {len(self.streaming())}"
+        lines = [f"{done}/{len(self.setups)} cameras in {self.elapsed:.1f}s "
+                 f"({attempts} attempts, peak {self.peak_handshakes} concurrent BLE handshakes)"]
+        for state, total in self.phase_totals().items():
+            lines.append(f"  {state.value}: {total:.1f}s total, {total / len(self.setups):.1f}s per camera")
+        return "\n".join(lines)
+
+
+class GoLiveReport:
+    """
+    When each armed camera was triggered and started streaming during go_live.
+    """
+    def __init__(self):
+        """
+        Initialize an empty report, starting the go live clock.
+        """
+        self.started = time.monotonic()
+        self.triggered: Dict[str, float] = {}
+        self.streaming: Dict[str, float] = {}
+        self.failed: Dict[str, str] = {}
+
+    @staticmethod
+    def _spread(times: Dict[str, float]) -> Optional[float]:
+        return max(times.values()) - min(times.values()) if times else None
+
+    @property
+    def trigger_spread(self) -> Optional[float]:
+        """
+        Get the time between the first and the last camera acknowledging the shutter.
+
+        :return: The spread in seconds, or None if no camera was triggered.
+        """
+        return self._spread(self.triggered)
+
+    @property
+    def streaming_spread(self) -> Optional[float]:
+        """
+        Get the time between the first and the last camera reporting STREAMING.
+
+        :return: The spread in seconds, or None if no camera started streaming.
+        """
+        return self._spread(self.streaming)
+
+    @property
+    def trigger_latency(self) -> Optional[float]:
+        """
+        Get the time from go live until the last camera acknowledged the shutter.
+
+        :return: The latency in seconds, or None if no camera was triggered.
+        """
+        return max(self.triggered.values()) - self.started if self.triggered else None
+
+    def summary(self) -> str:
+        """
+        Build a human readable summary of the go live.
+
+        :return: The summary text.
+        """
+        if not self.triggered:
+            return f"No camera went live ({len(self.failed)} failed)"
+        text = (f"{len(self.streaming)} cameras live, {len(self.failed)} failed: shutter within {self.trigger_latency * 1000:.0f}ms, "
+                f"trigger spread {self.trigger_spread * 1000:.0f}ms")
+        if self.streaming:
+            text += f", streaming spread {self.streaming_spread * 1000:.0f}ms"
+        return text
+
+
+class FleetScheduler:
+    """
+    Bring up many GoPros at once without overloading the host BLE adapter.
+
+    Only ``max_handshakes`` cameras scan, connect and pair at the same time, while the
+    Wi-Fi and RTMP phases of connected cameras overlap freely. Higher priority cameras
+    get handshake slots first and failed cameras are retried with exponential backoff.
+    With an access point plan, each attempt joins the camera's planned network and a
+    camera that fails to join is moved to another one for its next attempt.
+    """
+    def __init__(self, manager: GoProManager, max_handshakes: int = 3, retry: Optional[RetryPolicy] = None,
+                 planner: Optional[BitratePlanner] = None, access_points: Optional[AccessPointPlan] = None):
+        """
+        Initialize the fleet scheduler.
+
+        :param manager: The GoProManager used to set up each camera.
+        :param max_handshakes: How many BLE connections may be opened concurrently.
+        :param retry: The retry policy for failed cameras.
+        :param planner: Optional bitrate planner sharing the uplink between cameras.
+        :param access_points: Optional plan spreading cameras across several Wi-Fi networks.
+        """
+        self.manager = manager
+        self.max_handshakes = max_handshakes
+        self.retry = retry or RetryPolicy()
+        self.access_points = access_points
+        self.planner: Optional[BitratePlanner] = None
+        self.set_planner(planner)
+
+    def set_planner(self, planner: Optional[BitratePlanner]) -> None:
+        """
+        Replace the bitrate planner, re-planning as cameras join or leave.
+
+        :param planner: The new planner, or None to use the default bitrates.
+        :return: None
+        """
+        if self.planner is not None:
+            self.manager.state_listeners.remove(self.planner.on_state_change)
+        self.planner = planner
+        if planner is not None:
+            self.manager.state_listeners.append(planner.on_state_change)
+
+    async def bring_up(self, cameras: List[FleetCamera], ssid: str, password: str, server_address: str, encode: bool = False,
+                       arm: bool = False, reconcile: bool = False) -> FleetReport:
+        """
+        Set up every camera to stream, or only arm them for GoProManager.go_live.
+
+        :param cameras: The cameras to bring up.
+        :param ssid: The SSID of the Wi-Fi network.
+        :param password: The password of the Wi-Fi network.
+        :param server_address: The address of the streaming server.
+        :param encode: Whether to save the stream to gopro sd card or not.
+        :param arm: Whether to stop every camera once its livestream is READY.
+        :param reconcile: Whether to only run the setup steps each camera is missing.
+        :return: A report of the final state and phase timings of every camera.
+        """
+        pool = self.manager.pool
+        pool.max_handshakes = self.max_handshakes
+        pool.peak_handshakes = pool.active_handshakes
+        report = FleetReport()
+        if self.planner is not None:
+            self.planner.expect(camera.name for camera in cameras)
+        # Handshake slots are handed out in FIFO order, so starting the highest priority
+        # cameras first gives them the first slots.
+        ordered = sorted(cameras, key=lambda camera: -camera.priority)
+        await asyncio.gather(*(self.bring_up_camera(camera, ssid, password, server_address, encode, report, arm, reconcile)
+                               for camera in ordered))
+        report.finished = time.monotonic()
+        report.peak_handshakes = pool.peak_handshakes
+        self.manager.log(report.summary())
+        return report
+
+    async def bring_up_camera(self, camera: FleetCamera, ssid: str, password: str, server_address: str, encode: bool = False,
+                              report: Optional[FleetReport] = None, arm: bool = False, reconcile: bool = False) -> CameraSetup:
+        """
+        Set up one camera, retrying with backoff until it streams or attempts run out.
+
+        :param camera: The camera to bring up.
+        :param ssid: The SSID of the Wi-Fi network, unless the access point plan places the camera.
+        :param password: The password of the Wi-Fi network, unless the access point plan places the camera.
+        :param server_address: The address of the streaming server, unless the camera has its own.
+        :param encode: Whether to save the stream to gopro sd card or not.
+        :param report: Optional report to record each attempt in.
+        :param arm: Whether to stop once the livestream is READY.
+        :param reconcile: Whether to only run the setup steps the camera is missing.
+        :return: The camera's setup state machine after the last attempt.
+        """
+        # A reconciled camera that already streams stays streaming, even when arming
+        done = {SetupState.READY, SetupState.STREAMING} if arm else {SetupState.STREAMING}
+        for attempt in range(self.retry.attempts):
+            profile = self.planner.profile(camera.name) if self.planner is not None else DEFAULT_PROFILE
+            network = self.access_points.credentials(camera.name, profile.maximum) if self.access_points is not None else (ssid, password)
+            setup = await self.manager.setup_gopro(camera.name, camera.target, *network, camera.server or server_address,
+                                                   encode, profile, arm, reconcile)
+            if report is not None:
+                report.add(setup)
+            if self.access_points is not None and setup.failed_in == SetupState.JOINING_AP:
+                self.access_points.move(camera.name, "Joining failed")
+            if setup.state in done or attempt + 1 == self.retry.attempts:
+                return setup
+            delay = self.retry.delay(attempt)
+            self.manager.metrics.count('retries', camera.target)
+            self.manager.log(f"{camera.target}: Retrying setup in {delay:.1f}s (attempt {attempt + 2}/{self.retry.attempts})")
+            await asyncio.sleep(delay)
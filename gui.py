@@ -1,21 +1,34 @@
 import sys
 import os
+import time
+
+# Process start, as far as Python can tell, for the startup probe
+STARTED = time.monotonic()
 
 if sys.stdout is None:
     sys.stdout = open(os.devnull, "w")
 if sys.stderr is None:
     sys.stderr = open(os.devnull, "w")
 os.environ["LANG"] = "en_US.UTF-8"
-import asyncio
 import threading
 import json
 from pathlib import Path
-from tkinter import Tk, Frame, Label, Entry, Button, Text, filedialog, Checkbutton, BooleanVar
-from rich.console import Console
-from open_gopro.logger import setup_logging
-from gopro_manager import GoProManager
+from collections import deque
+from tkinter import Tk, Frame, Label, Entry, Button, Text, filedialog, Checkbutton, BooleanVar, OptionMenu, StringVar
+from log_pipeline import LogPipeline
+from roster import RosterTable, load_roster
+from runtime import RelayRuntime
+
+# The camera stack (open_gopro, bleak and relay_controller) is not imported here: it takes
+# longer to load than the whole UI, so it is imported in the background once the window
+# is shown, or by the first camera action if that comes sooner.
 
-console = Console()  # rich console printer
+# Set to print startup timings and exit once the camera stack is loaded, see tests/benchmark_startup.py
+STARTUP_PROBE_ENV = "GOPRO_RELAY_STARTUP_PROBE"
+
+ALL_CAMERAS = "All cameras"
+MAX_LOG_LINES = 2000  # Oldest lines are dropped from the console output past this
+LOG_DRAIN_INTERVAL_MS = 100
 
 class GoProApp(Tk):
     """
@@ -26,10 +39,20 @@ class GoProApp(Tk):
         Initialize the GoProApp GUI.
         """
         super().__init__()
-        self.mymanager = GoProManager(self.log)
+        self.log_pipeline = LogPipeline()
+        self.log_records = deque(maxlen=MAX_LOG_LINES)
+        self._controller = None
+        self._controller_lock = threading.Lock()
+        self._warm_up = None
+        self.ui_ready = None
+        self.stack_ready = None
         self.title("GoPro Streaming Setup")
-        self.geometry("700x500")
-        self.gopro_blocks = []
+        self.geometry("800x700")
+        # One long-lived thread runs every camera command, so connections are reused across clicks
+        self.runtime = RelayRuntime(self.log)
+        # Settings of the last loaded configuration, kept apart from Tk.config which configures the window
+        self.loaded_config = {}
+        self.last_config_path = None
 
         # Add a BooleanVar to track the state of the "Save to GoPro" checkbox
         self.save_to_gopro_var = BooleanVar(value=False)
@@ -57,11 +80,37 @@ class GoProApp(Tk):
         self.save_to_gopro_checkbox = Checkbutton(self, text="Save to GoPro", variable=self.save_to_gopro_var)
         self.save_to_gopro_checkbox.grid(row=3, column=0, sticky='w')
 
-        self.gopro_frame = Frame(self)
-        self.gopro_frame.grid(row=4, column=0, columnspan=2, sticky='w')
-
-        self.add_gopro_button = Button(self, text="Add GoPro", command=self.add_gopro_block)
-        self.add_gopro_button.grid(row=5, column=0, sticky='w')
+        # Uplink budget shared by all cameras, used to plan per-camera bitrates
+        self.uplink_frame = Frame(self)
+        self.uplink_frame.grid(row=3, column=1, sticky='w')
+        self.uplink_label = Label(self.uplink_frame, text="Uplink (kbps):")
+        self.uplink_label.pack(side='left')
+        self.uplink_entry = Entry(self.uplink_frame, width=8)
+        self.uplink_entry.pack(side='left')
+
+        # Scrollable roster of every camera with its live state
+        self.roster = RosterTable(self, on_change=self.update_start_button_state)
+        self.roster.grid(row=4, column=0, columnspan=2, sticky='we')
+
+        self.roster_controls = Frame(self)
+        self.roster_controls.grid(row=5, column=0, columnspan=2, sticky='w')
+        Label(self.roster_controls, text="Stream Key:").pack(side='left')
+        self.new_name_entry = Entry(self.roster_controls, width=12)
+        self.new_name_entry.pack(side='left')
+        Label(self.roster_controls, text="GoPro Target:").pack(side='left')
+        self.new_target_entry = Entry(self.roster_controls, width=12)
+        self.new_target_entry.pack(side='left')
+        self.new_target_entry.bind("<Return>", lambda event: self.add_gopro())
+        self.add_gopro_button = Button(self.roster_controls, text="Add GoPro", command=self.add_gopro)
+        self.add_gopro_button.pack(side='left')
+        self.remove_gopro_button = Button(self.roster_controls, text="Remove Selected", command=self.roster.remove_selected)
+        self.remove_gopro_button.pack(side='left')
+        self.import_button = Button(self.roster_controls, text="Import Cameras", command=self.import_cameras)
+        self.import_button.pack(side='left')
+        self.restart_button = Button(self.roster_controls, text="Restart Selected", command=self.restart_selected)
+        self.restart_button.pack(side='left')
+        self.harvest_button = Button(self.roster_controls, text="Harvest Media", command=self.harvest_media)
+        self.harvest_button.pack(side='left')
 
         self.start_button = Button(self, text="Start Streaming", command=self.to_streaming)
         self.start_button.grid(row=6, column=0, sticky='w')
@@ -71,6 +120,15 @@ class GoProApp(Tk):
         self.stop_button.grid(row=6, column=0, sticky='w')
         self.stop_button.grid_remove()  # Initially hide the stop button
 
+        # Two-stage start: arm every camera up to a READY livestream, then go live on all at once
+        self.arm_button = Button(self, text="Arm Cameras", command=lambda: self.to_streaming(arm=True))
+        self.arm_button.grid(row=6, column=1, sticky='w')
+        self.arm_button.config(state='disabled')
+
+        self.go_live_button = Button(self, text="Go Live", command=self.to_live)
+        self.go_live_button.grid(row=6, column=1, sticky='w')
+        self.go_live_button.grid_remove()
+
         self.save_button = Button(self, text="Save Config", command=self.save_config)
         self.save_button.grid(row=7, column=0, sticky='w')
 
@@ -80,67 +138,145 @@ class GoProApp(Tk):
         self.console_output = Text(self, height=10)
         self.console_output.grid(row=8, column=0, columnspan=2, sticky='w')
 
+        # Show the log of a single camera, or of all of them
+        self.log_filter_var = StringVar(value=ALL_CAMERAS)
+        self.log_filter_var.trace_add("write", lambda *args: self.render_log())
+        self.log_filter_targets = []
+        self.log_filter_menu = OptionMenu(self, self.log_filter_var, ALL_CAMERAS)
+        self.log_filter_menu.grid(row=9, column=0, sticky='w')
+
+        self.metrics_button = Button(self, text="Save Metrics", command=self.save_metrics)
+        self.metrics_button.grid(row=9, column=1, sticky='w')
+
+        self.health_label = Label(self, text="Stream Health:")
+        self.health_label.grid(row=10, column=0, sticky='w')
+        self.health_output = Text(self, height=5)
+        self.health_output.grid(row=11, column=0, columnspan=2, sticky='w')
+
         # Bind the window close event to the on_closing method
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
         # Automatically load the last saved configuration
         self.load_last_config()
 
-    def add_gopro_block(self, name: str = "", target: str = "") -> None:
-        """
-        Add a new GoPro block to the UI for entering GoPro details.
+        self.refresh_states()
+        self.drain_logs()
+        self.after_idle(self.warm_up)
 
-        :param name: The name of the GoPro stream.
-        :param target: The target GoPro device.
-        :return: None
+    @property
+    def controller(self):
         """
-        gopro_block = Frame(self.gopro_frame)
-        gopro_block.pack(pady=5)
-
-        gopro_name_label = Label(gopro_block, text="Stream Key:")
-        gopro_name_label.pack(side='left')
+        Get the relay controller, importing the camera stack first if the warm-up has not yet.
 
-        gopro_name_entry = Entry(gopro_block)
-        gopro_name_entry.pack(side='left')
-        gopro_name_entry.insert(0, name)
+        :return: The RelayController.
+        """
+        with self._controller_lock:
+            if self._controller is None:
+                from relay_controller import RelayController
+                self._controller = RelayController(self.log)
+            return self._controller
 
-        gopro_target_label = Label(gopro_block, text="GoPro Target:")
-        gopro_target_label.pack(side='left')
+    def warm_up(self) -> None:
+        """
+        Import the camera stack on a background thread, so the first camera action does not wait for it.
 
-        gopro_target_entry = Entry(gopro_block)
-        gopro_target_entry.pack(side='left')
-        gopro_target_entry.insert(0, target)
+        :return: None
+        """
+        self.ui_ready = time.monotonic()
+        if self._warm_up is None:
+            self._warm_up = threading.Thread(target=self._import_camera_stack, name="gopro-warm-up", daemon=True)
+            self._warm_up.start()
 
-        remove_button = Button(gopro_block, text="X", command=lambda: self.remove_gopro_block(gopro_block))
-        remove_button.pack(side='left')
+    def _import_camera_stack(self) -> None:
+        """
+        Import relay_controller with open_gopro and the BLE libraries, and set up their logging.
 
-        self.gopro_blocks.append((gopro_block, gopro_name_entry, gopro_target_entry, remove_button))
-        self.update_start_button_state()
+        :return: None
+        """
+        started = time.monotonic()
+        import relay_controller  # noqa: F401
+        from open_gopro.logger import setup_logging
+        setup_logging(__name__, None)  # You can modify logging as needed
+        self.stack_ready = time.monotonic()
+        self.log(f"Camera stack loaded in {self.stack_ready - started:.1f}s")
+
+    def add_gopro(self) -> None:
+        """
+        Add the camera typed into the add form to the roster.
 
-    def remove_gopro_block(self, gopro_block: Frame) -> None:
+        :return: None
+        """
+        name, target = self.new_name_entry.get().strip(), self.new_target_entry.get().strip()
+        if not name or not target:
+            self.log("Enter both a stream key and a GoPro target to add a camera")
+            return
+        if not self.roster.add_camera({'name': name, 'target': target}):
+            self.log(f"{target} is already in the roster")
+            return
+        self.new_name_entry.delete(0, 'end')
+        self.new_target_entry.delete(0, 'end')
+
+    def import_cameras(self) -> None:
         """
-        Remove a GoPro block from the UI and the list of GoPro blocks.
+        Add the cameras of a CSV or JSON file to the roster, keeping the ones already there.
 
-        :param gopro_block: The GoPro block to remove.
         :return: None
         """
-        for block in self.gopro_blocks:
-            if block[0] == gopro_block:
-                self.gopro_blocks.remove(block)
-                break
-        gopro_block.destroy()
-        self.update_start_button_state()
+        file_path = filedialog.askopenfilename(filetypes=[("Camera lists", "*.csv *.json"), ("CSV files", "*.csv"), ("JSON files", "*.json")])
+        if not file_path:
+            return
+        try:
+            imported = load_roster(file_path)
+        except (OSError, ValueError, KeyError) as e:
+            self.log(f"Failed to import cameras: {e}")
+            return
+        imported_targets = {camera['target'] for camera in imported}
+        cameras = [camera for camera in self.roster.cameras() if camera['target'] not in imported_targets] + imported
+        diff = self.roster.set_cameras(cameras)
+        self.log(f"Imported {len(imported)} cameras from {file_path} ({len(diff.added)} new, {len(diff.changed)} updated)")
 
     def update_start_button_state(self) -> None:
         """
-        Enable or disable the start button based on the number of GoPro blocks and input fields.
+        Enable or disable the start button based on the number of cameras and input fields.
 
         :return: None
         """
-        if self.gopro_blocks and self.ssid_entry.get() and self.password_entry.get() and self.server_ip_entry.get():
+        if self.roster.rows and self.ssid_entry.get() and self.password_entry.get() and self.server_ip_entry.get():
             self.start_button.config(state='normal')
+            self.arm_button.config(state='normal')
         else:
             self.start_button.config(state='disabled')
+            self.arm_button.config(state='disabled')
+
+    def refresh_states(self) -> None:
+        """
+        Show each GoPro's current setup state and health in the roster and the stream health
+        dashboard, and schedule the next refresh.
+
+        :return: None
+        """
+        targets = self.roster.targets()
+        self.update_log_filter(targets)
+        if self._controller is None:
+            # Nothing to show before the first camera action
+            self.after(500, self.refresh_states)
+            return
+        health = {h.target: h.describe().split(": ", 1)[-1] for h in self.controller.monitor.snapshot()}
+        self.roster.update_status({target: (self.controller.manager.get_state(target).value, health.get(target, ''))
+                                   for target in targets})
+
+        lines = [health.describe() for health in self.controller.monitor.snapshot()]
+        mttr = self.controller.monitor.mean_time_to_recover()
+        if mttr is not None:
+            lines.append(f"Mean time to recover a dropped feed: {mttr:.1f}s")
+        phase_means = self.controller.manager.metrics.phase_means()
+        if phase_means:
+            lines.append("Mean phase times: " + ", ".join(f"{phase} {mean:.1f}s" for phase, mean in sorted(phase_means.items())))
+        health_text = "\n".join(lines)
+        if self.health_output.get("1.0", "end-1c") != health_text:
+            self.health_output.delete("1.0", "end")
+            self.health_output.insert("end", health_text)
+        self.after(500, self.refresh_states)
 
     def hide_start_button(self) -> None:
         """
@@ -149,10 +285,12 @@ class GoProApp(Tk):
         :return: None
         """
         self.start_button.grid_remove()  # Hide the start button
+        self.arm_button.grid_remove()
         self.stop_button.grid()  # Show the stop button
-        self.add_gopro_button.config(state='disabled')  # Disable the add GoPro button
-        for _, _, _, remove_button in self.gopro_blocks:
-            remove_button.pack_forget()  # Hide the remove buttons
+        # Freeze the roster while streaming
+        for button in (self.add_gopro_button, self.remove_gopro_button, self.import_button):
+            button.config(state='disabled')
+        self.roster.set_editable(False)
 
     def show_start_button(self) -> None:
         """
@@ -161,51 +299,108 @@ class GoProApp(Tk):
         :return: None
         """
         self.stop_button.grid_remove()  # Hide the stop button
+        self.go_live_button.grid_remove()
         self.start_button.grid()  # Show the start button
-        self.add_gopro_button.config(state='normal')  # Enable the add GoPro button
-        for _, _, _, remove_button in self.gopro_blocks:
-            remove_button.pack(side='left')  # Show the remove buttons
+        self.arm_button.grid()
+        for button in (self.add_gopro_button, self.remove_gopro_button, self.import_button):
+            button.config(state='normal')
+        self.roster.set_editable(True)
     
-    def to_streaming(self, stream: bool = True) -> None:
+    def to_streaming(self, stream: bool = True, arm: bool = False):
         """
-        Start the streaming in a new thread to avoid blocking the Tkinter event loop.
+        Queue a start or stop on the runtime thread to avoid blocking the Tkinter event loop.
+
+        It supersedes a start or stop still in progress, so Stop pressed during a slow Start
+        cancels the start's camera setups instead of racing them.
 
         :param stream: Boolean indicating whether to start or stop streaming.
+        :param arm: Whether to only arm the cameras when starting.
+        :return: A concurrent future for the submitted work.
+        """
+        action = 'arm' if arm else 'start' if stream else 'stop'
+        # Widgets are only touched here on the Tk thread, main runs on the runtime thread
+        config = self.build_config()
+        if stream:
+            self.hide_start_button()
+        else:
+            self.show_start_button()
+        return self.runtime.submit(action, lambda: self.main(config, stream, arm))
+
+    def to_live(self):
+        """
+        Queue starting the stream on every armed camera at once, after an arm still in progress.
+
+        :return: A concurrent future for the submitted work.
+        """
+        self.go_live_button.grid_remove()
+        return self.runtime.submit('live', self.controller.go_live, supersede=False)
+
+    def restart_selected(self) -> None:
+        """
+        Queue a restart of every camera selected in the roster, replacing earlier restarts of the same camera.
+
         :return: None
         """
-        threading.Thread(target=lambda: self._concurrent_stream(stream)).start()
-    
-    def _concurrent_stream(self, do_i_stream: bool = True) -> None:
+        controller = self.controller
+        for target in self.roster.tree.selection():
+            self.runtime.submit(f'restart {target}', lambda target=target: controller.restart_camera(target), scope=target)
+
+    def harvest_media(self):
+        """
+        Queue downloading the media recorded on every camera's SD card into a chosen directory.
+
+        A Start or Stop cancels it, the partial files are resumed by the next harvest.
+
+        :return: A concurrent future for the submitted work, or None if no directory was chosen.
+        """
+        destination = filedialog.askdirectory(title="Save camera media to")
+        if not destination:
+            return None
+        config = self.build_config()
+        return self.runtime.submit('harvest', lambda: self.controller.harvest(config, destination), supersede=False)
+
+    async def _shutdown(self) -> None:
         """
-        Start or stop the streaming concurrently.
+        Stop all streams and close camera connections, as the last command of the runtime.
 
-        :param do_i_stream: Boolean indicating whether to start or stop streaming.
         :return: None
         """
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        # Without a controller no camera was touched in this session
+        if self._controller is None:
+            return
         try:
-            loop.run_until_complete(self.main(do_i_stream))
+            # The window is gone by now, stop what was last started without reading any widget
+            if self.controller.config:
+                await self.controller.stop()
         finally:
-            loop.run_until_complete(loop.shutdown_asyncgens())
-            loop.close()    
+            await self.controller.close()
 
-    def save_config(self) -> None:
+    def build_config(self) -> dict:
         """
-        Save the current configuration to a JSON file.
+        Build the configuration from the UI, keeping settings that have no UI field
+        (such as per-camera bitrate overrides) from the last loaded configuration.
 
-        :return: None
+        :return: The configuration dictionary.
         """
-        config = {
+        uplink = self.uplink_entry.get().strip()
+        return {
+            **self.loaded_config,
             'ssid': self.ssid_entry.get(),
             'password': self.password_entry.get(),
             'server_ip': self.server_ip_entry.get(),
             'save_to_gopro': self.save_to_gopro_var.get(),
-            'gopros': [
-                {'name': gopro_name_entry.get(), 'target': gopro_target_entry.get()}
-                for _, gopro_name_entry, gopro_target_entry, _ in self.gopro_blocks
-            ]
+            'uplink_kbps': int(uplink) if uplink.isdigit() else None,
+            # Roster rows keep the extra settings each camera was loaded or imported with
+            'gopros': self.roster.cameras(),
         }
+
+    def save_config(self) -> None:
+        """
+        Save the current configuration to a JSON file.
+
+        :return: None
+        """
+        config = self.build_config()
         file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
         if file_path:
             with open(file_path, 'w') as f:
@@ -215,6 +410,18 @@ class GoProApp(Tk):
             with open('last_config.json', 'w') as f:
                 json.dump({'last_config': file_path}, f)
 
+    def save_metrics(self) -> None:
+        """
+        Save the phase timings and outcome counters as a JSON snapshot.
+
+        :return: None
+        """
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
+        if file_path:
+            with open(file_path, 'w') as f:
+                json.dump(self.controller.manager.metrics.snapshot(), f, indent=2)
+            self.log(f"Metrics saved to {file_path}")
+
     def load_config(self, file_path: str = None) -> None:
         """
         Load a configuration from a JSON file.
@@ -234,12 +441,14 @@ class GoProApp(Tk):
             self.server_ip_entry.delete(0, 'end')
             self.server_ip_entry.insert(0, config['server_ip'])
             self.save_to_gopro_var.set(config['save_to_gopro'])
-
-            for gopro_block, _, _, _ in self.gopro_blocks:
-                gopro_block.destroy()
-            self.gopro_blocks.clear()
-            for gopro in config['gopros']:
-                self.add_gopro_block(gopro['name'], gopro['target'])
+            self.uplink_entry.delete(0, 'end')
+            self.uplink_entry.insert(0, str(config.get('uplink_kbps') or ''))
+            self.loaded_config = config
+            self.log_pipeline.set_log_file(config.get('log_file'))
+
+            # Only the rows that differ from the loaded configuration are touched
+            self.roster.set_cameras(config['gopros'])
+            self.update_start_button_state()
             self.log(f"Configuration loaded from {file_path}")
             # Save the path of the last loaded configuration
             self.last_config_path = file_path
@@ -278,8 +487,7 @@ class GoProApp(Tk):
 
         :return: None
         """
-        if self.gopro_blocks:
-            self.to_streaming(False)
+        self.runtime.shutdown(self._shutdown)
         if self.last_config_path:
             base_path = self.get_base_path()
             last_config_path_file = os.path.join(base_path, 'last_config_path.txt')
@@ -292,65 +500,109 @@ class GoProApp(Tk):
         """
         Log messages to the console output text widget.
 
+        Safe to call from any thread: messages are queued and shown in batches by drain_logs.
+
         :param message: The message to log.
         :return: None
         """
-        self.console_output.insert("end", message + "\n")
+        self.log_pipeline(message)
+
+    def drain_logs(self) -> None:
+        """
+        Show queued log records in the console output, and schedule the next drain.
+
+        :return: None
+        """
+        records = self.log_pipeline.drain()
+        if records:
+            self.log_records.extend(records)
+            self.show_log_records([record for record in records if self.log_filter_matches(record)])
+        self.after(LOG_DRAIN_INTERVAL_MS, self.drain_logs)
+
+    def show_log_records(self, records: list) -> None:
+        """
+        Append log records to the console output, keeping at most MAX_LOG_LINES lines.
+
+        :param records: The records to show.
+        :return: None
+        """
+        if not records:
+            return
+        self.console_output.insert("end", "".join(record.format() + "\n" for record in records))
+        lines = int(self.console_output.index("end-1c").split(".")[0]) - 1
+        if lines > MAX_LOG_LINES:
+            self.console_output.delete("1.0", f"{lines - MAX_LOG_LINES + 1}.0")
         self.console_output.see("end")
 
-    async def main(self, stream: bool = True) -> None:
+    def log_filter_matches(self, record) -> bool:
+        """
+        Check whether a log record belongs to the camera selected in the log filter.
+
+        :param record: The log record.
+        :return: True if the record should be shown.
+        """
+        selected = self.log_filter_var.get()
+        return selected == ALL_CAMERAS or record.camera == selected
+
+    def render_log(self) -> None:
+        """
+        Redraw the console output for the selected log filter.
+
+        :return: None
+        """
+        self.console_output.delete("1.0", "end")
+        self.show_log_records([record for record in self.log_records if self.log_filter_matches(record)])
+
+    def update_log_filter(self, targets: list) -> None:
+        """
+        Offer the given camera targets in the log filter menu, if they changed.
+
+        :param targets: The configured GoPro targets.
+        :return: None
+        """
+        if targets == self.log_filter_targets:
+            return
+        self.log_filter_targets = targets
+        menu = self.log_filter_menu["menu"]
+        menu.delete(0, "end")
+        for choice in [ALL_CAMERAS] + targets:
+            menu.add_command(label=choice, command=lambda value=choice: self.log_filter_var.set(value))
+        if self.log_filter_var.get() not in [ALL_CAMERAS] + targets:
+            self.log_filter_var.set(ALL_CAMERAS)
+
+    async def main(self, config: dict, stream: bool = True, arm: bool = False) -> None:
         """
         Main function to handle starting or stopping streams for all GoPros.
 
+        Runs on the runtime thread, so widgets are only updated through the Tk event loop.
+
+        :param config: The configuration dictionary, built on the Tk thread.
         :param stream: Boolean indicating whether to start or stop streaming.
+        :param arm: Whether to only arm the cameras when starting.
         :return: None
         """
-        ssid = self.ssid_entry.get()
-        password = self.password_entry.get()
-        save_to_gopro = self.save_to_gopro_var.get()  # Get the checkbox value
-
-        # List of tasks for concurrent execution
-        tasks = []
-        for block in self.gopro_blocks:
-            if block is None:
-                self.log("Error: gopro_block is None")
-                continue
-            _, gopro_name_entry, gopro_target_entry, _ = block
-            if gopro_name_entry is None or gopro_target_entry is None:
-                self.log("Error: gopro_name_entry or gopro_target_entry is None")
-                continue
-            name = gopro_name_entry.get()
-            target = gopro_target_entry.get()
-            if stream:
-                self.hide_start_button()
-                self.log(f"Setting up GoPro: {name} with target: {target}")
-                tasks.append(self.mymanager.setup_gopro(name, target, ssid, password, self.server_ip_entry.get(), save_to_gopro))
-            else:
-                self.show_start_button()
-                self.log(f"Stopping live stream for GoPro: {target}")
-                tasks.append(self.mymanager.stop_live_stream(target))
-
-        # Run all tasks concurrently and handle exceptions
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        # Log any exceptions that occurred
-        for result in results:
-            if isinstance(result, Exception):
-                self.log(f"Task failed with exception: {result}")
-        # After all tasks are done running, request the server to run a specified python script
         if stream:
-            # Collect input streams and output stream
-            input_streams = [f"rtmp://{self.server_ip_entry.get()}/live/{gopro_name_entry.get()}" for _, gopro_name_entry, _, _ in self.gopro_blocks]
-            output_stream = f"rtmp://{self.server_ip_entry.get()}/live/output"
-            # Start stream script with arguments
-            self.log(f"Starting stream script on server with input streams: {input_streams} and output stream: {output_stream}")
-            self.mymanager.run_script_on_server(action='start', server_address=self.server_ip_entry.get(), input_streams=input_streams, output_stream=output_stream)
+            report = await self.controller.start(config, arm)
+            if arm and report.armed():
+                self.after(0, self.go_live_button.grid)
         else:
-            # Stop stream script
-            self.log(f"Stopping stream script on server")
-            self.mymanager.run_script_on_server(action='stop', server_address=self.server_ip_entry.get())
+            await self.controller.stop(config)
+
+    def report_startup(self) -> None:
+        """
+        Print how long the window and the camera stack took to be ready, then quit. Used by the startup benchmark.
+
+        :return: None
+        """
+        if self.stack_ready is None:
+            self.after(10, self.report_startup)
+            return
+        print(f"ui_ready {self.ui_ready - STARTED:.3f}", flush=True)
+        print(f"stack_ready {self.stack_ready - STARTED:.3f}", flush=True)
+        self.destroy()
 
 if __name__ == "__main__":
-    setup_logging(__name__, None)  # You can modify logging as needed
     app = GoProApp()
+    if os.environ.get(STARTUP_PROBE_ENV):
+        app.after_idle(app.report_startup)
     app.mainloop()
\ No newline at end of file
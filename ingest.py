@@ -0,0 +1,320 @@
+import asyncio
+import os
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from metrics import Metrics
+
+# Default port of an RTMP ingest server
+RTMP_PORT = 1935
+
+# Size of the C1/S1 and C2/S2 handshake packets
+HANDSHAKE_SIZE = 1536
+
+# RTMP message types used by the probe
+SET_CHUNK_SIZE = 1
+AUDIO = 8
+VIDEO = 9
+COMMAND_AMF0 = 20
+
+# A probe plays a stream and returns once its first audio or video packet arrived
+Probe = Callable[[str, float], Awaitable[None]]
+
+
+class IngestError(Exception):
+    """
+    The ingest server refused to play a stream.
+    """
+
+
+class IngestTimeout(Exception):
+    """
+    A stream did not arrive at its ingest server before the verifier gave up.
+    """
+
+
+def amf_encode(*values: Any) -> bytes:
+    """
+    Encode values in AMF0.
+
+    :param values: Numbers, booleans, strings, dictionaries or None.
+    :return: The encoded values.
+    """
+    out = bytearray()
+    for value in values:
+        if value is None:
+            out.append(0x05)
+        elif isinstance(value, bool):
+            out += bytes([0x01, value])
+        elif isinstance(value, (int, float)):
+            out += b'\x00' + struct.pack('>d', value)
+        elif isinstance(value, str):
+            data = value.encode()
+            out += b'\x02' + struct.pack('>H', len(data)) + data
+        elif isinstance(value, dict):
+            out.append(0x03)
+            for key, item in value.items():
+                data = key.encode()
+                out += struct.pack('>H', len(data)) + data + amf_encode(item)
+            out += b'\x00\x00\x09'
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__} in AMF0")
+    return bytes(out)
+
+
+def amf_decode(data: bytes) -> List[Any]:
+    """
+    Decode the AMF0 values of a command message.
+
+    :param data: The encoded values.
+    :return: The decoded values.
+    """
+    values = []
+    position = 0
+
+    def read(size: int) -> bytes:
+        nonlocal position
+        chunk = data[position:position + size]
+        if len(chunk) < size:
+            raise IngestError("Truncated AMF0 data")
+        position += size
+        return chunk
+
+    def string() -> str:
+        return read(struct.unpack('>H', read(2))[0]).decode(errors='replace')
+
+    def value() -> Any:
+        marker = read(1)[0]
+        if marker == 0x00:
+            return struct.unpack('>d', read(8))[0]
+        if marker == 0x01:
+            return read(1)[0] != 0
+        if marker == 0x02:
+            return string()
+        if marker in (0x03, 0x08):
+            if marker == 0x08:
+                read(4)  # ECMA array count, the end marker is authoritative
+            result = {}
+            while True:
+                key = string()
+                if not key and data[position:position + 1] == b'\x09':
+                    read(1)
+                    return result
+                result[key] = value()
+        if marker in (0x05, 0x06):
+            return None
+        raise IngestError(f"Unsupported AMF0 marker {marker:#x}")
+
+    while position < len(data):
+        values.append(value())
+    return values
+
+
+def encode_message(csid: int, type_id: int, stream_id: int, payload: bytes, chunk_size: int = 128) -> bytes:
+    """
+    Split a message into RTMP chunks.
+
+    :param csid: The chunk stream id, below 64.
+    :param type_id: The message type.
+    :param stream_id: The message stream id.
+    :param payload: The message payload.
+    :param chunk_size: The chunk size the peer expects.
+    :return: The chunks.
+    """
+    out = bytearray([csid])
+    out += bytes(3) + len(payload).to_bytes(3, 'big') + bytes([type_id]) + stream_id.to_bytes(4, 'little')
+    for offset in range(0, len(payload), chunk_size):
+        if offset:
+            out.append(0xC0 | csid)
+        out += payload[offset:offset + chunk_size]
+    return bytes(out)
+
+
+class ChunkReader:
+    """
+    Reassemble RTMP messages from the chunks read from a connection.
+    """
+    def __init__(self, reader: asyncio.StreamReader):
+        """
+        Initialize the chunk reader.
+
+        :param reader: The connection to read from.
+        """
+        self.reader = reader
+        self.chunk_size = 128
+        # Header fields and partial payload of every chunk stream
+        self.streams: Dict[int, Dict[str, Any]] = {}
+
+    async def message(self) -> Tuple[int, int, bytes]:
+        """
+        Read the next complete message. Set Chunk Size messages are applied as they arrive.
+
+        :return: The message type, message stream id and payload.
+        """
+        read = self.reader.readexactly
+        while True:
+            first = (await read(1))[0]
+            fmt, csid = first >> 6, first & 0x3F
+            if csid == 0:
+                csid = 64 + (await read(1))[0]
+            elif csid == 1:
+                extra = await read(2)
+                csid = 64 + extra[0] + extra[1] * 256
+            state = self.streams.setdefault(csid, {'length': 0, 'type': 0, 'stream': 0, 'extended': False, 'payload': bytearray()})
+            if fmt < 3:
+                header = await read((11, 7, 3)[fmt])
+                if fmt < 2:
+                    state['length'] = int.from_bytes(header[3:6], 'big')
+                    state['type'] = header[6]
+                if fmt == 0:
+                    state['stream'] = int.from_bytes(header[7:11], 'little')
+                state['extended'] = header[:3] == b'\xff\xff\xff'
+            if state['extended']:
+                await read(4)
+            payload = state['payload']
+            payload += await read(min(self.chunk_size, state['length'] - len(payload)))
+            if len(payload) == state['length']:
+                state['payload'] = bytearray()
+                if state['type'] == SET_CHUNK_SIZE:
+                    self.chunk_size = int.from_bytes(payload[:4], 'big') & 0x7FFFFFFF
+                return state['type'], state['stream'], bytes(payload)
+
+
+async def handshake(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """
+    Run the client side of the plain RTMP handshake.
+
+    :param reader: The connection to read from.
+    :param writer: The connection to write to.
+    :return: None
+    """
+    writer.write(b'\x03' + bytes(8) + os.urandom(HANDSHAKE_SIZE - 8))
+    await writer.drain()
+    response = await reader.readexactly(1 + 2 * HANDSHAKE_SIZE)
+    if response[0] != 3:
+        raise IngestError(f"Unsupported RTMP version {response[0]}")
+    # C2 echoes S1
+    writer.write(response[1:1 + HANDSHAKE_SIZE])
+    await writer.drain()
+
+
+async def rtmp_first_packet(url: str, timeout: float) -> None:
+    """
+    Play a stream from its ingest server until the first audio or video packet arrives.
+
+    :param url: The RTMP URL the camera publishes to.
+    :param timeout: The longest time to wait, in seconds.
+    :return: None
+    """
+    parts = urlsplit(url)
+    app, _, name = parts.path.strip('/').rpartition('/')
+
+    async def probe() -> None:
+        reader, writer = await asyncio.open_connection(parts.hostname, parts.port or RTMP_PORT)
+        try:
+            await _play(reader, writer, f"rtmp://{parts.netloc}/{app}", app, name)
+        finally:
+            writer.close()
+
+    # One deadline for connecting and playing, so a probe never takes longer than timeout
+    await asyncio.wait_for(probe(), timeout)
+
+
+async def _play(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, tc_url: str, app: str, name: str) -> None:
+    await handshake(reader, writer)
+    chunks = ChunkReader(reader)
+
+    async def command(*values: Any, stream_id: int = 0) -> None:
+        writer.write(encode_message(3 if stream_id == 0 else 8, COMMAND_AMF0, stream_id, amf_encode(*values)))
+        await writer.drain()
+
+    async def result(transaction: int) -> List[Any]:
+        while True:
+            type_id, _, payload = await chunks.message()
+            if type_id == COMMAND_AMF0:
+                values = amf_decode(payload)
+                if values[:2] == ['_error', transaction]:
+                    raise IngestError(f"Server refused {('connect', 'createStream')[transaction - 1]}")
+                if values[:2] == ['_result', transaction]:
+                    return values
+
+    await command('connect', 1, {'app': app, 'tcUrl': tc_url, 'flashVer': 'LNX 9,0,124,2', 'fpad': False,
+                                 'capabilities': 15, 'audioCodecs': 3191, 'videoCodecs': 252, 'videoFunction': 1})
+    await result(1)
+    await command('createStream', 2, None)
+    stream_id = int((await result(2))[3])
+    # Live streams only, never a recording with the same name
+    await command('play', 0, None, name, -1000, stream_id=stream_id)
+    while True:
+        type_id, _, payload = await chunks.message()
+        if type_id in (AUDIO, VIDEO):
+            return
+        if type_id == COMMAND_AMF0:
+            values = amf_decode(payload)
+            info = values[3] if len(values) > 3 and isinstance(values[3], dict) else {}
+            if values[0] == 'onStatus' and info.get('level') == 'error':
+                raise IngestError(info.get('code', "Play failed"))
+
+
+class IngestVerifier:
+    """
+    Confirm that a camera's stream is arriving at its ingest server.
+
+    The verifier plays the stream from the server like any viewer would, so it works with
+    any RTMP server, and measures the time from the camera reporting STREAMING until the
+    first audio or video packet can be played back.
+    """
+    def __init__(self, log_callback, metrics: Optional[Metrics] = None, probe: Probe = rtmp_first_packet,
+                 timeout: float = 10.0, retry_delay: float = 2.0, max_wait: float = 60.0):
+        """
+        Initialize the ingest verifier.
+
+        :param log_callback: A callback function for logging messages.
+        :param metrics: Optional metrics recording the time to first packet.
+        :param probe: Coroutine function playing a stream until its first packet arrives.
+        :param timeout: Seconds a single attempt may wait for the first packet.
+        :param retry_delay: Seconds between attempts.
+        :param max_wait: Seconds to keep retrying before giving up on a stream.
+        """
+        self.log = log_callback
+        self.metrics = metrics
+        self.probe = probe
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.max_wait = max_wait
+
+    async def wait_for_stream(self, target: str, url: str) -> float:
+        """
+        Wait until a stream is arriving at its ingest server, retrying for up to max_wait seconds.
+
+        :param target: The target GoPro device.
+        :param url: The RTMP URL the camera publishes to.
+        :return: The time to first packet, in seconds.
+        :raises IngestTimeout: If the stream did not arrive within max_wait.
+        """
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                await self.probe(url, max(0.0, min(self.timeout, deadline - time.monotonic())))
+                break
+            except (OSError, EOFError, IngestError, asyncio.TimeoutError) as e:
+                if self.metrics is not None:
+                    self.metrics.count('ingest_checks', target, 'failed')
+                if attempts == 1:
+                    self.log(f"{target}: Stream is not arriving at {url} yet: {str(e) or type(e).__name__}")
+            if time.monotonic() + self.retry_delay >= deadline:
+                if self.metrics is not None:
+                    self.metrics.count('ingest_checks', target, 'timeout')
+                self.log(f"{target}: Stream did not arrive at {url} within {self.max_wait:g}s, giving up after {attempts} attempts")
+                raise IngestTimeout(f"{url} did not arrive within {self.max_wait:g}s")
+            await asyncio.sleep(self.retry_delay)
+        first_packet = time.monotonic() - started
+        if self.metrics is not None:
+            self.metrics.count('ingest_checks', target)
+            self.metrics.observe('ingest_first_packet', target, first_packet, started=started)
+        self.log(f"{target}: Stream arriving at {url}, first packet after {first_packet:.1f}s")
+        return first_packet
@@ -0,0 +1,107 @@
+import contextvars
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+# The camera and setup phase the running task is working on, attached to every log record
+current_camera: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('current_camera', default=None)
+current_phase: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('current_phase', default=None)
+
+
+class LogRecord(NamedTuple):
+    """
+    A structured log message.
+    """
+    time: float
+    camera: Optional[str]
+    phase: Optional[str]
+    message: str
+
+    def format(self) -> str:
+        """
+        Format the record for display.
+
+        :return: The message prefixed with its local time.
+        """
+        return f"{time.strftime('%H:%M:%S', time.localtime(self.time))} {self.message}"
+
+
+class LogPipeline:
+    """
+    Thread-safe log callback that turns messages into structured records.
+
+    Records are tagged with the camera and phase of the calling task, optionally mirrored
+    to a rotating file, and queued for a consumer such as the Tk loop to drain in batches.
+    It can be called from any thread.
+    """
+    def __init__(self, buffered: bool = True, max_queued: int = 10000, echo: Optional[Callable[[LogRecord], None]] = None):
+        """
+        Initialize the log pipeline.
+
+        :param buffered: Whether to queue records for drain(). Disable when nothing drains them.
+        :param max_queued: How many records may wait to be drained before new ones are dropped.
+        :param echo: Optional callback receiving every record as it is logged.
+        """
+        self.buffered = buffered
+        self.echo = echo
+        self.dropped = 0
+        self._queue: "queue.Queue[LogRecord]" = queue.Queue(maxsize=max_queued)
+        self._file_logger: Optional[logging.Logger] = None
+
+    def __call__(self, message: str) -> None:
+        """
+        Log a message.
+
+        :param message: The message to log.
+        :return: None
+        """
+        record = LogRecord(time.time(), current_camera.get(), current_phase.get(), message)
+        if self.buffered:
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+        if self._file_logger is not None:
+            self._file_logger.info(message, extra={'camera': record.camera or '-', 'phase': record.phase or '-'})
+        if self.echo is not None:
+            self.echo(record)
+
+    def drain(self, max_records: int = 500) -> List[LogRecord]:
+        """
+        Take the records logged since the last drain.
+
+        :param max_records: The largest batch to return, the rest stays queued.
+        :return: The records, oldest first.
+        """
+        records = []
+        while len(records) < max_records:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return records
+
+    def set_log_file(self, file_path: Optional[str], max_bytes: int = 5_000_000, backup_count: int = 3) -> None:
+        """
+        Mirror every record to a rotating file, or stop mirroring.
+
+        :param file_path: The path of the log file, or None to stop mirroring.
+        :param max_bytes: The size at which the file is rotated.
+        :param backup_count: How many rotated files to keep.
+        :return: None
+        """
+        if self._file_logger is not None:
+            for handler in list(self._file_logger.handlers):
+                self._file_logger.removeHandler(handler)
+                handler.close()
+            self._file_logger = None
+        if file_path:
+            handler = logging.handlers.RotatingFileHandler(file_path, maxBytes=max_bytes, backupCount=backup_count)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(camera)s %(phase)s %(message)s'))
+            file_logger = logging.getLogger(f'{__name__}.{id(self)}')
+            file_logger.setLevel(logging.INFO)
+            file_logger.propagate = False
+            file_logger.addHandler(handler)
+            self._file_logger = file_logger
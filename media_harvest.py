@@ -0,0 +1,373 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+from metrics import Metrics
+
+# Endpoints of the camera media API
+MEDIA_LIST = '/gopro/media/list'
+MEDIA_FILES = '/videos/DCIM'
+
+# Suffix of a file that is still being downloaded
+PARTIAL = '.part'
+
+
+class HarvestError(Exception):
+    """
+    A camera could not be listed, or a file could not be downloaded completely.
+    """
+
+
+class MediaEndpoint(NamedTuple):
+    """
+    Where and how to reach a camera's media API.
+    """
+    url: str
+    auth: Optional[Tuple[str, str]] = None
+    # PEM certificate the camera signs its HTTPS server with, None for plain HTTP
+    certificate: Optional[str] = None
+
+
+class MediaFile(NamedTuple):
+    """
+    A file on a camera's SD card.
+    """
+    directory: str
+    name: str
+    size: int
+
+    @property
+    def path(self) -> str:
+        """
+        Get the path of the file below the DCIM directory.
+
+        :return: The path, e.g. "100GOPRO/GX010001.MP4".
+        """
+        return f"{self.directory}/{self.name}"
+
+
+class HarvestResult(NamedTuple):
+    """
+    The outcome of harvesting one file.
+    """
+    target: str
+    file: MediaFile
+    outcome: str
+    received: int
+    elapsed: float
+    error: Optional[str] = None
+
+
+# Resolves the media endpoint of a camera target
+Resolver = Callable[[str], Awaitable[MediaEndpoint]]
+
+
+def parse_media_list(data: Dict[str, Any]) -> List[MediaFile]:
+    """
+    Get the files of a media list answer.
+
+    :param data: The JSON answer of /gopro/media/list.
+    :return: The files, in the order the camera listed them.
+    """
+    return [MediaFile(directory['d'], item['n'], int(item['s']))
+            for directory in data.get('media', []) for item in directory.get('fs', [])]
+
+
+def _safe(part: str) -> str:
+    # Names come from the camera, never let them leave the destination directory
+    part = part.replace('/', '_').replace('\\', '_')
+    if part in ('', '.', '..'):
+        raise HarvestError(f"Unsafe file name {part!r}")
+    return part
+
+
+class _Stopped(Exception):
+    pass
+
+
+class HarvestReport:
+    """
+    The outcome of harvesting media from a fleet.
+    """
+    def __init__(self):
+        """
+        Initialize an empty report, started now.
+        """
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.results: List[HarvestResult] = []
+        self.errors: Dict[str, str] = {}
+
+    def add(self, result: HarvestResult) -> None:
+        """
+        Record the outcome of one file.
+
+        :param result: The outcome.
+        :return: None
+        """
+        self.results.append(result)
+
+    def failed(self) -> List[HarvestResult]:
+        """
+        Get the files that could not be downloaded.
+
+        :return: The failed results.
+        """
+        return [result for result in self.results if result.outcome == 'failed']
+
+    @property
+    def received(self) -> int:
+        """
+        Get how many bytes were downloaded, not counting files that were already complete.
+
+        :return: The number of bytes.
+        """
+        return sum(result.received for result in self.results)
+
+    def summary(self) -> str:
+        """
+        Summarize the harvest in one line.
+
+        :return: The summary.
+        """
+        elapsed = (self.finished or time.monotonic()) - self.started
+        outcomes: Dict[str, int] = {}
+        for result in self.results:
+            outcomes[result.outcome] = outcomes.get(result.outcome, 0) + 1
+        counts = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())) or "no files"
+        rate = self.received / elapsed / 1e6 if elapsed > 0 else 0.0
+        cameras = f", {len(self.errors)} cameras unreachable" if self.errors else ""
+        return f"Harvest finished in {elapsed:.1f}s: {counts}{cameras}, {self.received / 1e6:.1f} MB at {rate:.1f} MB/s"
+
+
+class MediaHarvester:
+    """
+    Download the media recorded on the cameras' SD cards.
+
+    Every camera is listed over Wi-Fi and its files are downloaded concurrently, at most
+    ``per_camera`` at a time from one camera and ``max_downloads`` in total. Files are
+    streamed in chunks to a ``.part`` file next to their destination, so an interrupted
+    download resumes with an HTTP Range request on the next attempt or the next harvest.
+    A file only gets its final name once its size matches the size the camera listed,
+    and files that are already complete are skipped.
+    """
+    def __init__(self, log_callback, destination: str, resolve: Resolver, metrics: Optional[Metrics] = None,
+                 max_downloads: int = 8, per_camera: int = 2, chunk_size: int = 1 << 20, attempts: int = 3,
+                 retry_delay: float = 2.0, connect_timeout: float = 5.0, read_timeout: float = 30.0):
+        """
+        Initialize the media harvester.
+
+        :param log_callback: A callback function for logging messages.
+        :param destination: The directory files are saved to, one subdirectory per camera.
+        :param resolve: Coroutine function getting the media endpoint of a camera target.
+        :param metrics: Optional metrics recording download times and outcomes.
+        :param max_downloads: How many files are downloaded at the same time in total.
+        :param per_camera: How many files are downloaded from one camera at the same time.
+        :param chunk_size: Bytes read and written at a time.
+        :param attempts: How many times a file is tried before it is reported as failed.
+        :param retry_delay: Seconds before the first retry, doubled for every further one.
+        :param connect_timeout: Seconds to wait for a connection to a camera.
+        :param read_timeout: Seconds to wait for a camera to send more data.
+        """
+        self.log = log_callback
+        self.destination = destination
+        self.resolve = resolve
+        self.metrics = metrics
+        self.max_downloads = max_downloads
+        self.per_camera = per_camera
+        self.chunk_size = chunk_size
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_downloads, pool_maxsize=per_camera + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._certificates: Dict[str, str] = {}
+
+    async def harvest(self, cameras: Dict[str, str]) -> HarvestReport:
+        """
+        Download the media of every camera.
+
+        :param cameras: The folder name of every camera, keyed by target.
+        :return: A report of every file.
+        """
+        report = HarvestReport()
+        slots = asyncio.Semaphore(self.max_downloads)
+        # Streaming a file blocks its worker thread, so there is one worker per download slot
+        executor = ThreadPoolExecutor(max_workers=self.max_downloads, thread_name_prefix="harvest")
+        try:
+            await asyncio.gather(*(self.harvest_camera(target, name, report, slots, executor)
+                                   for target, name in cameras.items()))
+        finally:
+            executor.shutdown(wait=False)
+        report.finished = time.monotonic()
+        self.log(report.summary())
+        return report
+
+    async def harvest_camera(self, target: str, name: str, report: HarvestReport, slots: asyncio.Semaphore,
+                             executor: ThreadPoolExecutor) -> None:
+        """
+        Download the media of one camera.
+
+        :param target: The target GoPro device.
+        :param name: The folder the camera's files are saved to.
+        :param report: The report to record every file in.
+        :param slots: The download slots shared by every camera.
+        :param executor: The threads downloads run in.
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            endpoint = await self.resolve(target)
+            files = await loop.run_in_executor(executor, self.list_media, target, endpoint)
+        except Exception as e:
+            report.errors[target] = str(e)
+            if self.metrics is not None:
+                self.metrics.count('harvest_cameras', target, 'error')
+            self.log(f"{target}: Could not list media: {e}")
+            return
+        self.log(f"{target}: {len(files)} files, {sum(file.size for file in files) / 1e6:.1f} MB")
+        connections = asyncio.Semaphore(self.per_camera)
+
+        async def harvest_file(file: MediaFile) -> None:
+            report.add(await self._harvest_file(target, name, endpoint, file, executor, connections, slots))
+
+        await asyncio.gather(*(harvest_file(file) for file in files))
+        if self.metrics is not None:
+            self.metrics.count('harvest_cameras', target)
+
+    def list_media(self, target: str, endpoint: MediaEndpoint) -> List[MediaFile]:
+        """
+        List the files on a camera's SD card, blocking until the camera answers.
+
+        :param target: The target GoPro device.
+        :param endpoint: The camera's media endpoint.
+        :return: The files.
+        """
+        response = self.session.get(endpoint.url.rstrip('/') + MEDIA_LIST, timeout=self.timeout, auth=endpoint.auth,
+                                    verify=self._verify(target, endpoint))
+        if response.status_code != 200:
+            raise HarvestError(f"Media list answered {response.status_code}")
+        return parse_media_list(response.json())
+
+    def local_path(self, name: str, file: MediaFile) -> str:
+        """
+        Get where a file is saved.
+
+        :param name: The folder name of the camera.
+        :param file: The file on the camera.
+        :return: The local path.
+        """
+        return os.path.join(self.destination, _safe(name), _safe(file.directory), _safe(file.name))
+
+    def download(self, target: str, endpoint: MediaEndpoint, file: MediaFile, path: str, stop: threading.Event) -> Tuple[str, int]:
+        """
+        Download a file, resuming a partial download, and give it its final name once its size is verified.
+
+        :param target: The target GoPro device.
+        :param endpoint: The camera's media endpoint.
+        :param file: The file on the camera.
+        :param path: The local path.
+        :param stop: Set to abandon the download after the current chunk, keeping the partial file.
+        :return: The outcome, 'skipped', 'resumed' or 'downloaded', and the number of bytes received.
+        """
+        if os.path.exists(path) and os.path.getsize(path) == file.size:
+            return 'skipped', 0
+        partial = path + PARTIAL
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        if offset > file.size:
+            offset = 0
+        received = 0
+        if offset < file.size:
+            headers = {'Range': f'bytes={offset}-'} if offset else {}
+            url = f"{endpoint.url.rstrip('/')}{MEDIA_FILES}/{file.path}"
+            with self.session.get(url, headers=headers, stream=True, timeout=self.timeout, auth=endpoint.auth,
+                                  verify=self._verify(target, endpoint)) as response:
+                if response.status_code == 200:
+                    # The camera ignored the range, start over
+                    offset = 0
+                elif response.status_code != 206 or not response.headers.get('Content-Range', '').startswith(f'bytes {offset}-'):
+                    raise HarvestError(f"{file.path} answered {response.status_code}")
+                with open(partial, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        if stop.is_set():
+                            raise _Stopped()
+                        f.write(chunk)
+                        received += len(chunk)
+        size = os.path.getsize(partial)
+        if size != file.size:
+            raise HarvestError(f"{file.path} has {size} of {file.size} bytes")
+        os.replace(partial, path)
+        return ('resumed' if offset else 'downloaded'), received
+
+    async def _harvest_file(self, target: str, name: str, endpoint: MediaEndpoint, file: MediaFile, executor: ThreadPoolExecutor,
+                            connections: asyncio.Semaphore, slots: asyncio.Semaphore) -> HarvestResult:
+        loop = asyncio.get_running_loop()
+        try:
+            path = self.local_path(name, file)
+        except HarvestError as e:
+            # A name that cannot be saved fails this file only, retrying would not change it
+            self.log(f"{target}: Skipping {file.path}: {e}")
+            if self.metrics is not None:
+                self.metrics.count('harvest_files', target, 'failed')
+            return HarvestResult(target, file, 'failed', 0, 0.0, str(e))
+        started = None
+        received = 0
+        error = None
+        for attempt in range(self.attempts):
+            stop = threading.Event()
+            try:
+                # Slots are taken per attempt, so a file waiting to retry lets the others download
+                async with connections, slots:
+                    started = started or time.monotonic()
+                    outcome, received_now = await loop.run_in_executor(executor, self.download, target, endpoint, file, path, stop)
+                received += received_now
+                break
+            except asyncio.CancelledError:
+                # The worker thread keeps the partial file for the next harvest
+                stop.set()
+                raise
+            except (HarvestError, requests.exceptions.RequestException, OSError) as e:
+                error = str(e)
+                if self.metrics is not None:
+                    self.metrics.count('harvest_retries', target, 'error')
+                if attempt + 1 < self.attempts:
+                    delay = self.retry_delay * 2 ** attempt
+                    self.log(f"{target}: {file.path} interrupted ({error}), resuming in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        else:
+            outcome = 'failed'
+            self.log(f"{target}: Giving up on {file.path}: {error}")
+        elapsed = time.monotonic() - started
+        if self.metrics is not None:
+            self.metrics.count('harvest_files', target, outcome)
+            if outcome != 'skipped':
+                self.metrics.observe('harvest_file', target, elapsed, 'error' if outcome == 'failed' else 'ok', started)
+        return HarvestResult(target, file, outcome, received, elapsed, error if outcome == 'failed' else None)
+
+    def _verify(self, target: str, endpoint: MediaEndpoint) -> Union[bool, str]:
+        # requests only takes a certificate as a file, keep one per camera next to the media
+        if endpoint.certificate is None:
+            return True
+        path = self._certificates.get(target)
+        if path is None:
+            path = os.path.join(self.destination, '.certificates', _safe(target) + '.crt')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(endpoint.certificate)
+            self._certificates[target] = path
+        return path
+
+    def close(self) -> None:
+        """
+        Close all pooled connections.
+
+        :return: None
+        """
+        self.session.close()
@@ -0,0 +1,231 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds of the phase duration histogram buckets
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class Histogram:
+    """
+    Cumulative duration histogram in the Prometheus style.
+    """
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty histogram.
+
+        :param buckets: The sorted upper bounds of the buckets, in seconds.
+        """
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """
+        Record a duration.
+
+        :param value: The duration in seconds.
+        :return: None
+        """
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get the histogram as a JSON serializable dictionary.
+
+        :return: The count, sum, mean and cumulative bucket counts.
+        """
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class Metrics:
+    """
+    Phase timings and outcome counters of camera orchestration.
+
+    Durations are recorded per phase and camera, counters per name, camera and outcome.
+    With ``timeline`` enabled, every timed phase is also kept as a span so a run can be
+    dumped and inspected in a trace viewer. It is safe to read from another thread.
+    """
+    def __init__(self, timeline: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Initialize empty metrics.
+
+        :param timeline: Whether to record a span for every timed phase.
+        :param buckets: The histogram bucket bounds, in seconds.
+        """
+        self.buckets = buckets
+        self.timeline_enabled = timeline
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, str, str], int] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def observe(self, phase: str, camera: str, seconds: float, outcome: str = 'ok', started: Optional[float] = None) -> None:
+        """
+        Record the duration of a phase.
+
+        :param phase: The phase name, e.g. "ble_open".
+        :param camera: The target GoPro device, or "server" for server calls.
+        :param seconds: The duration in seconds.
+        :param outcome: "ok" or "error", kept on the timeline span.
+        :param started: The monotonic start time, defaults to now minus the duration.
+        :return: None
+        """
+        with self._lock:
+            histogram = self.histograms.get((phase, camera))
+            if histogram is None:
+                histogram = self.histograms[(phase, camera)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if self.timeline_enabled:
+                start = started if started is not None else time.monotonic() - seconds
+                self.spans.append({'camera': camera, 'phase': phase, 'start': start - self.started,
+                                   'duration': seconds, 'outcome': outcome})
+
+    def count(self, name: str, camera: str, outcome: str = 'ok') -> None:
+        """
+        Increment a counter.
+
+        :param name: The counter name, e.g. "setups".
+        :param camera: The target GoPro device, or "server" for server calls.
+        :param outcome: The outcome label, e.g. "streaming" or "failed".
+        :return: None
+        """
+        with self._lock:
+            key = (name, camera, outcome)
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    @contextmanager
+    def timed(self, phase: str, camera: str) -> Iterator[None]:
+        """
+        Time the enclosed block as a phase, recording it as an error if it raises.
+
+        :param phase: The phase name.
+        :param camera: The target GoPro device.
+        :return: A context manager.
+        """
+        started = time.monotonic()
+        outcome = 'error'
+        try:
+            yield
+            outcome = 'ok'
+        finally:
+            self.observe(phase, camera, time.monotonic() - started, outcome, started)
+
+    def start_timeline(self) -> None:
+        """
+        Start recording a new timeline, dropping the spans of previous runs.
+
+        :return: None
+        """
+        with self._lock:
+            self.timeline_enabled = True
+            self.spans.clear()
+            self.started = time.monotonic()
+
+    def reset(self) -> None:
+        """
+        Forget everything recorded so far and restart the timeline clock.
+
+        :return: None
+        """
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.spans.clear()
+            self.started = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get every metric as a JSON serializable dictionary.
+
+        :return: Phase histograms keyed by phase then camera, and counters keyed by name, camera then outcome.
+        """
+        with self._lock:
+            phases: Dict[str, Dict[str, Any]] = {}
+            for (phase, camera), histogram in sorted(self.histograms.items()):
+                phases.setdefault(phase, {})[camera] = histogram.to_dict()
+            counters: Dict[str, Dict[str, Dict[str, int]]] = {}
+            for (name, camera, outcome), value in sorted(self.counters.items()):
+                counters.setdefault(name, {}).setdefault(camera, {})[outcome] = value
+        return {'phases': phases, 'counters': counters}
+
+    def phase_means(self) -> Dict[str, float]:
+        """
+        Get the mean duration of each phase across all cameras.
+
+        :return: A mapping of phase name to seconds.
+        """
+        with self._lock:
+            totals: Dict[str, List[float]] = {}
+            for (phase, _), histogram in self.histograms.items():
+                total = totals.setdefault(phase, [0.0, 0])
+                total[0] += histogram.sum
+                total[1] += histogram.count
+        return {phase: total / count for phase, (total, count) in totals.items() if count}
+
+    def prometheus(self, prefix: str = 'gopro_relay') -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        :param prefix: The metric name prefix.
+        :return: The exposition text.
+        """
+        lines = [f"# HELP {prefix}_phase_seconds Duration of camera orchestration phases.",
+                 f"# TYPE {prefix}_phase_seconds histogram"]
+        with self._lock:
+            for (phase, camera), histogram in sorted(self.histograms.items()):
+                labels = f'phase="{_escape(phase)}",camera="{_escape(camera)}"'
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="{bound:g}"}} {count}')
+                lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_phase_seconds_count{{{labels}}} {histogram.count}')
+            names = sorted({name for name, _, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                for (counter, camera, outcome), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f'{prefix}_{name}_total{{camera="{_escape(camera)}",outcome="{_escape(outcome)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def timeline(self) -> Dict[str, Any]:
+        """
+        Get the recorded spans in the Chrome trace event format, one row per camera.
+
+        :return: A trace that chrome://tracing or Perfetto can open.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        rows = {camera: i for i, camera in enumerate(sorted({span['camera'] for span in spans}))}
+        events = [{'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': camera}} for camera, tid in rows.items()]
+        for span in spans:
+            events.append({'name': span['phase'], 'cat': span['outcome'], 'ph': 'X', 'pid': 1, 'tid': rows[span['camera']],
+                           'ts': round(span['start'] * 1e6), 'dur': round(span['duration'] * 1e6)})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def dump_timeline(self, file_path: str) -> None:
+        """
+        Write the recorded spans to a trace file.
+
+        :param file_path: The path of the JSON trace file.
+        :return: None
+        """
+        with open(file_path, 'w') as f:
+            json.dump(self.timeline(), f)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,380 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+from access_points import AccessPointPlan
+from bitrate_planner import BitratePlanner
+from compositor import CompositorFeed
+from discovery import DiscoveryCache
+from gopro_manager import FleetCamera, FleetReport, FleetScheduler, GoLiveReport, GoProManager
+from ingest import IngestVerifier
+from media_harvest import HarvestReport, MediaEndpoint, MediaHarvester
+from relay_pool import RelayPool
+from setup_state import CameraSetup, SetupState
+from stream_monitor import StreamMonitor
+
+
+def load_config(file_path: str) -> Dict[str, Any]:
+    """
+    Load a configuration saved by the GUI.
+
+    :param file_path: The path to the configuration file.
+    :return: The configuration dictionary.
+    """
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+class RelayController:
+    """
+    Start, stop and report on a fleet of GoPros from a configuration dictionary.
+
+    This holds everything the GUI and the headless command line share: the camera manager,
+    the fleet scheduler, the compositor feed, the stream monitor and the pool of ingest
+    relays. It has no Tk dependency so it can run on a headless relay.
+    """
+    def __init__(self, log_callback, manager: Optional[GoProManager] = None):
+        """
+        Initialize the controller.
+
+        :param log_callback: A callback function for logging messages.
+        :param manager: Optional GoProManager to use instead of a new one.
+        """
+        self.log = log_callback
+        self.manager = manager or GoProManager(log_callback, discovery=DiscoveryCache(log_callback))
+        self.scheduler = FleetScheduler(self.manager)
+        self.monitor = StreamMonitor(self.manager, self.rearm_camera)
+        self.feed: Optional[CompositorFeed] = None
+        self.relays: Optional[RelayPool] = None
+        self.access_points: Optional[AccessPointPlan] = None
+        self._relay_watch: Optional[asyncio.Task] = None
+        self.config: Dict[str, Any] = {}
+        self.last_report: Optional[FleetReport] = None
+
+    @staticmethod
+    def cameras(config: Dict[str, Any]) -> List[FleetCamera]:
+        """
+        Get the cameras of a configuration.
+
+        :param config: The configuration dictionary.
+        :return: A list of FleetCamera entries, in configured order.
+        """
+        return [FleetCamera(gopro['name'], gopro['target'], gopro.get('priority', 0)) for gopro in config.get('gopros', [])]
+
+    async def start(self, config: Dict[str, Any], arm: bool = False) -> FleetReport:
+        """
+        Set up every configured camera to stream and start the server compositor as they come online.
+
+        :param config: The configuration dictionary.
+        :param arm: Whether to only arm the cameras, holding them READY until go_live.
+        :return: The report of the bring-up.
+        """
+        self.config = config
+        # Share the uplink budget between the cameras, with per-camera overrides from the config.
+        # Built first so an unsupported resolution or field of view fails before anything starts.
+        planner = BitratePlanner.from_config(self.log, config)
+        # Optional profiling hook: record every phase of this run and dump it as a trace
+        timeline_file = config.get('timeline_file')
+        if timeline_file:
+            self.manager.metrics.start_timeline()
+        server_address = config['server_ip']
+        cameras = await self.place(config, self.cameras(config))
+        for camera in cameras:
+            self.log(f"Setting up GoPro: {camera.name} with target: {camera.target}")
+
+        # Start the stream script on the server as soon as the first camera is streaming,
+        # and update its inputs as cameras join or drop. A running compositor for the same
+        # cameras is kept, so starting again does not restart the server script.
+        names = [camera.name for camera in cameras]
+        if self.feed is not None and (self.feed.server_address, self.feed.names) != (server_address, names):
+            await self.feed.close()
+            self.feed = None
+        if self.feed is None:
+            # Inputs are read from the pool on every update, so they follow cameras that fail over
+            output_stream = f"rtmp://{server_address}/live/output"
+            # Streams are only handed to the compositor once they are seen arriving at their relay
+            verifier = IngestVerifier(self.log, self.manager.metrics) if config.get('verify_ingest', True) else None
+            self.feed = CompositorFeed(self.manager, server_address, names, output_stream, input_url=lambda name: self.relays.input_url(name),
+                                       verifier=verifier)
+            self.feed.start()
+        # Watch every streaming camera and re-arm feeds that drop
+        self.monitor.start()
+        self.scheduler.set_planner(planner)
+        self.plan_networks(config, cameras)
+        await self.discover(cameras)
+        # The scheduler limits concurrent BLE handshakes and retries failed cameras. Cameras are
+        # reconciled, so starting a partially working rig again only fixes the broken ones.
+        self.last_report = await self.scheduler.bring_up(cameras, config['ssid'], config['password'], server_address,
+                                                         config.get('save_to_gopro', False), arm, reconcile=True)
+        await self.feed.sync()
+        if timeline_file:
+            self.dump_timeline(timeline_file)
+        return self.last_report
+
+    async def stop(self, config: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Stop the server compositor and every configured camera.
+
+        :param config: The configuration dictionary, defaults to the one last started.
+        :return: None
+        """
+        config = config or self.config
+        if self._relay_watch is not None:
+            self._relay_watch.cancel()
+            self._relay_watch = None
+        # Stop supersedes re-arms in flight too, start monitors the cameras again
+        await self.monitor.close()
+        # Stop stream script first so the compositor does not follow each camera as it stops
+        if self.feed is not None:
+            await self.feed.close()
+            self.feed = None
+        else:
+            self.log(f"Stopping stream script on server")
+            await self.manager.run_script_on_server(action='stop', server_address=config['server_ip'])
+
+        await self.discover(self.cameras(config))
+        tasks = []
+        for camera in self.cameras(config):
+            self.log(f"Stopping live stream for GoPro: {camera.target}")
+            tasks.append(self.manager.stop_live_stream(camera.target))
+        # Run all tasks concurrently and handle exceptions
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Log any exceptions that occurred
+        for result in results:
+            if isinstance(result, Exception):
+                self.log(f"Task failed with exception: {result}")
+        if config.get('timeline_file'):
+            self.dump_timeline(config['timeline_file'])
+
+    def dump_timeline(self, file_path: str) -> None:
+        """
+        Write the phases recorded since the last start to a trace file.
+
+        :param file_path: The path of the JSON trace file.
+        :return: None
+        """
+        try:
+            self.manager.metrics.dump_timeline(file_path)
+            self.log(f"Timeline written to {file_path}")
+        except OSError as e:
+            self.log(f"Failed to write timeline: {e}")
+
+    async def go_live(self) -> GoLiveReport:
+        """
+        Start streaming on every armed camera at once.
+
+        :return: When each camera was triggered and started streaming.
+        """
+        report = await self.manager.go_live([camera.target for camera in self.cameras(self.config)])
+        if self.feed is not None:
+            await self.feed.sync()
+        return report
+
+    async def discover(self, cameras: List[FleetCamera]) -> None:
+        """
+        Resolve every camera that is not connected yet with a single BLE scan.
+
+        :param cameras: The cameras about to be connected.
+        :return: None
+        """
+        discovery = self.manager.discovery
+        if discovery is None:
+            return
+        targets = [camera.target for camera in cameras if self.manager.pool.get(camera.target) is None]
+        if targets:
+            found = await discovery.resolve(targets)
+            self.log(f"Discovered {len(found)}/{len(targets)} cameras")
+
+    async def place(self, config: Dict[str, Any], cameras: List[FleetCamera]) -> List[FleetCamera]:
+        """
+        Spread cameras across the configured ingest relays, keeping cameras on the relay they already use.
+
+        :param config: The configuration dictionary.
+        :param cameras: The cameras about to be brought up.
+        :return: The cameras, each with the relay it streams to.
+        """
+        names = [camera.name for camera in cameras]
+        pool = RelayPool.from_config(self.log, config, self.manager.control)
+        if self.relays is not None:
+            pool.restore({name: address for name in names if (address := self.relays.address(name)) is not None})
+        self.relays = pool
+        if len(pool.relays) == 1:
+            # A single relay has nothing to fail over to
+            if self._relay_watch is not None:
+                self._relay_watch.cancel()
+                self._relay_watch = None
+            placement = pool.place(names)
+            return [camera._replace(server=placement[camera.name]) for camera in cameras]
+        await pool.check()
+        if self._relay_watch is None:
+            self._relay_watch = asyncio.create_task(self._watch_relays(config.get('relay_check_interval', 10.0)))
+        placement = pool.place(names)
+        self.log("Relay placement: " + ", ".join(f"{relay.address} {len(relay.streams)}/{relay.capacity or '-'}" for relay in pool.relays))
+        return [camera._replace(server=placement[camera.name]) for camera in cameras]
+
+    def plan_networks(self, config: Dict[str, Any], cameras: List[FleetCamera]) -> None:
+        """
+        Spread cameras across the configured Wi-Fi access points by planned bitrate, keeping cameras on the one they already use.
+
+        :param config: The configuration dictionary.
+        :param cameras: The cameras about to be brought up.
+        :return: None
+        """
+        if not config.get('access_points'):
+            # Every camera joins the single configured network
+            self.access_points = self.scheduler.access_points = None
+            return
+        names = [camera.name for camera in cameras]
+        plan = AccessPointPlan.from_config(self.log, config)
+        if self.access_points is not None:
+            plan.restore({name: ssid for name in names if (ssid := self.access_points.ssid(name)) is not None})
+        self.access_points = self.scheduler.access_points = plan
+        planner = self.scheduler.planner
+        planner.expect(names)
+        plan.place({name: planner.plan[name].maximum for name in names})
+        self.log("Access point plan: " + ", ".join(f"{access_point.ssid} {len(access_point.cameras)} cameras "
+                                                   f"{access_point.load}/{access_point.capacity_kbps or '-'} kbps"
+                                                   for access_point in plan.access_points))
+
+    async def fail_over(self) -> List[str]:
+        """
+        Check the relays and move cameras off relays that became unreachable.
+
+        Streaming and armed cameras are configured again for their new relay, other cameras
+        pick it up the next time they are set up.
+
+        :return: The names of the streams that moved.
+        """
+        if self.relays is None:
+            return []
+        lost = await self.relays.check()
+        if not lost:
+            return []
+        placement = self.relays.place(lost)
+        moved = [name for name in lost if self.relays.placement[name].reachable]
+        if not moved:
+            return []
+        self.log("Moving streams off unreachable relays: " + ", ".join(f"{name} to {placement[name]}" for name in moved))
+        config = self.config
+        tasks = []
+        for camera in self.cameras(config):
+            health = self.monitor.health.get(camera.target)
+            state = self.manager.get_state(camera.target)
+            # A camera being re-armed picks up its new relay from rearm_camera
+            if camera.name not in moved or state not in (SetupState.STREAMING, SetupState.READY) or (health and health.rearming):
+                continue
+            tasks.append(self.scheduler.bring_up_camera(camera._replace(server=placement[camera.name]), config['ssid'], config['password'],
+                                                        config['server_ip'], config.get('save_to_gopro', False),
+                                                        arm=state == SetupState.READY, reconcile=True))
+        await asyncio.gather(*tasks)
+        if self.feed is not None:
+            await self.feed.sync()
+        return moved
+
+    async def _watch_relays(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.fail_over()
+            except Exception as e:
+                self.log(f"Relay check failed: {e}")
+
+    async def rearm_camera(self, name: str, target: str) -> CameraSetup:
+        """
+        Set up a camera whose feed dropped again, with the settings of the last start.
+
+        A camera whose feed keeps dropping on its access point is moved to another one first.
+
+        :param name: The name of the stream.
+        :param target: The target GoPro device.
+        :return: The camera's setup state machine.
+        """
+        if self.access_points is not None:
+            self.access_points.record_drop(name)
+        return await self._set_up_again(name, target)
+
+    async def _set_up_again(self, name: str, target: str) -> CameraSetup:
+        config = self.config
+        server = self.relays.place([name])[name] if self.relays is not None else None
+        return await self.scheduler.bring_up_camera(FleetCamera(name, target, server=server), config['ssid'], config['password'],
+                                                    config['server_ip'], config.get('save_to_gopro', False))
+
+    async def restart_camera(self, target: str) -> CameraSetup:
+        """
+        Stop one camera and set it up again with the settings of the last start.
+
+        :param target: The target GoPro device.
+        :return: The camera's setup state machine.
+        """
+        camera = next((camera for camera in self.cameras(self.config) if camera.target == target), None)
+        if camera is None:
+            raise ValueError(f"{target} is not a configured camera")
+        self.log(f"Restarting GoPro: {target}")
+        await self.manager.stop_live_stream(target)
+        return await self._set_up_again(camera.name, target)
+
+    async def harvest(self, config: Dict[str, Any], destination: str) -> HarvestReport:
+        """
+        Download the media the cameras recorded to their SD cards, e.g. after streaming with "Save to GoPro".
+
+        A camera entry with a "media_url" is reached there, the others are asked over BLE where
+        their media API is. "harvest_downloads" and "harvest_per_camera" limit how many files
+        are downloaded at the same time in total and from one camera.
+
+        :param config: The configuration dictionary.
+        :param destination: The directory files are saved to, one subdirectory per stream name.
+        :return: A report of every file.
+        """
+        overrides = {gopro['target']: MediaEndpoint(gopro['media_url']) for gopro in config.get('gopros', []) if gopro.get('media_url')}
+
+        async def resolve(target: str) -> MediaEndpoint:
+            return overrides.get(target) or await self.manager.media_endpoint(target)
+
+        harvester = MediaHarvester(self.log, destination, resolve, self.manager.metrics,
+                                   max_downloads=config.get('harvest_downloads', 8), per_camera=config.get('harvest_per_camera', 2))
+        try:
+            return await harvester.harvest({camera.target: camera.name for camera in self.cameras(config)})
+        finally:
+            harvester.close()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get a JSON serializable snapshot of every camera and the compositor.
+
+        :return: The status dictionary.
+        """
+        health = {h.target: h for h in self.monitor.snapshot()}
+        cameras = []
+        for camera in self.cameras(self.config):
+            setup = self.manager.setups.get(camera.target)
+            camera_health = health.get(camera.target)
+            cameras.append({
+                'name': camera.name,
+                'target': camera.target,
+                'state': self.manager.get_state(camera.target).value,
+                'error': setup.error if setup else None,
+                'health': camera_health.describe() if camera_health else None,
+                'relay': self.relays.address(camera.name) if self.relays is not None else None,
+                'access_point': self.access_points.ssid(camera.name) if self.access_points is not None else self.config.get('ssid'),
+                'first_packet': self.feed.first_packet.get(camera.name) if self.feed is not None else None,
+            })
+        return {
+            'cameras': cameras,
+            'compositor_inputs': self.feed.sent if self.feed is not None else None,
+            'relays': self.relays.snapshot() if self.relays is not None else [],
+            'access_points': self.access_points.snapshot() if self.access_points is not None else [],
+            'mean_time_to_recover': self.monitor.mean_time_to_recover(),
+            'phase_means': self.manager.metrics.phase_means(),
+        }
+
+    async def close(self) -> None:
+        """
+        Stop monitoring and close every camera and server connection.
+
+        :return: None
+        """
+        if self._relay_watch is not None:
+            self._relay_watch.cancel()
+            self._relay_watch = None
+        await self.monitor.close()
+        await self.manager.close()
@@ -0,0 +1,236 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from urllib.parse import urlsplit
+from control_client import ControlClient
+
+# Default port of an RTMP ingest server
+RTMP_PORT = 1935
+
+# A probe raises OSError if a relay cannot be reached
+Probe = Callable[[str, float], Awaitable[None]]
+
+
+async def rtmp_probe(address: str, timeout: float) -> None:
+    """
+    Check that a relay accepts RTMP connections.
+
+    :param address: The address of the relay, optionally with a port. IPv6 addresses are bracketed, as in URLs.
+    :param timeout: Seconds to wait for the connection.
+    :return: None
+    """
+    parts = urlsplit(f"//{address}")
+    try:
+        host, port = parts.hostname, parts.port
+    except ValueError as e:
+        raise OSError(f"invalid address {address!r}: {e}")
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port or RTMP_PORT), timeout)
+    except asyncio.TimeoutError:
+        raise OSError(f"timed out after {timeout:.0f}s")
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+class Relay:
+    """
+    An RTMP ingest server and the streams placed on it.
+    """
+    def __init__(self, address: str, capacity: Optional[int] = None, report_load: bool = False):
+        """
+        Initialize a relay.
+
+        :param address: The address cameras stream to, as used in rtmp://{address}/live/{name}.
+        :param capacity: How many streams the relay can ingest, or None for no limit.
+        :param report_load: Whether the relay's control endpoint answers the 'load' action.
+        """
+        self.address = address
+        self.capacity = capacity
+        self.report_load = report_load
+        self.reachable = True
+        self.load: Optional[int] = None
+        self.streams: Set[str] = set()
+
+    @property
+    def used(self) -> int:
+        """
+        Get how many streams the relay is ingesting, including ones it reports from other sources.
+
+        :return: The number of streams.
+        """
+        return max(len(self.streams), self.load or 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Get a JSON serializable summary of the relay.
+
+        :return: The summary dictionary.
+        """
+        return {'address': self.address, 'capacity': self.capacity, 'load': self.load,
+                'streams': sorted(self.streams), 'reachable': self.reachable}
+
+
+class RelayPool:
+    """
+    Place camera streams across several RTMP ingest relays.
+
+    Each stream goes to the reachable relay with the most spare capacity, counting both the
+    streams placed here and the load a relay reports itself. Placements are sticky: a stream
+    only moves when its relay becomes unreachable, so checking the relays again never
+    reconfigures a camera that is streaming fine.
+    """
+    def __init__(self, log_callback, relays: List[Relay], control: Optional[ControlClient] = None,
+                 probe: Probe = rtmp_probe, probe_timeout: float = 2.0):
+        """
+        Initialize the relay pool.
+
+        :param log_callback: A callback function for logging messages.
+        :param relays: The relays, in order of preference.
+        :param control: The client used to ask relays for their load.
+        :param probe: Coroutine function checking that a relay is reachable.
+        :param probe_timeout: Seconds to wait for a relay to answer.
+        """
+        self.log = log_callback
+        self.relays = relays
+        self.control = control
+        self.probe = probe
+        self.probe_timeout = probe_timeout
+        self.placement: Dict[str, Relay] = {}
+
+    @classmethod
+    def from_config(cls, log_callback, config: Dict[str, Any], control: Optional[ControlClient] = None) -> "RelayPool":
+        """
+        Build a pool from a saved configuration.
+
+        The "relays" list holds addresses or dictionaries with "address" and optional "capacity"
+        and "report_load". Without it every camera streams to the server at "server_ip".
+
+        :param log_callback: A callback function for logging messages.
+        :param config: The configuration, as saved by the GUI.
+        :param control: The client used to ask relays for their load.
+        :return: The pool.
+        """
+        relays = []
+        for relay in config.get('relays') or [config['server_ip']]:
+            if isinstance(relay, str):
+                relay = {'address': relay}
+            capacity = relay.get('capacity')
+            relays.append(Relay(relay['address'], int(capacity) if capacity else None, bool(relay.get('report_load'))))
+        return cls(log_callback, relays, control)
+
+    def address(self, name: str) -> Optional[str]:
+        """
+        Get the relay a stream is placed on.
+
+        :param name: The name of the stream.
+        :return: The relay address, or None if the stream is not placed.
+        """
+        relay = self.placement.get(name)
+        return relay.address if relay is not None else None
+
+    def input_url(self, name: str) -> str:
+        """
+        Get the ingest URL of a stream, placing it if needed.
+
+        :param name: The name of the stream.
+        :return: The RTMP URL on the stream's relay.
+        """
+        address = self.address(name) or self.place([name])[name]
+        return f"rtmp://{address}/live/{name}"
+
+    def place(self, names: Iterable[str]) -> Dict[str, str]:
+        """
+        Place streams on relays, keeping streams whose relay is still reachable where they are.
+
+        :param names: The names of the streams.
+        :return: The relay address of every stream.
+        """
+        for name in names:
+            relay = self.placement.get(name)
+            if relay is not None and relay.reachable:
+                continue
+            self.release(name)
+            relay = self._pick()
+            relay.streams.add(name)
+            self.placement[name] = relay
+        return {name: relay.address for name, relay in self.placement.items()}
+
+    def restore(self, placement: Dict[str, str]) -> None:
+        """
+        Keep streams on the relays they were placed on before, e.g. by a pool for an older configuration.
+
+        :param placement: The relay address of every stream, addresses that are not in this pool are ignored.
+        :return: None
+        """
+        relays = {relay.address: relay for relay in self.relays}
+        for name, address in placement.items():
+            relay = relays.get(address)
+            if relay is not None:
+                self.release(name)
+                relay.streams.add(name)
+                self.placement[name] = relay
+
+    def release(self, name: str) -> None:
+        """
+        Forget the placement of a stream, e.g. once it is removed from the configuration.
+
+        :param name: The name of the stream.
+        :return: None
+        """
+        relay = self.placement.pop(name, None)
+        if relay is not None:
+            relay.streams.discard(name)
+
+    async def check(self) -> List[str]:
+        """
+        Probe every relay and refresh the load of relays that report it.
+
+        :return: The streams placed on relays that became unreachable, which need placing again.
+        """
+        await asyncio.gather(*(self._check(relay) for relay in self.relays))
+        return [name for name, relay in self.placement.items() if not relay.reachable]
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """
+        Get a JSON serializable summary of every relay.
+
+        :return: A list of relay summaries, in configured order.
+        """
+        return [relay.to_dict() for relay in self.relays]
+
+    def _pick(self) -> Relay:
+        reachable = [relay for relay in self.relays if relay.reachable]
+        if not reachable:
+            # Nothing can be reached, stay on the preferred relay until one comes back
+            self.log("No relay is reachable")
+            return self.relays[0]
+        # Relays without a capacity are weighted like the average configured one
+        capacities = [relay.capacity for relay in reachable if relay.capacity]
+        weight = sum(capacities) / len(capacities) if capacities else 1
+
+        def fill(relay: Relay) -> float:
+            return (relay.used + 1) / (relay.capacity or weight)
+
+        free = [relay for relay in reachable if relay.capacity is None or relay.used < relay.capacity]
+        if not free:
+            self.log("Every relay is at capacity, placing stream over capacity")
+        # min() keeps the first relay on ties, so configured order breaks them
+        return min(free or reachable, key=fill)
+
+    async def _check(self, relay: Relay) -> None:
+        try:
+            await self.probe(relay.address, self.probe_timeout)
+        except OSError as e:
+            if relay.reachable:
+                self.log(f"Relay {relay.address} is unreachable: {e}")
+            relay.reachable = False
+            return
+        if not relay.reachable:
+            self.log(f"Relay {relay.address} is reachable again")
+        relay.reachable = True
+        if relay.report_load and self.control is not None:
+            host = relay.address.partition(':')[0]
+            result = await self.control.run_script('load', host)
+            relay.load = int(result.text) if result.ok and result.text.strip().isdigit() else None
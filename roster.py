@@ -0,0 +1,269 @@
+import csv
+import json
+from tkinter import Entry, Frame, ttk
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# Columns of the roster table, the first two are editable
+COLUMNS = ('name', 'target', 'state', 'health')
+HEADINGS = {'name': "Stream Key", 'target': "GoPro Target", 'state': "State", 'health': "Health"}
+
+
+def load_roster(file_path: str) -> List[Dict[str, Any]]:
+    """
+    Read cameras from a CSV or JSON file.
+
+    A CSV file needs a header row with "name" and "target" columns, other columns such as
+    "priority" are kept. A JSON file holds either a list of cameras or a configuration with
+    a "gopros" list.
+
+    :param file_path: The path to the file.
+    :return: The cameras, each a dictionary with at least "name" and "target".
+    :raises ValueError: If the file does not hold a list of cameras or a camera is invalid.
+    """
+    if file_path.lower().endswith('.csv'):
+        with open(file_path, newline='') as f:
+            cameras = [{key.strip(): (value or '').strip() for key, value in row.items() if key} for row in csv.DictReader(f)]
+        for camera in cameras:
+            if str(camera.get('priority', '')).lstrip('-').isdigit():
+                camera['priority'] = int(camera['priority'])
+            elif 'priority' in camera:
+                del camera['priority']
+    else:
+        with open(file_path) as f:
+            data = json.load(f)
+        cameras = data.get('gopros', []) if isinstance(data, dict) else data
+        if not isinstance(cameras, list):
+            raise ValueError(f"Cameras must be a list, not {type(cameras).__name__}")
+
+    seen = set()
+    for line, camera in enumerate(cameras, start=1):
+        if not isinstance(camera, dict):
+            raise ValueError(f"Camera {line} must be an object with a name and a target")
+        if not camera.get('name') or not camera.get('target'):
+            raise ValueError(f"Camera {line} needs both a name and a target")
+        if camera['target'] in seen:
+            raise ValueError(f"Camera {line} repeats target {camera['target']}")
+        seen.add(camera['target'])
+    return cameras
+
+
+class RosterDiff(NamedTuple):
+    """
+    The rows to add, remove and update to turn one roster into another, keyed by target.
+    """
+    added: List[Dict[str, Any]]
+    removed: List[str]
+    changed: List[Dict[str, Any]]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_roster(current: Dict[str, Dict[str, Any]], cameras: List[Dict[str, Any]]) -> RosterDiff:
+    """
+    Compare the rows of a roster with a new list of cameras.
+
+    :param current: The current rows keyed by target.
+    :param cameras: The new cameras.
+    :return: The difference.
+    """
+    targets = {camera['target'] for camera in cameras}
+    added = [camera for camera in cameras if camera['target'] not in current]
+    changed = [camera for camera in cameras if camera['target'] in current and current[camera['target']] != camera]
+    removed = [target for target in current if target not in targets]
+    return RosterDiff(added, removed, changed)
+
+
+class RosterTable(Frame):
+    """
+    Scrollable camera table with live status columns.
+
+    Rows are ttk.Treeview items rather than widgets, so only the visible rows are drawn and a
+    roster of hundreds of cameras stays responsive. Rows are keyed by target and every update
+    is applied as a diff, so loading a configuration or refreshing states only touches the
+    rows and cells that changed. Double-click a name or target to edit it.
+    """
+    def __init__(self, master, height: int = 8, on_change: Optional[Callable[[], None]] = None):
+        """
+        Initialize the roster table.
+
+        :param master: The parent widget.
+        :param height: The number of visible rows.
+        :param on_change: Optional callback invoked when cameras are added, removed or edited.
+        """
+        super().__init__(master)
+        self.on_change = on_change
+        self.editable = True
+        self.rows: Dict[str, Dict[str, Any]] = {}
+        self._status: Dict[str, Tuple[str, str]] = {}
+        self._editor: Optional[Entry] = None
+
+        self.tree = ttk.Treeview(self, columns=COLUMNS, show='headings', height=height, selectmode='extended')
+        for column in COLUMNS:
+            self.tree.heading(column, text=HEADINGS[column])
+            self.tree.column(column, width=260 if column == 'health' else 120, stretch=column == 'health')
+        scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        self.tree.bind('<Double-1>', self._start_edit)
+
+    def cameras(self) -> List[Dict[str, Any]]:
+        """
+        Get the cameras in display order.
+
+        :return: The cameras, with any extra settings they were loaded with.
+        """
+        return [dict(self.rows[target]) for target in self.tree.get_children()]
+
+    def targets(self) -> List[str]:
+        """
+        Get the camera targets in display order.
+
+        :return: A list of gopro_target identifiers.
+        """
+        return list(self.tree.get_children())
+
+    def add_camera(self, camera: Dict[str, Any], index: Any = 'end') -> bool:
+        """
+        Add a camera row.
+
+        :param camera: The camera, with at least "name" and "target".
+        :param index: The position of the new row.
+        :return: False if the target is empty or already in the roster.
+        """
+        target = camera.get('target', '')
+        if not target or target in self.rows:
+            return False
+        self.rows[target] = dict(camera)
+        self._status[target] = ('', '')
+        self.tree.insert('', index, iid=target, values=(camera.get('name', ''), target, '', ''))
+        self._changed()
+        return True
+
+    def remove_cameras(self, targets: List[str]) -> None:
+        """
+        Remove camera rows.
+
+        :param targets: The targets to remove.
+        :return: None
+        """
+        for target in targets:
+            if target in self.rows:
+                self.tree.delete(target)
+                del self.rows[target]
+                del self._status[target]
+        self._changed()
+
+    def remove_selected(self) -> None:
+        """
+        Remove the selected rows.
+
+        :return: None
+        """
+        if self.editable:
+            self.remove_cameras(list(self.tree.selection()))
+
+    def set_cameras(self, cameras: List[Dict[str, Any]]) -> RosterDiff:
+        """
+        Show a new list of cameras, touching only the rows that differ.
+
+        :param cameras: The cameras, a repeated or empty target keeps only its first camera.
+        :return: The difference that was applied.
+        """
+        unique: Dict[str, Dict[str, Any]] = {}
+        for camera in cameras:
+            if camera.get('target'):
+                unique.setdefault(camera['target'], camera)
+        cameras = list(unique.values())
+        diff = diff_roster(self.rows, cameras)
+        for target in diff.removed:
+            self.tree.delete(target)
+            del self.rows[target]
+            del self._status[target]
+        for camera in diff.changed:
+            self.rows[camera['target']] = dict(camera)
+            self.tree.set(camera['target'], 'name', camera.get('name', ''))
+        for camera in diff.added:
+            self.rows[camera['target']] = dict(camera)
+            self._status[camera['target']] = ('', '')
+            self.tree.insert('', 'end', iid=camera['target'], values=(camera.get('name', ''), camera['target'], '', ''))
+        # Follow the order of the new list, moving only rows that are out of place
+        order = [camera['target'] for camera in cameras]
+        if list(self.tree.get_children()) != order:
+            for index, target in enumerate(order):
+                if self.tree.index(target) != index:
+                    self.tree.move(target, '', index)
+        if diff:
+            self._changed()
+        return diff
+
+    def update_status(self, statuses: Dict[str, Tuple[str, str]]) -> None:
+        """
+        Update the state and health columns, writing only the cells that changed.
+
+        :param statuses: The state and health text keyed by target.
+        :return: None
+        """
+        for target, status in statuses.items():
+            if target in self._status and self._status[target] != status:
+                previous = self._status[target]
+                if previous[0] != status[0]:
+                    self.tree.set(target, 'state', status[0])
+                if previous[1] != status[1]:
+                    self.tree.set(target, 'health', status[1])
+                self._status[target] = status
+
+    def set_editable(self, editable: bool) -> None:
+        """
+        Allow or forbid adding, removing and editing cameras, e.g. while streaming.
+
+        :param editable: Whether the roster can be changed.
+        :return: None
+        """
+        self.editable = editable
+        if not editable:
+            self._finish_edit(None)
+
+    def _changed(self) -> None:
+        if self.on_change:
+            self.on_change()
+
+    def _start_edit(self, event: Any) -> None:
+        target = self.tree.identify_row(event.y)
+        column = self.tree.identify_column(event.x)
+        if not self.editable or not target or column not in ('#1', '#2'):
+            return
+        self._finish_edit(None)
+        field = COLUMNS[int(column[1:]) - 1]
+        x, y, width, height = self.tree.bbox(target, column)
+        self._editor = Entry(self.tree)
+        self._editor.insert(0, self.tree.set(target, field))
+        self._editor.place(x=x, y=y, width=width, height=height)
+        self._editor.focus_set()
+        self._editor.bind('<Return>', lambda e: self._finish_edit((target, field)))
+        self._editor.bind('<FocusOut>', lambda e: self._finish_edit((target, field)))
+        self._editor.bind('<Escape>', lambda e: self._finish_edit(None))
+
+    def _finish_edit(self, edit: Optional[Tuple[str, str]]) -> None:
+        editor, self._editor = self._editor, None
+        if editor is None:
+            return
+        value = editor.get().strip()
+        editor.destroy()
+        if edit is None or not value or edit[0] not in self.rows:
+            return
+        target, field = edit
+        camera = self.rows[target]
+        if camera.get(field) == value:
+            return
+        if field == 'name':
+            camera['name'] = value
+            self.tree.set(target, 'name', value)
+        elif value not in self.rows:
+            # The target is the row id, so a new target means replacing the row in place
+            index = self.tree.index(target)
+            self.remove_cameras([target])
+            self.add_camera({**camera, 'target': value}, index)
+            return
+        self._changed()
@@ -0,0 +1,259 @@
+import asyncio
+import concurrent.futures
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Optional
+
+# Scope of commands that act on every camera, such as start and stop
+FLEET = 'fleet'
+
+
+class Command:
+    """
+    A unit of work queued on a CommandQueue.
+    """
+    def __init__(self, name: str, run: Callable[[], Awaitable[Any]], scope: str = FLEET, supersede: bool = True):
+        """
+        Initialize a command.
+
+        :param name: The name shown in the log, e.g. 'start' or 'restart GoPro 1234'.
+        :param run: Coroutine function doing the work.
+        :param scope: FLEET, or the target of the camera the command acts on.
+        :param supersede: Whether the command replaces queued and running commands in its scope.
+        """
+        self.name = name
+        self.run = run
+        self.scope = scope
+        self.supersede = supersede
+        self.future: Optional[asyncio.Future] = None
+
+    def covers(self, other: "Command") -> bool:
+        """
+        Check whether this command makes another one pointless.
+
+        :param other: The other command.
+        :return: True if this command acts on every camera or on the same camera.
+        """
+        return self.scope == FLEET or self.scope == other.scope
+
+
+class CommandQueue:
+    """
+    Run commands one at a time on the event loop that owns the cameras.
+
+    A superseding command drops the queued commands it covers and cancels the running one,
+    so a Stop pressed during a slow Start cancels the start's in-flight camera setups
+    before stopping, and several Start clicks only start once. Fleet commands cover every
+    command, camera commands only those for the same camera. Commands that do not
+    supersede, such as going live after arming, simply wait their turn.
+    """
+    def __init__(self, log_callback):
+        """
+        Initialize the command queue. Call start from the event loop before submitting.
+
+        :param log_callback: A callback function for logging messages.
+        """
+        self.log = log_callback
+        self.pending: Deque[Command] = deque()
+        self.current: Optional[Command] = None
+        self._running: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    @property
+    def busy(self) -> bool:
+        """
+        Check whether a command is running or queued.
+
+        :return: True if there is work left.
+        """
+        return self.current is not None or bool(self.pending)
+
+    def start(self) -> None:
+        """
+        Start running queued commands. Does nothing if already started.
+
+        :return: None
+        """
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    def submit(self, name: str, run: Callable[[], Awaitable[Any]], scope: str = FLEET, supersede: bool = True) -> asyncio.Future:
+        """
+        Queue a command.
+
+        :param name: The name shown in the log.
+        :param run: Coroutine function doing the work.
+        :param scope: FLEET, or the target of the camera the command acts on.
+        :param supersede: Whether the command replaces queued and running commands in its scope.
+        :return: A future resolved with the result of the command, cancelled if it is superseded.
+        """
+        self.start()
+        command = Command(name, run, scope, supersede)
+        command.future = asyncio.get_running_loop().create_future()
+        # Failures are logged by the queue, callers that do not wait for the result need not see them again
+        command.future.add_done_callback(lambda future: future.cancelled() or future.exception())
+        if supersede:
+            for old in [old for old in self.pending if command.covers(old)]:
+                self.pending.remove(old)
+                old.future.cancel()
+                self.log(f"Dropped queued {old.name}, superseded by {name}")
+            if self.current is not None and command.covers(self.current):
+                self.log(f"Cancelling {self.current.name}, superseded by {name}")
+                self._running.cancel()
+        self.pending.append(command)
+        self._wakeup.set()
+        return command.future
+
+    def cancel(self, scope: Optional[str] = None) -> int:
+        """
+        Cancel the running and queued commands.
+
+        :param scope: Only cancel commands for this camera target, defaults to every command.
+        :return: How many commands were cancelled.
+        """
+        cancelled = 0
+        for command in list(self.pending):
+            if scope is None or command.scope == scope:
+                self.pending.remove(command)
+                command.future.cancel()
+                cancelled += 1
+        if self.current is not None and (scope is None or self.current.scope == scope):
+            self._running.cancel()
+            cancelled += 1
+        return cancelled
+
+    async def close(self) -> None:
+        """
+        Cancel every command and stop the queue.
+
+        :return: None
+        """
+        self.cancel()
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            while not self.pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            command = self.current = self.pending.popleft()
+            try:
+                self._running = asyncio.ensure_future(command.run())
+            except Exception as e:
+                self.current = None
+                self.log(f"{command.name.capitalize()} failed: {e}")
+                if not command.future.done():
+                    command.future.set_exception(e)
+                continue
+            try:
+                # Wait without being cancelled along with the command
+                await asyncio.wait({self._running})
+            except asyncio.CancelledError:
+                self._running.cancel()
+                command.future.cancel()
+                raise
+            finally:
+                self.current = None
+            task = self._running
+            # The caller may have stopped waiting for the result, which leaves the future done
+            if task.cancelled():
+                command.future.cancel()
+                self.log(f"Cancelled {command.name}")
+            elif task.exception() is not None:
+                self.log(f"{command.name.capitalize()} failed: {task.exception()}")
+                if not command.future.done():
+                    command.future.set_exception(task.exception())
+            elif not command.future.done():
+                command.future.set_result(task.result())
+
+
+class RelayRuntime:
+    """
+    One long-lived thread owning the event loop that drives the cameras.
+
+    The loop, and with it every pooled camera connection and HTTP session, lives for the
+    whole application instead of one loop per click. Other threads such as the Tk main
+    loop hand work to it through a CommandQueue.
+    """
+    def __init__(self, log_callback, name: str = "gopro-loop"):
+        """
+        Initialize the runtime. The thread is started on the first command.
+
+        :param log_callback: A callback function for logging messages.
+        :param name: The name of the runtime thread.
+        """
+        self.log = log_callback
+        self.name = name
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue = CommandQueue(log_callback)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """
+        Start the runtime thread if it is not running yet.
+
+        :return: The event loop of the runtime.
+        """
+        with self._lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run_loop, name=self.name)
+                self._thread.start()
+            return self.loop
+
+    def submit(self, name: str, run: Callable[[], Awaitable[Any]], scope: str = FLEET,
+               supersede: bool = True) -> concurrent.futures.Future:
+        """
+        Queue a command from any thread.
+
+        :param name: The name shown in the log.
+        :param run: Coroutine function doing the work, called on the runtime thread.
+        :param scope: FLEET, or the target of the camera the command acts on.
+        :param supersede: Whether the command replaces queued and running commands in its scope.
+        :return: A concurrent future resolved with the result of the command, cancelled if it is superseded.
+        """
+        async def submit() -> Any:
+            return await self.queue.submit(name, run, scope, supersede)
+        return asyncio.run_coroutine_threadsafe(submit(), self.start())
+
+    def cancel(self, scope: Optional[str] = None) -> None:
+        """
+        Cancel the running and queued commands from any thread.
+
+        :param scope: Only cancel commands for this camera target, defaults to every command.
+        :return: None
+        """
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.queue.cancel, scope)
+
+    def shutdown(self, run: Optional[Callable[[], Awaitable[Any]]] = None) -> None:
+        """
+        Run a last command, superseding everything else, then stop the runtime thread.
+
+        The thread is not a daemon, so the process waits for the last command to finish.
+
+        :param run: Optional coroutine function doing the final cleanup.
+        :return: None
+        """
+        async def shutdown() -> None:
+            try:
+                if run is not None:
+                    await self.queue.submit('shutdown', run)
+            finally:
+                await self.queue.close()
+                asyncio.get_running_loop().stop()
+        asyncio.run_coroutine_threadsafe(shutdown(), self.start())
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
@@ -0,0 +1,252 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+
+class GoProSession:
+    """
+    A single open connection to a GoPro, tracked by the session pool.
+    """
+    def __init__(self, target: str, gopro_obj: Any, loop: asyncio.AbstractEventLoop):
+        """
+        Initialize the session.
+
+        :param target: The target GoPro device.
+        :param gopro_obj: The opened WirelessGoPro instance.
+        :param loop: The event loop the connection was opened on.
+        """
+        self.target = target
+        self.gopro = gopro_obj
+        self.loop = loop
+        self.opened_at = time.monotonic()
+        self.last_used = self.opened_at
+        self.in_use = 0
+
+    def touch(self) -> None:
+        """
+        Mark the session as recently used.
+
+        :return: None
+        """
+        self.last_used = time.monotonic()
+
+    def hold(self) -> None:
+        """
+        Keep the session from being closed as idle until it is let go, e.g. while its camera streams.
+
+        :return: None
+        """
+        self.in_use += 1
+
+    def let_go(self) -> None:
+        """
+        Undo a hold, the idle timeout counts from now.
+
+        :return: None
+        """
+        self.in_use -= 1
+        self.touch()
+
+    def is_alive(self) -> bool:
+        """
+        Check whether the underlying BLE connection can still be used from the running loop.
+
+        A connection opened on another event loop is treated as dead since its BLE client
+        is bound to that loop.
+
+        :return: True if the session can be reused.
+        """
+        try:
+            if asyncio.get_running_loop() is not self.loop:
+                return False
+        except RuntimeError:
+            return False
+        try:
+            return bool(self.gopro.is_ble_connected)
+        except Exception:
+            return False
+
+
+class GoProSessionPool:
+    """
+    Keep GoPro BLE connections open across start, stop and status operations.
+
+    Sessions are keyed by ``gopro_target``. A dead session is transparently reopened
+    on the next acquire and sessions idle for longer than ``idle_timeout`` are closed.
+    """
+    def __init__(self, factory: Callable[[str], Any], log_callback, idle_timeout: float = 600.0, open_retries: int = 5,
+                 max_handshakes: Optional[int] = None):
+        """
+        Initialize the session pool.
+
+        :param factory: A callable building a (not yet opened) WirelessGoPro for a target.
+        :param log_callback: A callback function for logging messages.
+        :param idle_timeout: Seconds a session may stay unused before it is closed.
+        :param open_retries: How many connection attempts ``open`` makes per acquire.
+        :param max_handshakes: How many new BLE connections may be opened at once, unlimited if None.
+        """
+        self.factory = factory
+        self.log = log_callback
+        self.idle_timeout = idle_timeout
+        self.open_retries = open_retries
+        self.max_handshakes = max_handshakes
+        self.active_handshakes = 0
+        self.peak_handshakes = 0
+        self._handshakes: Optional[asyncio.Semaphore] = None
+        self._handshakes_limit: Optional[int] = None
+        self._sessions: Dict[str, GoProSession] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._reaper: Optional[asyncio.Task] = None
+
+    def __contains__(self, target: str) -> bool:
+        return target in self._sessions
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, target: str) -> Optional[GoProSession]:
+        """
+        Get the pooled session of a GoPro without connecting.
+
+        :param target: The target GoPro device.
+        :return: The session, or None if the GoPro is not connected.
+        """
+        return self._sessions.get(target)
+
+    def _lock_for(self, target: str) -> asyncio.Lock:
+        lock = self._locks.get(target)
+        if lock is None:
+            lock = self._locks[target] = asyncio.Lock()
+        return lock
+
+    async def acquire(self, target: str, on_connect: Optional[Callable[[], None]] = None, timeout: Optional[float] = None) -> Any:
+        """
+        Get an open connection to a GoPro, connecting or reconnecting when needed.
+
+        New connections wait for a free handshake slot so that only ``max_handshakes``
+        cameras are scanned, connected and paired at the same time.
+
+        :param target: The target GoPro device.
+        :param on_connect: Optional callback invoked once a handshake slot is obtained and a new connection starts.
+        :param timeout: Optional time limit in seconds for opening a new connection, not counting the wait for a slot.
+        :return: The opened WirelessGoPro instance.
+        """
+        async with self._lock_for(target):
+            session = self._sessions.get(target)
+            if session is not None:
+                if session.is_alive():
+                    session.touch()
+                    return session.gopro
+                self.log(f"{target}: Connection lost, reconnecting...")
+                await self._drop(session)
+
+            async with self._handshake_slot():
+                if on_connect:
+                    on_connect()
+                gopro_obj = self.factory(target)
+                try:
+                    await asyncio.wait_for(gopro_obj.open(retries=self.open_retries), timeout)
+                except BaseException:
+                    try:
+                        await gopro_obj.close()
+                    except Exception:
+                        pass
+                    raise
+            session = GoProSession(target, gopro_obj, asyncio.get_running_loop())
+            self._sessions[target] = session
+            self._ensure_reaper()
+            return gopro_obj
+
+    @asynccontextmanager
+    async def _handshake_slot(self) -> AsyncIterator[None]:
+        if self.max_handshakes is None:
+            slots = None
+        else:
+            if self._handshakes is None or self._handshakes_limit != self.max_handshakes:
+                self._handshakes = asyncio.Semaphore(self.max_handshakes)
+                self._handshakes_limit = self.max_handshakes
+            slots = self._handshakes
+        if slots is not None:
+            await slots.acquire()
+        self.active_handshakes += 1
+        self.peak_handshakes = max(self.peak_handshakes, self.active_handshakes)
+        try:
+            yield
+        finally:
+            self.active_handshakes -= 1
+            if slots is not None:
+                slots.release()
+
+    @asynccontextmanager
+    async def session(self, target: str) -> AsyncIterator[Any]:
+        """
+        Borrow a connection for the duration of an operation.
+
+        The connection stays open afterwards so the next operation on the same camera
+        does not pay the scan, connect and pair cost again.
+
+        :param target: The target GoPro device.
+        :return: An async context manager yielding the opened WirelessGoPro.
+        """
+        gopro_obj = await self.acquire(target)
+        session = self._sessions[target]
+        session.hold()
+        try:
+            yield gopro_obj
+        finally:
+            session.let_go()
+
+    async def release(self, target: str) -> None:
+        """
+        Close and forget the connection to a GoPro, if there is one.
+
+        :param target: The target GoPro device.
+        :return: None
+        """
+        async with self._lock_for(target):
+            session = self._sessions.get(target)
+            if session is not None:
+                await self._drop(session)
+
+    async def evict_idle(self) -> None:
+        """
+        Close sessions that have not been used for longer than the idle timeout.
+
+        :return: None
+        """
+        now = time.monotonic()
+        for session in list(self._sessions.values()):
+            if session.in_use == 0 and now - session.last_used > self.idle_timeout:
+                self.log(f"{session.target}: Closing idle connection")
+                await self.release(session.target)
+
+    async def close_all(self) -> None:
+        """
+        Close every pooled connection and stop idle eviction.
+
+        :return: None
+        """
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        for target in list(self._sessions):
+            await self.release(target)
+
+    async def _drop(self, session: GoProSession) -> None:
+        self._sessions.pop(session.target, None)
+        try:
+            if session.loop is asyncio.get_running_loop():
+                await session.gopro.close()
+        except Exception as e:
+            self.log(f"{session.target}: Error closing connection: {e}")
+
+    def _ensure_reaper(self) -> None:
+        if self._reaper is None or self._reaper.done() or self._reaper.get_loop() is not asyncio.get_running_loop():
+            self._reaper = asyncio.create_task(self._reap())
+
+    async def _reap(self) -> None:
+        interval = max(1.0, self.idle_timeout / 4)
+        while self._sessions:
+            await asyncio.sleep(interval)
+            await self.evict_idle()
@@ -0,0 +1,153 @@
+import asyncio
+import enum
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from open_gopro import proto
+from log_pipeline import current_phase
+
+
+class SetupState(enum.Enum):
+    """
+    The states a camera moves through while being set up to stream.
+    """
+    IDLE = "idle"
+    QUEUED = "queued"
+    CONNECTING = "connecting"
+    SHUTTER_OFF = "shutter off"
+    JOINING_AP = "joining AP"
+    CONFIGURING = "configuring"
+    READY = "ready"
+    STREAMING = "streaming"
+    FAILED = "failed"
+
+
+# Seconds a camera may spend in each state before the setup is considered failed
+DEFAULT_TIMEOUTS: Dict[SetupState, float] = {
+    SetupState.CONNECTING: 180.0,
+    SetupState.SHUTTER_OFF: 15.0,
+    SetupState.JOINING_AP: 60.0,
+    SetupState.CONFIGURING: 60.0,
+    SetupState.READY: 30.0,
+}
+
+
+class SetupTimeout(Exception):
+    """
+    Raised when a camera stays in a setup state longer than its timeout.
+    """
+    def __init__(self, state: SetupState, timeout: float):
+        super().__init__(f"Timed out after {timeout:g}s while {state.value}")
+        self.state = state
+        self.timeout = timeout
+
+
+class CameraSetup:
+    """
+    Per-camera setup state machine.
+
+    Transitions are driven by command responses and LIVESTREAM_STATUS notifications
+    instead of fixed delays, and every transition is timestamped so the time spent in
+    each state can be inspected afterwards.
+    """
+    def __init__(self, name: str, target: str, timeouts: Optional[Dict[SetupState, float]] = None,
+                 on_change: Optional[Callable[["CameraSetup"], None]] = None):
+        """
+        Initialize the state machine in the IDLE state.
+
+        :param name: The name of the stream.
+        :param target: The target GoPro device.
+        :param timeouts: Optional per-state timeouts overriding DEFAULT_TIMEOUTS.
+        :param on_change: Optional callback invoked after every transition.
+        """
+        self.name = name
+        self.target = target
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.on_change = on_change
+        self.state = SetupState.IDLE
+        self.error: Optional[str] = None
+        self.history: List[Tuple[SetupState, float]] = [(SetupState.IDLE, time.monotonic())]
+        self.livestream_status: Optional[int] = None
+        self._livestream_changed = asyncio.Event()
+
+    def transition(self, state: SetupState, error: Optional[str] = None) -> None:
+        """
+        Move to a new state.
+
+        :param state: The new state.
+        :param error: The reason for the transition when moving to FAILED.
+        :return: None
+        """
+        self.state = state
+        self.error = error
+        current_phase.set(state.value)
+        self.history.append((state, time.monotonic()))
+        if self.on_change:
+            self.on_change(self)
+
+    async def step(self, state: SetupState, awaitable: Awaitable[Any]) -> Any:
+        """
+        Enter a state and wait for the work that leaves it, bounded by the state's timeout.
+
+        :param state: The state to enter.
+        :param awaitable: The work to perform while in that state.
+        :return: The result of the awaitable.
+        """
+        self.transition(state)
+        timeout = self.timeouts.get(state)
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise SetupTimeout(state, timeout) from None
+
+    @property
+    def failed_in(self) -> Optional[SetupState]:
+        """
+        Get the state the setup failed in.
+
+        :return: The state before FAILED, or None if the setup has not failed.
+        """
+        if self.state != SetupState.FAILED or len(self.history) < 2:
+            return None
+        return self.history[-2][0]
+
+    def fail(self, error: Exception) -> None:
+        """
+        Move to the FAILED state.
+
+        :param error: The error that ended the setup.
+        :return: None
+        """
+        self.transition(SetupState.FAILED, str(error))
+
+    async def on_livestream_status(self, _: Any, update: proto.NotifyLiveStreamStatus) -> None:
+        """
+        Update callback for LIVESTREAM_STATUS notifications.
+
+        :param _: The update type (unused).
+        :param update: The livestream status notification.
+        :return: None
+        """
+        self.livestream_status = update.live_stream_status
+        self._livestream_changed.set()
+
+    async def wait_for_livestream(self, status: int) -> None:
+        """
+        Wait until the camera reports the given livestream status.
+
+        :param status: A proto.EnumLiveStreamStatus value.
+        :return: None
+        """
+        while self.livestream_status != status:
+            self._livestream_changed.clear()
+            await self._livestream_changed.wait()
+
+    def phase_durations(self) -> Dict[SetupState, float]:
+        """
+        Get the time spent in each state that has been left.
+
+        :return: A mapping of state to seconds spent in it.
+        """
+        durations: Dict[SetupState, float] = {}
+        for (state, started), (_, ended) in zip(self.history, self.history[1:]):
+            durations[state] = durations.get(state, 0.0) + ended - started
+        return durations
@@ -0,0 +1,380 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+from open_gopro import constants, proto
+from open_gopro.proto.live_streaming_pb2 import EnumLiveStreamError
+from session_pool import GoProSession
+from setup_state import CameraSetup, SetupState
+
+# Livestream states after which the camera will not resume streaming on its own
+FAILED_STATES = {
+    proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_FAILED_STAY_ON,
+    proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_COMPLETE_STAY_ON,
+    proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_UNAVAILABLE,
+    proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_IDLE,
+}
+
+
+class HealthSample(NamedTuple):
+    """
+    A single livestream status update from a camera.
+    """
+    time: float
+    status: Optional[int]
+    error: Optional[int]
+    bitrate: Optional[int]
+
+
+class CameraHealth:
+    """
+    Rolling health record of one camera's livestream.
+    """
+    def __init__(self, name: str, target: str, history: int = 120):
+        """
+        Initialize an empty health record.
+
+        :param name: The name of the stream.
+        :param target: The target GoPro device.
+        :param history: How many status samples to keep.
+        """
+        self.name = name
+        self.target = target
+        self.samples: Deque[HealthSample] = deque(maxlen=history)
+        self.status: Optional[int] = None
+        self.error: Optional[int] = None
+        self.bitrate: Optional[int] = None
+        self.overheating = False
+        self.dropped_at: Optional[float] = None
+        self.drops = 0
+        self.recovery_times: List[float] = []
+        self.rearming = False
+
+    def record(self, update: proto.NotifyLiveStreamStatus) -> HealthSample:
+        """
+        Record a livestream status update. Fields the camera did not report keep their last value.
+
+        :param update: The livestream status notification.
+        :return: The recorded sample.
+        """
+        if update.HasField("live_stream_status"):
+            self.status = update.live_stream_status
+        if update.HasField("live_stream_error"):
+            self.error = update.live_stream_error
+        if update.HasField("live_stream_bitrate"):
+            self.bitrate = update.live_stream_bitrate
+        sample = HealthSample(time.monotonic(), self.status, self.error, self.bitrate)
+        self.samples.append(sample)
+        return sample
+
+    @property
+    def streaming(self) -> bool:
+        """
+        Whether the camera last reported STREAMING.
+
+        :return: True if the feed is live.
+        """
+        return self.status == proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING
+
+    @property
+    def failed(self) -> bool:
+        """
+        Whether the camera reported a state or error it will not recover from by itself.
+
+        :return: True if the feed needs to be re-armed.
+        """
+        has_error = self.error not in (None, EnumLiveStreamError.LIVE_STREAM_ERROR_NONE)
+        return self.status in FAILED_STATES or (has_error and not self.streaming)
+
+    def mark_dropped(self) -> None:
+        """
+        Record that the feed dropped, unless it is already down.
+
+        :return: None
+        """
+        if self.dropped_at is None:
+            self.dropped_at = time.monotonic()
+            self.drops += 1
+
+    def mark_recovered(self) -> None:
+        """
+        Record that the feed is streaming again, and how long it took.
+
+        :return: None
+        """
+        if self.dropped_at is not None:
+            self.recovery_times.append(time.monotonic() - self.dropped_at)
+            self.dropped_at = None
+
+    def mean_time_to_recover(self) -> Optional[float]:
+        """
+        Get the mean time between a drop and the feed streaming again.
+
+        :return: The mean in seconds, or None if the feed never recovered from a drop.
+        """
+        if not self.recovery_times:
+            return None
+        return sum(self.recovery_times) / len(self.recovery_times)
+
+    def describe(self) -> str:
+        """
+        Build a one line summary for the dashboard.
+
+        :return: The summary text.
+        """
+        status = proto.EnumLiveStreamStatus.Name(self.status).replace("LIVE_STREAM_STATE_", "") if self.status is not None else "UNKNOWN"
+        parts = [f"{self.name} ({self.target}): {status}"]
+        if self.bitrate:
+            parts.append(f"{self.bitrate} kbps")
+        if self.error not in (None, EnumLiveStreamError.LIVE_STREAM_ERROR_NONE):
+            parts.append(EnumLiveStreamError.Name(self.error).replace("LIVE_STREAM_ERROR_", "error "))
+        if self.overheating:
+            parts.append("OVERHEATING")
+        if self.rearming:
+            parts.append("re-arming")
+        parts.append(f"drops {self.drops}")
+        mttr = self.mean_time_to_recover()
+        if mttr is not None:
+            parts.append(f"MTTR {mttr:.1f}s")
+        return ", ".join(parts)
+
+
+class StreamMonitor:
+    """
+    Watch the livestream of every streaming camera and re-arm feeds that drop.
+
+    Cameras are watched as soon as they reach STREAMING and forgotten once they are
+    stopped. Each watched camera holds its pooled connection open, registered for livestream
+    state, error, mode and bitrate updates, and a periodic check catches cameras whose
+    BLE connection went away without a final status update.
+    """
+    def __init__(self, manager, rearm: Callable[[str, str], Awaitable[CameraSetup]],
+                 check_interval: float = 5.0, reconnect_grace: float = 20.0, history: int = 120):
+        """
+        Initialize the stream monitor.
+
+        :param manager: The GoProManager whose cameras are monitored.
+        :param rearm: Coroutine function setting a camera up again, called with the stream name and target.
+        :param check_interval: Seconds between liveness checks.
+        :param reconnect_grace: Seconds a camera may stay RECONNECTING before it is re-armed.
+        :param history: How many status samples to keep per camera.
+        """
+        self.manager = manager
+        self.rearm = rearm
+        self.check_interval = check_interval
+        self.reconnect_grace = reconnect_grace
+        self.history = history
+        self.health: Dict[str, CameraHealth] = {}
+        # Every update callback registered on a watched camera, with the update it is registered for
+        self._callbacks: Dict[str, List[Tuple[Callable[..., Awaitable[None]], Any]]] = {}
+        # The pooled session of every watched camera, held so the idle reaper leaves it open
+        self._held: Dict[str, GoProSession] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Unwatches started by state changes, awaited on close
+        self._unwatching: Set[asyncio.Task] = set()
+        self._checker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """
+        Start following camera state changes and checking liveness. Does nothing if already started.
+
+        :return: None
+        """
+        if self._checker is not None:
+            return
+        self.manager.state_listeners.append(self._on_state_change)
+        self._checker = asyncio.create_task(self._check_loop())
+
+    async def close(self) -> None:
+        """
+        Stop monitoring every camera, cancelling re-arms in flight and waiting for them to end.
+
+        :return: None
+        """
+        if self._on_state_change in self.manager.state_listeners:
+            self.manager.state_listeners.remove(self._on_state_change)
+        if self._checker is not None:
+            self._checker.cancel()
+            self._checker = None
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.gather(*self._unwatching, return_exceptions=True)
+        for target in list(self._callbacks):
+            await self.unwatch(target)
+
+    def snapshot(self) -> List[CameraHealth]:
+        """
+        Get the health records of every camera seen so far.
+
+        :return: A list of CameraHealth records.
+        """
+        return list(self.health.values())
+
+    def mean_time_to_recover(self) -> Optional[float]:
+        """
+        Get the mean time to recover a dropped feed, across all cameras.
+
+        :return: The mean in seconds, or None if no feed recovered from a drop yet.
+        """
+        times = [t for health in self.health.values() for t in health.recovery_times]
+        return sum(times) / len(times) if times else None
+
+    async def watch(self, name: str, target: str) -> None:
+        """
+        Start receiving livestream updates from a camera.
+
+        :param name: The name of the stream.
+        :param target: The target GoPro device.
+        :return: None
+        """
+        health = self.health.get(target)
+        if health is None:
+            health = self.health[target] = CameraHealth(name, target, self.history)
+        health.mark_recovered()
+        gopro_obj = await self.manager.pool.acquire(target)
+        if target not in self._callbacks:
+            async def on_livestream_status(_: Any, update: proto.NotifyLiveStreamStatus) -> None:
+                self._on_update(health, update)
+
+            async def on_overheating(_: Any, value: bool) -> None:
+                health.overheating = bool(value)
+                if health.overheating:
+                    self.manager.log(f"{target}: Camera is overheating")
+
+            self._callbacks[target] = [(on_livestream_status, constants.ActionId.LIVESTREAM_STATUS_NOTIF),
+                                       (on_overheating, constants.StatusId.OVERHEATING)]
+            self._held[target] = self.manager.pool.get(target)
+            self._held[target].hold()
+            gopro_obj.register_update(on_livestream_status, constants.ActionId.LIVESTREAM_STATUS_NOTIF)
+            await gopro_obj.ble_status.overheating.register_value_update(on_overheating)
+        response = await gopro_obj.ble_command.register_livestream_status(
+            register=[
+                proto.EnumRegisterLiveStreamStatus.REGISTER_LIVE_STREAM_STATUS_STATUS,
+                proto.EnumRegisterLiveStreamStatus.REGISTER_LIVE_STREAM_STATUS_ERROR,
+                proto.EnumRegisterLiveStreamStatus.REGISTER_LIVE_STREAM_STATUS_MODE,
+                proto.EnumRegisterLiveStreamStatus.REGISTER_LIVE_STREAM_STATUS_BITRATE,
+            ]
+        )
+        # The registration answers with the current status
+        if isinstance(response.data, proto.NotifyLiveStreamStatus):
+            health.record(response.data)
+        else:
+            health.status = proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING
+            health.error = None
+
+    async def unwatch(self, target: str) -> None:
+        """
+        Stop receiving livestream and overheating updates from a camera.
+
+        :param target: The target GoPro device.
+        :return: None
+        """
+        await self._unregister(target, self._forget(target))
+
+    def _forget(self, target: str) -> List[Tuple[Callable[..., Awaitable[None]], Any]]:
+        # Drop the callbacks right away so no update reaches them, the camera is told later
+        callbacks = self._callbacks.pop(target, [])
+        held = self._held.pop(target, None)
+        if held is not None:
+            held.let_go()
+        session = self.manager.pool.get(target)
+        if session is not None:
+            for callback, update in callbacks:
+                session.gopro.unregister_update(callback, update)
+        return callbacks
+
+    async def _unregister(self, target: str, callbacks: List[Tuple[Callable[..., Awaitable[None]], Any]]) -> None:
+        # Overheating updates were registered with the camera, so it is told to stop sending them
+        session = self.manager.pool.get(target)
+        if session is None or not session.is_alive():
+            return
+        for callback, update in callbacks:
+            if update == constants.StatusId.OVERHEATING:
+                try:
+                    await session.gopro.ble_status.overheating.unregister_value_update(callback)
+                except Exception as e:
+                    self.manager.log(f"{target}: Could not unregister overheating updates: {e}")
+
+    def _on_update(self, health: CameraHealth, update: proto.NotifyLiveStreamStatus) -> None:
+        health.record(update)
+        if health.streaming:
+            health.mark_recovered()
+        elif health.status == proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_RECONNECTING:
+            # The camera retries on its own first, re-arm only if that takes too long
+            health.mark_dropped()
+        elif health.failed:
+            health.mark_dropped()
+            self._trigger_rearm(health, "livestream failed")
+
+    def _trigger_rearm(self, health: CameraHealth, reason: str) -> None:
+        if health.rearming:
+            return
+        health.rearming = True
+        health.mark_dropped()
+        self.manager.log(f"{health.target}: Feed dropped ({reason}), re-arming")
+        # Mark the camera as failed so the compositor stops using its input
+        setup = self.manager.setups.get(health.target)
+        if setup is not None and setup.state == SetupState.STREAMING:
+            setup.fail(Exception(reason))
+        self._tasks[health.target] = asyncio.create_task(self._rearm(health))
+
+    async def _rearm(self, health: CameraHealth) -> None:
+        dropped_at = health.dropped_at or time.monotonic()
+        try:
+            await self.unwatch(health.target)
+            setup = await self.rearm(health.name, health.target)
+            if setup.state == SetupState.STREAMING:
+                await self.watch(health.name, health.target)
+                self.manager.log(f"{health.target}: Feed recovered in {time.monotonic() - dropped_at:.1f}s")
+            else:
+                self.manager.log(f"{health.target}: Re-arm failed: {setup.error}")
+        except Exception as e:
+            self.manager.log(f"{health.target}: Re-arm failed: {e}")
+        finally:
+            health.rearming = False
+            self._tasks.pop(health.target, None)
+
+    def _on_state_change(self, setup: CameraSetup) -> None:
+        if setup.state == SetupState.STREAMING:
+            # A camera being re-armed is watched again by the re-arm task itself
+            if setup.target not in self._tasks:
+                self._tasks[setup.target] = asyncio.create_task(self._watch(setup.name, setup.target))
+        elif setup.state == SetupState.IDLE:
+            task = asyncio.create_task(self._unregister(setup.target, self._forget(setup.target)))
+            self._unwatching.add(task)
+            task.add_done_callback(self._unwatching.discard)
+            health = self.health.get(setup.target)
+            if health is not None:
+                health.status = None
+                health.dropped_at = None
+
+    async def _watch(self, name: str, target: str) -> None:
+        try:
+            await self.watch(name, target)
+        except Exception as e:
+            self.manager.log(f"{target}: Could not monitor livestream: {e}")
+        finally:
+            if self._tasks.get(target) is asyncio.current_task():
+                self._tasks.pop(target)
+
+    async def _check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            self.check()
+
+    def check(self) -> None:
+        """
+        Re-arm watched cameras whose connection is gone or that stayed RECONNECTING too long.
+
+        :return: None
+        """
+        now = time.monotonic()
+        for target in list(self._callbacks):
+            health = self.health[target]
+            session = self.manager.pool.get(target)
+            if session is None or not session.is_alive():
+                self._trigger_rearm(health, "connection lost")
+            elif health.dropped_at is not None and now - health.dropped_at > self.reconnect_grace:
+                self._trigger_rearm(health, "camera did not reconnect")
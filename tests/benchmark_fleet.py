@@ -0,0 +1,152 @@
+"""
+Fleet bring-up benchmark against simulated cameras.
+
+Brings a fleet of SimulatedGoPro cameras up and down through RelayController, with a
+stand-in for the server control endpoint, and reports wall-clock bring-up and tear-down
+time, peak concurrency and event-loop lag:
+
+    python tests/benchmark_fleet.py --cameras 1 10 50 --time-scale 0.01
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from control_client import ControlClient
+from gopro_manager import GoProManager, RetryPolicy
+from relay_controller import RelayController
+from simulated_gopro import SimulatedFleet, SimulationSettings
+from stub_server import StubControlServer
+
+
+class LoopLagProbe:
+    """
+    Measure how late the event loop wakes up a task sleeping at a fixed interval.
+    """
+    def __init__(self, interval: float = 0.005):
+        """
+        Initialize the probe.
+
+        :param interval: Seconds between two wake-ups.
+        """
+        self.interval = interval
+        self.lags: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - expected))
+
+    def __enter__(self) -> "LoopLagProbe":
+        self._task = asyncio.ensure_future(self._run())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._task.cancel()
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.lags, default=0.0)
+
+    @property
+    def mean_lag(self) -> float:
+        return sum(self.lags) / len(self.lags) if self.lags else 0.0
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    The measurements of one benchmark run, durations in seconds.
+    """
+    cameras: int
+    streaming: int
+    bring_up: float
+    tear_down: float
+    peak_handshakes: int
+    peak_streaming: int
+    max_loop_lag: float
+    mean_loop_lag: float
+
+
+def _ignore(message: str) -> None:
+    pass
+
+
+async def run_benchmark(cameras: int, settings: SimulationSettings, control_port: int, max_handshakes: int = 3,
+                        seed: Optional[int] = 0, log_callback=_ignore) -> BenchmarkResult:
+    """
+    Bring a simulated fleet up and down once.
+
+    :param cameras: The number of simulated cameras.
+    :param settings: The timing and failure behaviour of the cameras.
+    :param control_port: The port of the server control endpoint stand-in.
+    :param max_handshakes: How many BLE connections may be opened concurrently.
+    :param seed: Seed for failures and jitter.
+    :param log_callback: A callback function for logging messages.
+    :return: The measurements.
+    """
+    fleet = SimulatedFleet(settings, seed)
+    manager = GoProManager(log_callback, control=ControlClient(port=control_port))
+    manager.pool.factory = fleet
+    controller = RelayController(log_callback, manager)
+    controller.scheduler.max_handshakes = max_handshakes
+    # Keep retry delays in proportion to the simulated timings
+    controller.scheduler.retry = RetryPolicy(base_delay=settings.connect_latency, max_delay=settings.connect_latency * 8)
+    config = {
+        'ssid': 'bench', 'password': 'bench', 'server_ip': '127.0.0.1', 'save_to_gopro': False, 'verify_ingest': False,
+        'gopros': [{'name': f'stream{i}', 'target': f'GoPro {i:04d}'} for i in range(cameras)],
+    }
+    try:
+        with LoopLagProbe() as probe:
+            report = await controller.start(config)
+            streaming = len(report.streaming())
+            started = time.monotonic()
+            await controller.stop()
+            tear_down = time.monotonic() - started
+    finally:
+        await controller.close()
+    return BenchmarkResult(cameras, streaming, report.elapsed, tear_down, fleet.peak_connecting,
+                           fleet.peak_streaming, probe.max_lag, probe.mean_lag)
+
+
+def format_results(results: List[BenchmarkResult]) -> str:
+    """
+    Format benchmark results as a table.
+
+    :param results: The results to format.
+    :return: The table text.
+    """
+    lines = [f"{'cameras':>7} {'streaming':>9} {'bring-up':>9} {'tear-down':>9} {'peak BLE':>8} {'peak live':>9} {'max lag':>8} {'mean lag':>8}"]
+    for r in results:
+        lines.append(f"{r.cameras:>7} {r.streaming:>9} {r.bring_up:>8.2f}s {r.tear_down:>8.2f}s {r.peak_handshakes:>8} "
+                     f"{r.peak_streaming:>9} {r.max_loop_lag * 1000:>6.1f}ms {r.mean_loop_lag * 1000:>6.1f}ms")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark fleet bring-up against simulated GoPros.")
+    parser.add_argument('--cameras', type=int, nargs='+', default=[1, 10, 50], help="fleet sizes to benchmark")
+    parser.add_argument('--time-scale', type=float, default=0.01, help="multiplier applied to the simulated camera timings")
+    parser.add_argument('--max-handshakes', type=int, default=3, help="concurrent BLE handshakes")
+    parser.add_argument('--connect-failure-rate', type=float, default=0.0, help="probability a BLE connection attempt fails")
+    parser.add_argument('--ap-failure-rate', type=float, default=0.0, help="probability joining the access point fails")
+    parser.add_argument('--port', type=int, default=8080, help="port of the server control endpoint stand-in, 0 for any free port")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    settings = SimulationSettings(connect_failure_rate=args.connect_failure_rate,
+                                  ap_failure_rate=args.ap_failure_rate).scaled(args.time_scale)
+    with StubControlServer(port=args.port) as server:
+        results = [asyncio.run(run_benchmark(n, settings, server.port, args.max_handshakes)) for n in args.cameras]
+    print(json.dumps([r._asdict() for r in results], indent=2) if args.json else format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
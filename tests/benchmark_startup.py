@@ -0,0 +1,155 @@
+"""
+Cold-start benchmark for the GUI and the command line.
+
+Imports each module in a fresh interpreter with ``-X importtime`` and reports the median
+import time, the wall-clock time of the whole process and the slowest direct imports.
+Pass ``--gui`` to also launch the source GUI, or ``--executable`` for a PyInstaller build,
+and report when the window and the camera stack were ready (needs a display):
+
+    python tests/benchmark_startup.py --modules gui cli --runs 5
+    python tests/benchmark_startup.py --gui --executable dist/GoProStreamRelay
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Kept in sync with gui.STARTUP_PROBE_ENV, gui is not imported to keep this process cold
+STARTUP_PROBE_ENV = "GOPRO_RELAY_STARTUP_PROBE"
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class ImportTime(NamedTuple):
+    """
+    Cold import cost of one module.
+    """
+    module: str
+    import_time: float
+    process_time: float
+    slowest: Dict[str, float]
+
+
+class LaunchTime(NamedTuple):
+    """
+    Time until a launched GUI showed its window and loaded the camera stack.
+    """
+    command: str
+    ui_ready: float
+    stack_ready: float
+    process_time: float
+
+
+def parse_importtime(output: str) -> Dict[str, Dict[str, float]]:
+    """
+    Get the cumulative import time of every module imported directly and of its own direct imports,
+    from ``-X importtime`` output.
+
+    :param output: The standard error of the interpreter.
+    :return: Seconds keyed by importer, then by imported module, with the importer's own total under its name.
+    """
+    times: Dict[str, Dict[str, float]] = {}
+    children: Dict[str, float] = {}
+    for match in IMPORT_LINE.finditer(output):
+        # Indentation grows by two spaces per level, and a module is printed after its imports
+        depth, name, cumulative = len(match.group(3)) // 2, match.group(4), int(match.group(2)) / 1e6
+        if depth == 1:
+            children[name] = cumulative
+        elif depth == 0:
+            times[name] = {**children, name: cumulative}
+            children = {}
+    return times
+
+
+def measure_import(module: str, runs: int = 5, top: int = 5) -> ImportTime:
+    """
+    Import a module in fresh interpreters and keep the median run.
+
+    :param module: The module to import, from the repository root.
+    :param runs: How many interpreters to start.
+    :param top: How many of the slowest direct imports of the module to report.
+    :return: The median import and process times, and the slowest imports of the median run.
+    """
+    samples = []
+    for _ in range(runs):
+        started = time.monotonic()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+        elapsed = time.monotonic() - started
+        times = parse_importtime(result.stderr)[module]
+        samples.append((times.pop(module), elapsed, times))
+    samples.sort(key=lambda sample: sample[0])
+    import_time, _, times = samples[len(samples) // 2]
+    slowest = dict(sorted(times.items(), key=lambda item: -item[1])[:top])
+    return ImportTime(module, import_time, statistics.median(sample[1] for sample in samples), slowest)
+
+
+def measure_launch(command: List[str], runs: int = 3, timeout: float = 60.0) -> LaunchTime:
+    """
+    Launch the GUI with the startup probe enabled and keep the median run.
+
+    :param command: The command starting the GUI, from source or a frozen build.
+    :param runs: How many times to launch it.
+    :param timeout: Seconds to wait for one launch.
+    :return: The median times.
+    """
+    samples = []
+    for _ in range(runs):
+        started = time.monotonic()
+        result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=timeout, check=True,
+                                env={**os.environ, STARTUP_PROBE_ENV: '1'})
+        elapsed = time.monotonic() - started
+        reported = dict(line.split() for line in result.stdout.splitlines() if line.startswith(('ui_ready ', 'stack_ready ')))
+        samples.append((float(reported['ui_ready']), float(reported['stack_ready']), elapsed))
+    return LaunchTime(' '.join(command), *(statistics.median(values) for values in zip(*samples)))
+
+
+def format_results(imports: List[ImportTime], launches: Optional[List[LaunchTime]] = None) -> str:
+    """
+    Format benchmark results as tables.
+
+    :param imports: The import results.
+    :param launches: The launch results.
+    :return: The table text.
+    """
+    lines = [f"{'module':<16} {'import':>8} {'process':>8}  slowest imports"]
+    for r in imports:
+        slowest = ", ".join(f"{name} {t * 1000:.0f}ms" for name, t in r.slowest.items())
+        lines.append(f"{r.module:<16} {r.import_time * 1000:>6.0f}ms {r.process_time * 1000:>6.0f}ms  {slowest}")
+    if launches:
+        lines.append("")
+        lines.append(f"{'ui ready':>8} {'stack':>8} {'process':>8}  command")
+        for r in launches:
+            lines.append(f"{r.ui_ready:>7.2f}s {r.stack_ready:>7.2f}s {r.process_time:>7.2f}s  {r.command}")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cold-start import and launch times.")
+    parser.add_argument('--modules', nargs='+', default=['gui', 'cli', 'relay_controller'], help="modules to import")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument('--gui', action='store_true', help="also launch the source GUI")
+    parser.add_argument('--executable', action='append', default=[], help="frozen build to launch, can be repeated")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    imports = [measure_import(module, args.runs) for module in args.modules]
+    commands = ([[sys.executable, 'gui.py']] if args.gui else []) + [[path] for path in args.executable]
+    launches = [measure_launch(command, min(args.runs, 3)) for command in commands]
+    if args.json:
+        print(json.dumps({'imports': [r._asdict() for r in imports], 'launches': [r._asdict() for r in launches]}, indent=2))
+    else:
+        print(format_results(imports, launches))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
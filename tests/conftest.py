@@ -2,4 +2,12 @@ import sys
 import os
 
 # Add the parent directory to the system path
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
\ No newline at end of file
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from stub_server import StubControlServer
+
+@pytest.fixture
+def control_server():
+    with StubControlServer() as server:
+        yield server
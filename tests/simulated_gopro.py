@@ -0,0 +1,238 @@
+import asyncio
+import random
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+from open_gopro import constants, proto
+
+
+class SimulationSettings(NamedTuple):
+    """
+    Timing and failure behaviour of simulated cameras, in seconds.
+
+    The defaults are in the range measured on HERO cameras; use scaled() to run faster.
+    """
+    connect_latency: float = 4.0
+    connect_failure_rate: float = 0.0
+    command_latency: float = 0.1
+    ap_join_time: float = 8.0
+    ap_failure_rate: float = 0.0
+    ready_delay: float = 2.0
+    streaming_delay: float = 3.0
+    jitter: float = 0.2
+    # Access points no camera manages to join
+    unreachable: Tuple[str, ...] = ()
+
+    def scaled(self, factor: float) -> "SimulationSettings":
+        """
+        Get the same settings with every duration multiplied by a factor.
+
+        :param factor: The time scale, e.g. 0.01 to run a hundred times faster.
+        :return: The scaled settings.
+        """
+        return self._replace(connect_latency=self.connect_latency * factor, command_latency=self.command_latency * factor,
+                             ap_join_time=self.ap_join_time * factor, ready_delay=self.ready_delay * factor,
+                             streaming_delay=self.streaming_delay * factor)
+
+
+class SimulatedResponse(NamedTuple):
+    ok: bool
+    data: Any
+
+
+class _SimulatedStatus:
+    def __init__(self, read: Callable[[], Any] = lambda: None):
+        self.callbacks: List[Callable] = []
+        self.read = read
+
+    async def get_value(self) -> SimulatedResponse:
+        return SimulatedResponse(True, self.read())
+
+    async def register_value_update(self, callback: Callable) -> None:
+        self.callbacks.append(callback)
+
+    async def unregister_value_update(self, callback: Callable) -> None:
+        self.callbacks.remove(callback)
+
+
+class _SimulatedBleCommands:
+    def __init__(self, gopro: "SimulatedGoPro"):
+        self.gopro = gopro
+
+    async def set_shutter(self, shutter: constants.Toggle) -> SimulatedResponse:
+        self.gopro.commands.append('set_shutter')
+        await self.gopro.delay(self.gopro.settings.command_latency)
+        if shutter == constants.Toggle.ENABLE and self.gopro.livestream_status == proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_READY:
+            self.gopro.notify_later(self.gopro.settings.streaming_delay, proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING)
+        elif shutter == constants.Toggle.DISABLE and self.gopro.streaming:
+            await self.gopro.notify(proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_IDLE)
+        return SimulatedResponse(True, None)
+
+    async def register_livestream_status(self, register: List[int]) -> SimulatedResponse:
+        self.gopro.commands.append('register_livestream_status')
+        await self.gopro.delay(self.gopro.settings.command_latency)
+        return SimulatedResponse(True, proto.NotifyLiveStreamStatus(live_stream_status=self.gopro.livestream_status))
+
+    async def cohn_get_status(self, register: bool) -> SimulatedResponse:
+        self.gopro.commands.append('cohn_get_status')
+        await self.gopro.delay(self.gopro.settings.command_latency)
+        return SimulatedResponse(True, proto.NotifyCOHNStatus(status=proto.EnumCOHNStatus.COHN_UNPROVISIONED))
+
+    async def set_livestream_mode(self, url: str, **kwargs) -> SimulatedResponse:
+        self.gopro.commands.append('set_livestream_mode')
+        await self.gopro.delay(self.gopro.settings.command_latency)
+        self.gopro.livestream_url = url
+        self.gopro.livestream_settings = kwargs
+        self.gopro.notify_later(self.gopro.settings.ready_delay, proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_READY)
+        return SimulatedResponse(True, None)
+
+
+class SimulatedGoPro:
+    """
+    Stand-in for WirelessGoPro covering the calls made by GoProManager and StreamMonitor.
+
+    Connecting, joining the access point and LIVESTREAM_STATUS notifications take the
+    times given by the settings, with random jitter and failures drawn from ``rng``.
+    """
+    def __init__(self, target: str, settings: SimulationSettings = SimulationSettings(), rng: Optional[random.Random] = None,
+                 fleet: Optional["SimulatedFleet"] = None):
+        """
+        Initialize the simulated camera.
+
+        :param target: The target GoPro device.
+        :param settings: The timing and failure behaviour.
+        :param rng: The random generator for jitter and failures.
+        :param fleet: Optional fleet tracking concurrency across cameras.
+        """
+        self.target = target
+        self.settings = settings
+        self.rng = rng or random.Random()
+        self.fleet = fleet
+        self.is_ble_connected = False
+        self.livestream_status = proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_IDLE
+        self.livestream_url: Optional[str] = None
+        self.livestream_settings: Dict[str, Any] = {}
+        self.connected_ssid: Optional[str] = None
+        self.commands: List[str] = []
+        self.ble_command = _SimulatedBleCommands(self)
+        self.ble_status = SimpleNamespace(overheating=_SimulatedStatus(), connected_wifi_ssid=_SimulatedStatus(lambda: self.connected_ssid))
+        self._listeners: Dict[Any, List[Callable]] = {}
+        self._notifications: List[asyncio.Task] = []
+
+    @property
+    def streaming(self) -> bool:
+        return self.livestream_status == proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING
+
+    async def delay(self, seconds: float) -> None:
+        """
+        Sleep for a duration with the configured jitter.
+
+        :param seconds: The nominal duration.
+        :return: None
+        """
+        await asyncio.sleep(seconds * (1 + self.settings.jitter * (2 * self.rng.random() - 1)))
+
+    async def open(self, timeout: int = 15, retries: int = 5) -> None:
+        if self.fleet is not None:
+            self.fleet.opening(1)
+        try:
+            for _ in range(retries):
+                await self.delay(self.settings.connect_latency)
+                if self.rng.random() >= self.settings.connect_failure_rate:
+                    self.is_ble_connected = True
+                    return
+            raise Exception(f"Could not connect to {self.target}")
+        finally:
+            if self.fleet is not None:
+                self.fleet.opening(-1)
+
+    async def close(self) -> None:
+        for task in self._notifications:
+            task.cancel()
+        self.is_ble_connected = False
+
+    async def connect_to_access_point(self, ssid: str, password: str) -> bool:
+        self.commands.append('connect_to_access_point')
+        await self.delay(self.settings.ap_join_time)
+        if ssid in self.settings.unreachable or self.rng.random() < self.settings.ap_failure_rate:
+            raise Exception(f"{self.target} could not join {ssid}")
+        self.connected_ssid = ssid
+        return True
+
+    def reboot(self) -> None:
+        """
+        Lose the network and livestream configuration, as a camera that was power cycled.
+
+        :return: None
+        """
+        self.connected_ssid = None
+        self.livestream_status = proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_IDLE
+
+    def register_update(self, callback: Callable, update: Any) -> None:
+        self._listeners.setdefault(update, []).append(callback)
+
+    def unregister_update(self, callback: Callable, update: Any = None) -> None:
+        for listeners in self._listeners.values():
+            if callback in listeners:
+                listeners.remove(callback)
+
+    async def notify(self, status: int, error: int = 0) -> None:
+        """
+        Send a LIVESTREAM_STATUS notification to every registered callback.
+
+        :param status: A proto.EnumLiveStreamStatus value.
+        :param error: A live stream error value.
+        :return: None
+        """
+        self.livestream_status = status
+        if self.fleet is not None:
+            self.fleet.streaming_changed()
+        update = proto.NotifyLiveStreamStatus(live_stream_status=status, live_stream_error=error)
+        for callback in list(self._listeners.get(constants.ActionId.LIVESTREAM_STATUS_NOTIF, [])):
+            await callback(constants.ActionId.LIVESTREAM_STATUS_NOTIF, update)
+
+    def notify_later(self, seconds: float, status: int) -> None:
+        """
+        Send a LIVESTREAM_STATUS notification after a delay, as the camera would.
+
+        :param seconds: The nominal delay.
+        :param status: A proto.EnumLiveStreamStatus value.
+        :return: None
+        """
+        async def send():
+            await self.delay(seconds)
+            await self.notify(status)
+        self._notifications = [task for task in self._notifications if not task.done()]
+        self._notifications.append(asyncio.ensure_future(send()))
+
+
+class SimulatedFleet:
+    """
+    Factory of simulated cameras, usable wherever WirelessGoPro is constructed.
+
+    Tracks how many cameras are opening a connection and streaming at the same time.
+    """
+    def __init__(self, settings: SimulationSettings = SimulationSettings(), seed: Optional[int] = None):
+        """
+        Initialize the fleet.
+
+        :param settings: The timing and failure behaviour of every camera.
+        :param seed: Optional seed so failures and jitter are reproducible.
+        """
+        self.settings = settings
+        self.rng = random.Random(seed)
+        self.cameras: Dict[str, SimulatedGoPro] = {}
+        self.connecting = 0
+        self.peak_connecting = 0
+        self.peak_streaming = 0
+
+    def __call__(self, target: str, enable_wifi: bool = False) -> SimulatedGoPro:
+        gopro = SimulatedGoPro(target, self.settings, self.rng, self)
+        self.cameras[target] = gopro
+        return gopro
+
+    def opening(self, change: int) -> None:
+        self.connecting += change
+        self.peak_connecting = max(self.peak_connecting, self.connecting)
+
+    def streaming_changed(self) -> None:
+        self.peak_streaming = max(self.peak_streaming, sum(gopro.streaming for gopro in self.cameras.values()))
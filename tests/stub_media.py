@@ -0,0 +1,93 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class StubMediaServer:
+    """
+    Local stand-in for a camera's HTTP media API.
+
+    Serves ``/gopro/media/list`` and the files below ``/videos/DCIM`` with Range support.
+    ``drop`` cuts the connection of the first download of a file after that many bytes, to
+    interrupt it, and ``delay`` slows every chunk so concurrent downloads overlap. Records
+    the Range header of every download and the peak number of concurrent downloads.
+    """
+    def __init__(self, files: Dict[str, bytes], drop: Optional[Dict[str, int]] = None, delay: float = 0.0,
+                 chunk_size: int = 4096):
+        self.files = files
+        self.drop = dict(drop or {})
+        self.delay = delay
+        self.chunk_size = chunk_size
+        self.ranges = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if self.path == '/gopro/media/list':
+                    directories: Dict[str, list] = {}
+                    for path, data in stub.files.items():
+                        directory, name = path.split('/')
+                        directories.setdefault(directory, []).append({'n': name, 's': str(len(data)), 'mod': '0'})
+                    body = json.dumps({'id': '1', 'media': [{'d': d, 'fs': fs} for d, fs in directories.items()]}).encode()
+                    return self.reply(200, body)
+                path = self.path[len('/videos/DCIM/'):]
+                if not self.path.startswith('/videos/DCIM/') or path not in stub.files:
+                    return self.reply(404, b"")
+                stub.download(self, path)
+
+            def reply(self, status: int, body: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                for key, value in {**(headers or {}), 'Content-Length': str(len(body))}.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def download(self, handler: BaseHTTPRequestHandler, path: str) -> None:
+        data = self.files[path]
+        requested = handler.headers.get('Range')
+        self.ranges.append((path, requested))
+        start = int(requested[len('bytes='):].split('-')[0]) if requested else 0
+        if start >= len(data):
+            return handler.reply(416, b"", {'Content-Range': f"bytes */{len(data)}"})
+        body = data[start:]
+        handler.send_response(206 if requested else 200)
+        handler.send_header('Content-Length', str(len(body)))
+        if requested:
+            handler.send_header('Content-Range', f"bytes {start}-{len(data) - 1}/{len(data)}")
+        handler.end_headers()
+        cut = self.drop.pop(path, None)
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            end = len(body) if cut is None else min(cut, len(body))
+            for offset in range(0, end, self.chunk_size):
+                time.sleep(self.delay)
+                handler.wfile.write(body[offset:min(offset + self.chunk_size, end)])
+            if end < len(body):
+                handler.close_connection = True
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
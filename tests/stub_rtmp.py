@@ -0,0 +1,65 @@
+import asyncio
+import os
+from typing import Dict, List
+from ingest import COMMAND_AMF0, HANDSHAKE_SIZE, SET_CHUNK_SIZE, VIDEO, ChunkReader, amf_decode, amf_encode, encode_message
+
+
+class StubRtmpServer:
+    """
+    Local stand-in for an RTMP ingest server.
+
+    Answers the handshake, connect, createStream and play commands like nginx-rtmp. A played
+    stream listed in ``publishing`` gets a video packet after its delay in seconds, any other
+    stream gets nothing, as if the camera never started publishing. Records every played name.
+    """
+    def __init__(self, publishing: Dict[str, float] = None, chunk_size: int = 4096):
+        self.publishing = dict(publishing or {})
+        self.chunk_size = chunk_size
+        self.plays: List[str] = []
+        self.server = None
+        self.port = None
+
+    async def start(self) -> "StubRtmpServer":
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    def url(self, name: str) -> str:
+        return f"rtmp://127.0.0.1:{self.port}/live/{name}"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            c0c1 = await reader.readexactly(1 + HANDSHAKE_SIZE)
+            writer.write(b'\x03' + bytes(8) + os.urandom(HANDSHAKE_SIZE - 8) + c0c1[1:])
+            await reader.readexactly(HANDSHAKE_SIZE)
+            # A larger chunk size exercises the client's chunk reassembly
+            writer.write(encode_message(2, SET_CHUNK_SIZE, 0, self.chunk_size.to_bytes(4, 'big')))
+            chunks = ChunkReader(reader)
+            while True:
+                type_id, _, payload = await chunks.message()
+                if type_id != COMMAND_AMF0:
+                    continue
+                command, transaction, *args = amf_decode(payload)
+                if command == 'connect':
+                    self._send(writer, 3, 0, '_result', transaction, {'fmsVer': 'stub'}, {'code': 'NetConnection.Connect.Success'})
+                elif command == 'createStream':
+                    self._send(writer, 3, 0, '_result', transaction, None, 1)
+                elif command == 'play':
+                    name = args[1]
+                    self.plays.append(name)
+                    self._send(writer, 5, 1, 'onStatus', 0, None, {'level': 'status', 'code': 'NetStream.Play.Start'})
+                    if name in self.publishing:
+                        await asyncio.sleep(self.publishing[name])
+                        writer.write(encode_message(6, VIDEO, 1, b'\x17\x00' + bytes(6000), self.chunk_size))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _send(self, writer: asyncio.StreamWriter, csid: int, stream_id: int, *values) -> None:
+        writer.write(encode_message(csid, COMMAND_AMF0, stream_id, amf_encode(*values), self.chunk_size))
@@ -0,0 +1,48 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class StubControlServer:
+    """
+    Local stand-in for the stream script control endpoint on port 8080.
+
+    Records the query parameters and client address of every request and answers with a configurable
+    status, body and delay. Tests listen on a free port, pass ``port=8080`` to stand in for the real server.
+    """
+    def __init__(self, status: int = 200, body: str = "ok", delay: float = 0.0, port: int = 0):
+        self.status = status
+        self.body = body
+        self.delay = delay
+        self.requests = []
+        self.clients = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append(dict(parse_qsl(urlsplit(self.path).query)))
+                stub.clients.append(self.client_address)
+                time.sleep(stub.delay)
+                body = stub.body.encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
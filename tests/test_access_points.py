@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import MagicMock
+from access_points import AccessPoint, AccessPointPlan
+from bitrate_planner import BitratePlanner
+from gopro_manager import FleetCamera, FleetScheduler, GoProManager, RetryPolicy
+from relay_controller import RelayController
+from simulated_gopro import SimulatedFleet, SimulationSettings
+
+FAST = SimulationSettings().scaled(0.002)
+
+
+def test_plan_balances_bitrate_by_capacity_and_honours_pins():
+    plan = AccessPointPlan(MagicMock(), [AccessPoint("big", "pw", 30000), AccessPoint("small", "pw", 10000)], pinned={'e': "small"})
+
+    placement = plan.place({'a': 8000, 'b': 8000, 'c': 4000, 'd': 4000, 'e': 2000})
+
+    # Largest streams first, each to the access point left least full relative to its capacity
+    assert placement == {'e': "small", 'a': "big", 'b': "big", 'c': "small", 'd': "big"}
+    assert [access_point.load for access_point in plan.access_points] == [20000, 6000]
+    # Placed cameras stay put when the plan is refreshed, only their bitrate is updated
+    assert plan.place({'a': 3000, 'b': 8000, 'c': 4000, 'd': 4000, 'e': 2000}) == placement
+    assert plan.credentials('c') == ("small", "pw")
+
+def test_plan_moves_cameras_that_fail_to_join_or_keep_dropping():
+    log = MagicMock()
+    plan = AccessPointPlan(log, [AccessPoint("one", "pw"), AccessPoint("two", "pw"), AccessPoint("three", "pw")],
+                           pinned={'pinned': "one"}, max_drops=2)
+    plan.place({'a': 4000, 'pinned': 4000})
+
+    assert plan.ssid('a') == "two"
+    assert plan.move('a', "Joining failed") == "three"
+    assert plan.move('a', "Joining failed") == "one"
+    # Every access point failed it, so it cycles through the others again
+    assert plan.move('a', "Joining failed") == "two"
+    assert plan.move('pinned', "Joining failed") is None and plan.ssid('pinned') == "one"
+    assert plan.record_drop('a') is None
+    assert plan.record_drop('a') == "three"
+    assert plan.record_drop('a') is None
+
+def test_plan_from_config_falls_back_to_single_network():
+    plan = AccessPointPlan.from_config(MagicMock(), {'ssid': "venue", 'password': "pw", 'gopros': [{'name': 'a', 'target': 'cam1'}]})
+
+    assert plan.credentials('a', 5000) == ("venue", "pw")
+    assert plan.move('a', "Joining failed") is None
+
+@pytest.mark.asyncio
+async def test_scheduler_moves_camera_to_another_access_point_when_joining_fails():
+    fleet = SimulatedFleet(FAST._replace(unreachable=("down",)), seed=1)
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = fleet
+    plan = AccessPointPlan(MagicMock(), [AccessPoint("down", "pw", 20000), AccessPoint("up", "pw", 10000)])
+    plan.place({'a': 5000, 'b': 5000})
+    scheduler = FleetScheduler(manager, retry=RetryPolicy(attempts=3, base_delay=0.0, jitter=0.0), access_points=plan)
+
+    report = await scheduler.bring_up([FleetCamera('a', 'cam1'), FleetCamera('b', 'cam2')], "unused", "unused", "server")
+
+    assert sorted(report.streaming()) == ['cam1', 'cam2']
+    assert {gopro.connected_ssid for gopro in fleet.cameras.values()} == {"up"}
+    assert plan.ssid('a') == plan.ssid('b') == "up"
+    assert manager.metrics.snapshot()['counters']['retries'] == {'cam1': {'ok': 1}, 'cam2': {'ok': 1}}
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_controller_plans_access_points_and_reports_them():
+    controller = RelayController(MagicMock(), GoProManager(MagicMock()))
+    config = {
+        'ssid': "venue", 'password': "pw", 'server_ip': "127.0.0.1", 'uplink_kbps': 40000,
+        'access_points': [{'ssid': "north", 'password': "pw", 'capacity_kbps': 20000},
+                          {'ssid': "south", 'password': "pw", 'capacity_kbps': 20000}],
+        'gopros': [{'name': 'a', 'target': 'cam1'}, {'name': 'b', 'target': 'cam2'}, {'name': 'c', 'target': 'cam3', 'access_point': "north"}],
+    }
+    controller.config = config
+    controller.scheduler.set_planner(BitratePlanner.from_config(controller.log, config))
+
+    controller.plan_networks(config, controller.cameras(config))
+    status = controller.status()
+
+    assert [camera['access_point'] for camera in status['cameras']] == ["south", "north", "north"]
+    assert [access_point['cameras'] for access_point in status['access_points']] == [['b', 'c'], ['a']]
+    assert controller.scheduler.access_points is controller.access_points
+    # Starting again with a single network drops the plan
+    controller.plan_networks({**config, 'access_points': []}, controller.cameras(config))
+    assert controller.scheduler.access_points is None and controller.status()['cameras'][0]['access_point'] == "venue"
+    await controller.close()
@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import MagicMock
+from open_gopro import proto
+from bitrate_planner import DEFAULT_PROFILE, BitratePlanner, BitrateProfile, over_budget, plan_bitrates
+from setup_state import CameraSetup, SetupState
+
+
+def test_without_uplink_budget_keeps_default_bitrates():
+    plan = plan_bitrates(["a", "b"])
+
+    assert plan == {"a": DEFAULT_PROFILE, "b": DEFAULT_PROFILE}
+    assert (DEFAULT_PROFILE.minimum, DEFAULT_PROFILE.maximum, DEFAULT_PROFILE.starting) == (800, 8000, 5000)
+
+def test_uplink_budget_is_shared_between_cameras():
+    names = [f"cam{i}" for i in range(8)]
+
+    plan = plan_bitrates(names, uplink_kbps=20000)
+
+    assert all(profile == BitrateProfile(800, 2000, 1500) for profile in plan.values())
+    assert sum(profile.starting for profile in plan.values()) <= 20000 * 0.8
+
+def test_overrides_reserve_their_share_and_are_clamped():
+    overrides = {"main": {"min": 2000, "max": 9000, "start": 7000, "resolution": "1080", "fov": "linear"}}
+
+    plan = plan_bitrates(["main", "b", "c"], uplink_kbps=16000, overrides=overrides, resolution="auto")
+
+    assert plan["main"] == BitrateProfile(2000, 8000, 7000, "1080", "linear")
+    assert plan["main"].window_size == proto.EnumWindowSize.WINDOW_SIZE_1080
+    assert plan["main"].lens == proto.EnumLens.LENS_LINEAR
+    assert plan["b"] == BitrateProfile(800, 2400, 1800, "720", None)
+
+def test_planner_replans_when_cameras_join_or_leave():
+    config = {'uplink_kbps': 10000, 'gopros': [{'name': 'a', 'target': '1'}, {'name': 'b', 'target': '2', 'fov': 'wide'}]}
+    planner = BitratePlanner.from_config(MagicMock(), config)
+    planner.expect(["a", "b"])
+    assert planner.profile("a").maximum == 4000
+    assert planner.profile("b").fov == "wide"
+
+    setup = CameraSetup("b", "2")
+    setup.state = SetupState.FAILED
+    planner.on_state_change(setup)
+    assert planner.profile("a").maximum == 8000
+
+    planner.profile("c")
+    assert planner.plan["a"].maximum == 4000
+
+def test_planner_warns_when_the_plan_exceeds_the_uplink():
+    # Eight cameras on 4000 kbps get less than the minimum bitrate each
+    assert over_budget(plan_bitrates([f"cam{i}" for i in range(8)], uplink_kbps=4000), 4000) == 8 * 800 - 3200
+    # Overrides reserving more than the budget
+    overrides = {"a": {"max": 6000}, "b": {"max": 6000}}
+    assert over_budget(plan_bitrates(["a", "b", "c"], uplink_kbps=10000, overrides=overrides), 10000) == 12800 - 8000
+    assert over_budget(plan_bitrates(["a", "b"], uplink_kbps=10000), 10000) == 0
+
+    log = MagicMock()
+    planner = BitratePlanner(log, 4000)
+    planner.expect([f"cam{i}" for i in range(8)])
+    log.assert_called_with("Warning: the bitrate plan exceeds the uplink budget of 3200 kbps by 3200 kbps, "
+                           "lower the bitrate overrides, stream fewer cameras or raise the uplink")
+
+def test_unsupported_resolution_or_fov_is_rejected_when_the_plan_is_built():
+    with pytest.raises(ValueError, match="b: Unsupported resolution '4k'"):
+        BitratePlanner.from_config(MagicMock(), {'gopros': [{'name': 'a'}, {'name': 'b', 'resolution': '4k'}]})
+    with pytest.raises(ValueError, match="Default: Unsupported field of view 'fisheye'"):
+        BitratePlanner.from_config(MagicMock(), {'fov': 'fisheye', 'gopros': [{'name': 'a'}]})
+    with pytest.raises(ValueError, match="a: Unsupported field of view 'narrow'"):
+        plan_bitrates(["a"], overrides={"a": {"fov": "narrow"}})
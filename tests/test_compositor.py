@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from compositor import CompositorFeed
+from setup_state import CameraSetup, SetupState
+
+
+@pytest.fixture
+def manager():
+    manager = MagicMock()
+    manager.state_listeners = []
+    manager.run_script_on_server = AsyncMock()
+    return manager
+
+def set_state(manager, name, state):
+    setup = CameraSetup(name, f"target_{name}")
+    setup.state = state
+    for listener in list(manager.state_listeners):
+        listener(setup)
+
+@pytest.mark.asyncio
+async def test_feed_starts_on_first_stream_and_follows_changes(manager):
+    feed = CompositorFeed(manager, "test_server", ["a", "b", "c"], "rtmp://test_server/live/output", settle=0.01)
+    feed.start()
+
+    set_state(manager, "b", SetupState.STREAMING)
+    await asyncio.sleep(0.05)
+    manager.run_script_on_server.assert_called_once_with(
+        action='start', server_address="test_server",
+        input_streams=["rtmp://test_server/live/b"], output_stream="rtmp://test_server/live/output")
+
+    set_state(manager, "a", SetupState.STREAMING)
+    set_state(manager, "c", SetupState.FAILED)
+    await asyncio.sleep(0.05)
+    assert manager.run_script_on_server.call_count == 2
+    assert manager.run_script_on_server.call_args.kwargs["input_streams"] == ["rtmp://test_server/live/a", "rtmp://test_server/live/b"]
+
+    set_state(manager, "b", SetupState.FAILED)
+    await asyncio.sleep(0.05)
+    assert manager.run_script_on_server.call_args.kwargs["input_streams"] == ["rtmp://test_server/live/a"]
+
+    await feed.close()
+    manager.run_script_on_server.assert_called_with(action='stop', server_address="test_server")
+    assert manager.state_listeners == []
+
+@pytest.mark.asyncio
+async def test_feed_never_started_sends_nothing(manager):
+    feed = CompositorFeed(manager, "test_server", ["a"], "rtmp://test_server/live/output", settle=0.01)
+    feed.start()
+
+    set_state(manager, "a", SetupState.FAILED)
+    await feed.sync()
+    await feed.close()
+
+    manager.run_script_on_server.assert_not_called()
@@ -0,0 +1,59 @@
+import asyncio
+import time
+import pytest
+from control_client import ControlClient
+from stub_server import StubControlServer
+
+
+def test_build_params_skips_empty_streams():
+    params = ControlClient.build_params("start", ["rtmp://a/live/x", "", "rtmp://a/live/y"], "rtmp://a/live/output")
+
+    assert params == {'action': 'start', 'input0': 'rtmp://a/live/x', 'input2': 'rtmp://a/live/y', 'output': 'rtmp://a/live/output'}
+
+def test_request_reports_error_status(control_server):
+    control_server.status = 500
+    control_server.body = "boom"
+    client = ControlClient(port=control_server.port)
+
+    result = client.request("127.0.0.1", {'action': 'stop'})
+
+    assert not result.ok
+    assert (result.status_code, result.text, result.error) == (500, "boom", None)
+
+def test_request_times_out():
+    with StubControlServer(delay=0.5) as server:
+        client = ControlClient(port=server.port, read_timeout=0.1)
+
+        result = client.request("127.0.0.1", {'action': 'stop'})
+
+    assert not result.ok and result.status_code is None and result.error
+
+def test_connections_are_reused(control_server):
+    client = ControlClient(port=control_server.port)
+
+    client.request("127.0.0.1", {'action': 'start'})
+    client.request("127.0.0.1", {'action': 'stop'})
+
+    assert len(control_server.clients) == 2
+    assert control_server.clients[0] == control_server.clients[1]
+    client.close()
+
+@pytest.mark.asyncio
+async def test_run_script_does_not_block_event_loop():
+    with StubControlServer(delay=0.3) as server:
+        client = ControlClient(port=server.port)
+        worst_lag = 0.0
+
+        async def ticker():
+            nonlocal worst_lag
+            while True:
+                before = time.monotonic()
+                await asyncio.sleep(0.01)
+                worst_lag = max(worst_lag, time.monotonic() - before - 0.01)
+
+        ticks = asyncio.create_task(ticker())
+        result = await client.run_script("start", "127.0.0.1", ["rtmp://a/live/x"])
+        ticks.cancel()
+
+    assert result.ok
+    assert worst_lag < 0.1
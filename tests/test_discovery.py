@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from discovery import DiscoveryCache
+from gopro_manager import GoProManager
+from test_gopro_manager import make_streaming_gopro
+
+ADVERTISED = {"GoPro 0001": "device-1", "GoPro 0002": "device-2", "GoPro 0003": "device-3", "Headphones": "device-x"}
+
+
+class FakeScanner:
+    def __init__(self, advertised=ADVERTISED, interval=0.01):
+        self.advertised = advertised
+        self.interval = interval
+        self.scans = 0
+
+    async def __call__(self, on_device, timeout):
+        self.scans += 1
+        for name, device in self.advertised.items():
+            await asyncio.sleep(self.interval)
+            if on_device(name, device):
+                return
+
+@pytest.mark.asyncio
+async def test_concurrent_resolves_share_one_scan():
+    scanner = FakeScanner()
+    discovery = DiscoveryCache(MagicMock(), scanner)
+
+    first, second = await asyncio.gather(discovery.resolve(["GoPro 0001"]), discovery.resolve(["GoPro 0003"]))
+
+    assert first == {"GoPro 0001": "device-1"} and second == {"GoPro 0003": "device-3"}
+    assert scanner.scans == 1
+
+@pytest.mark.asyncio
+async def test_cached_devices_skip_scanning_until_they_expire():
+    scanner = FakeScanner()
+    discovery = DiscoveryCache(MagicMock(), scanner, ttl=0.05)
+
+    await discovery.resolve(["GoPro 0001", "GoPro 0002"])
+    await discovery.resolve(["GoPro 0002"])
+    assert scanner.scans == 1
+
+    await asyncio.sleep(0.06)
+    await discovery.resolve(["GoPro 0002"])
+    assert scanner.scans == 2
+
+@pytest.mark.asyncio
+async def test_missing_target_and_failed_scan_are_logged():
+    log_callback = MagicMock()
+    discovery = DiscoveryCache(log_callback, FakeScanner(), scan_timeout=0.1)
+
+    assert await discovery.resolve(["GoPro 9999"]) == {}
+    log_callback.assert_any_call("BLE discovery did not find: GoPro 9999")
+
+    async def broken(on_device, timeout):
+        raise RuntimeError("No Bluetooth adapters found.")
+    discovery.scanner = broken
+    assert await discovery.resolve(["GoPro 0001"]) == {}
+    log_callback.assert_any_call("BLE discovery failed, cameras will scan on their own: No Bluetooth adapters found.")
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_manager_connects_to_discovered_device(mock_wireless_gopro):
+    scanner = FakeScanner()
+    mock_wireless_gopro.return_value = make_streaming_gopro()
+    manager = GoProManager(MagicMock(), discovery=DiscoveryCache(MagicMock(), scanner))
+
+    await manager.setup_gopro("stream", "GoPro 0002", "ssid", "password", "server")
+    await manager.stop_live_stream("GoPro 0002")
+
+    mock_wireless_gopro.assert_called_once_with(target="device-2", enable_wifi=False)
+    assert scanner.scans == 1
+    await manager.close()
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_failed_connection_invalidates_discovered_device(mock_wireless_gopro):
+    mock_gopro_obj = make_streaming_gopro()
+    mock_gopro_obj.open.side_effect = Exception("Connection error")
+    mock_wireless_gopro.return_value = mock_gopro_obj
+    discovery = DiscoveryCache(MagicMock(), FakeScanner())
+    manager = GoProManager(MagicMock(), discovery=discovery)
+
+    await manager.setup_gopro("stream", "GoPro 0001", "ssid", "password", "server")
+
+    assert discovery.get("GoPro 0001") is None
+    await manager.close()
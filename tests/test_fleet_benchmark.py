@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import MagicMock
+from benchmark_fleet import format_results, run_benchmark
+from gopro_manager import GoProManager
+from setup_state import SetupState
+from simulated_gopro import SimulatedFleet, SimulationSettings
+
+FAST = SimulationSettings().scaled(0.002)
+
+
+@pytest.mark.asyncio
+async def test_simulated_gopro_walks_state_machine():
+    fleet = SimulatedFleet(FAST, seed=1)
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = fleet
+
+    setup = await manager.setup_gopro("stream", "cam1", "ssid", "password", "server")
+
+    assert setup.state == SetupState.STREAMING
+    assert fleet.cameras["cam1"].livestream_url == "rtmp://server/live/stream"
+    assert set(setup.phase_durations()) >= {SetupState.CONNECTING, SetupState.JOINING_AP, SetupState.CONFIGURING, SetupState.READY}
+    await manager.stop_live_stream("cam1")
+    assert not fleet.cameras["cam1"].streaming
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_simulated_gopro_fails_joining_access_point():
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = SimulatedFleet(FAST._replace(ap_failure_rate=1.0))
+
+    setup = await manager.setup_gopro("stream", "cam1", "ssid", "password", "server")
+
+    assert setup.state == SetupState.FAILED
+    assert setup.error == "cam1 could not join ssid"
+    await manager.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cameras", [1, 10, 50])
+async def test_benchmark_brings_fleet_up_and_down(control_server, cameras):
+    result = await run_benchmark(cameras, FAST, control_server.port, max_handshakes=3)
+
+    assert result.streaming == result.peak_streaming == cameras
+    assert result.peak_handshakes == min(3, cameras)
+    assert result.bring_up > 0 and result.tear_down > 0
+    assert control_server.requests[-1] == {'action': 'stop'}
+    assert str(cameras) in format_results([result])
+
+@pytest.mark.asyncio
+async def test_benchmark_retries_flaky_connections(control_server):
+    result = await run_benchmark(10, FAST._replace(connect_failure_rate=0.5), control_server.port)
+
+    assert result.streaming == 10
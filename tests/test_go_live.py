@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from gopro_manager import FleetCamera, FleetScheduler, GoProManager
+from setup_state import SetupState
+from simulated_gopro import SimulatedFleet, SimulationSettings
+
+FAST = SimulationSettings().scaled(0.002)
+
+
+@pytest.fixture
+def fleet():
+    return SimulatedFleet(FAST, seed=5)
+
+@pytest.fixture
+def manager(fleet):
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = fleet
+    return manager
+
+@pytest.mark.asyncio
+async def test_arm_holds_cameras_ready_then_go_live_starts_them_together(manager, fleet):
+    cameras = [FleetCamera(f"stream{i}", f"cam{i}") for i in range(8)]
+
+    report = await FleetScheduler(manager).bring_up(cameras, "ssid", "password", "server", arm=True)
+
+    assert sorted(report.armed()) == sorted(camera.target for camera in cameras)
+    assert not any(gopro.streaming for gopro in fleet.cameras.values())
+
+    live = await manager.go_live()
+
+    assert sorted(live.streaming) == sorted(camera.target for camera in cameras) and not live.failed
+    assert all(manager.get_state(camera.target) == SetupState.STREAMING for camera in cameras)
+    assert live.trigger_latency < 0.5
+    assert live.trigger_spread <= live.trigger_latency
+    assert "8 cameras live, 0 failed" in live.summary()
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_go_live_fails_cameras_that_lost_their_connection(manager, fleet):
+    await manager.setup_gopro("a", "cam1", "ssid", "password", "server", arm=True)
+    await manager.setup_gopro("b", "cam2", "ssid", "password", "server", arm=True)
+    fleet.cameras["cam2"].is_ble_connected = False
+
+    live = await manager.go_live()
+
+    assert list(live.streaming) == ["cam1"]
+    assert live.failed == {"cam2": "Connection lost while armed"}
+    assert manager.get_state("cam2") == SetupState.FAILED
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_stopping_an_armed_camera_drops_its_status_callback(manager, fleet):
+    await manager.setup_gopro("a", "cam1", "ssid", "password", "server", arm=True)
+
+    await manager.stop_live_stream("cam1")
+
+    assert not any(fleet.cameras["cam1"]._listeners.values()) and not manager.armed
+    assert (await manager.go_live()).summary() == "No camera went live (0 failed)"
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_armed_cameras_stay_connected_past_idle_timeout(fleet):
+    manager = GoProManager(MagicMock(), idle_timeout=0.05)
+    manager.pool.factory = fleet
+    await manager.setup_gopro("a", "cam1", "ssid", "password", "server", arm=True)
+    await asyncio.sleep(0.1)
+
+    await manager.pool.evict_idle()
+    live = await manager.go_live()
+
+    assert list(live.streaming) == ["cam1"] and not live.failed
+    # After going live the camera no longer holds its connection for the arm
+    assert manager.pool.get("cam1").in_use == 0 and not manager.armed
+    await manager.close()
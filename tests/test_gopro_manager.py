@@ -2,7 +2,9 @@ import open_gopro.constants
 import open_gopro.types
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
-from gopro_manager import GoProManager
+from gopro_manager import FleetCamera, FleetScheduler, GoProManager, RetryPolicy
+from setup_state import SetupState
+from control_client import ControlClient
 import open_gopro
 import logging
 import asyncio
@@ -39,27 +41,140 @@ async def test_stop_live_stream_success(mock_wireless_gopro, gopro_manager, log_
 
     await gopro_manager.stop_live_stream("test_target")
 
-    mock_gopro_obj.open.assert_called_once_with(retries=100)
+    mock_gopro_obj.open.assert_called_once_with(retries=5)
     mock_gopro_obj.ble_command.set_shutter.assert_called_with(shutter=open_gopro.constants.Toggle.DISABLE)
-    mock_gopro_obj.close.assert_called_once()
+    mock_gopro_obj.close.assert_not_called()
     log_callback.assert_any_call("test_target: Livestream has been stopped.")
 
-@patch('gopro_manager.requests.get')
-def test_run_script_on_server_success(mock_requests_get, gopro_manager, log_callback):
-    mock_response = MagicMock()
-    mock_response.status_code = 200
-    mock_response.text = "Script executed successfully"
-    mock_requests_get.return_value = mock_response
+    await gopro_manager.close()
+    mock_gopro_obj.close.assert_called_once()
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_stop_live_stream_reuses_connection(mock_wireless_gopro, gopro_manager, log_callback):
+    mock_gopro_obj = AsyncMock()
+    mock_gopro_obj.is_ble_connected = True
+    mock_wireless_gopro.return_value = mock_gopro_obj
+
+    await gopro_manager.stop_live_stream("test_target")
+    await gopro_manager.stop_live_stream("test_target")
+
+    mock_wireless_gopro.assert_called_once()
+    mock_gopro_obj.open.assert_called_once()
+    await gopro_manager.close()
 
-    gopro_manager.run_script_on_server("start", "test_server", ["input1", "input2"], "output")
+@pytest.mark.asyncio
+async def test_run_script_on_server_success(control_server, log_callback):
+    control_server.body = "Script executed successfully"
+    manager = GoProManager(log_callback, control=ControlClient(port=control_server.port))
+
+    result = await manager.run_script_on_server("start", "127.0.0.1", ["rtmp://host/live/a b", "input2"], "output")
 
-    mock_requests_get.assert_called_once_with('http://test_server:8080?action=start&input0=input1&input1=input2&output=output')
+    assert result.ok and result.status_code == 200
+    assert control_server.requests == [{'action': 'start', 'input0': 'rtmp://host/live/a b', 'input1': 'input2', 'output': 'output'}]
     log_callback.assert_any_call("Script output: Script executed successfully")
 
-@patch('gopro_manager.requests.get')
-def test_run_script_on_server_exception(mock_requests_get, gopro_manager, log_callback):
-    mock_requests_get.side_effect = requests.exceptions.RequestException("Connection error")
+@pytest.mark.asyncio
+async def test_run_script_on_server_exception(gopro_manager, log_callback):
+    gopro_manager.control.session.get = MagicMock(side_effect=requests.exceptions.RequestException("Connection error"))
 
-    gopro_manager.run_script_on_server("start", "test_server", ["input1", "input2"], "output")
+    result = await gopro_manager.run_script_on_server("start", "test_server", ["input1", "input2"], "output")
 
+    assert not result.ok and result.error == "Connection error"
     log_callback.assert_any_call("Failed to connect to server: Connection error")
+
+def make_streaming_gopro():
+    """Build a mock GoPro that reports READY after configuration and STREAMING after the shutter."""
+    mock_gopro_obj = AsyncMock()
+    mock_gopro_obj.is_ble_connected = True
+    mock_gopro_obj.register_update = MagicMock()
+    mock_gopro_obj.unregister_update = MagicMock()
+
+    async def notify(status):
+        callback = mock_gopro_obj.register_update.call_args[0][0]
+        await callback(None, open_gopro.proto.NotifyLiveStreamStatus(live_stream_status=status))
+
+    async def set_livestream_mode(**kwargs):
+        await notify(open_gopro.proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_READY)
+
+    async def set_shutter(shutter):
+        if shutter == open_gopro.constants.Toggle.ENABLE:
+            await notify(open_gopro.proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING)
+
+    mock_gopro_obj.ble_command.set_livestream_mode.side_effect = set_livestream_mode
+    mock_gopro_obj.ble_command.set_shutter.side_effect = set_shutter
+    return mock_gopro_obj
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_setup_gopro_walks_state_machine(mock_wireless_gopro, gopro_manager, log_callback):
+    mock_wireless_gopro.return_value = make_streaming_gopro()
+    seen = []
+    gopro_manager.state_listeners.append(lambda setup: seen.append(setup.state))
+
+    setup = await gopro_manager.setup_gopro("test_stream", "test_target", "test_ssid", "test_password", "test_server")
+
+    assert setup.state == SetupState.STREAMING
+    assert gopro_manager.get_state("test_target") == SetupState.STREAMING
+    assert seen == [
+        SetupState.QUEUED, SetupState.CONNECTING, SetupState.SHUTTER_OFF, SetupState.JOINING_AP,
+        SetupState.CONFIGURING, SetupState.READY, SetupState.STREAMING,
+    ]
+    assert set(setup.phase_durations()) == set(seen[:-1]) | {SetupState.IDLE}
+    log_callback.assert_any_call("test_target: Livestream is now streaming and should be available for viewing.")
+
+    await gopro_manager.stop_live_stream("test_target")
+    assert gopro_manager.get_state("test_target") == SetupState.IDLE
+    await gopro_manager.close()
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_setup_gopro_times_out_waiting_for_ready(mock_wireless_gopro, log_callback):
+    mock_gopro_obj = make_streaming_gopro()
+    mock_gopro_obj.ble_command.set_livestream_mode.side_effect = None
+    mock_wireless_gopro.return_value = mock_gopro_obj
+    manager = GoProManager(log_callback, timeouts={SetupState.CONFIGURING: 0.05})
+
+    setup = await manager.setup_gopro("test_stream", "test_target", "test_ssid", "test_password", "test_server")
+
+    assert setup.state == SetupState.FAILED
+    assert setup.error == "Timed out after 0.05s while configuring"
+    mock_gopro_obj.close.assert_called_once()
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_fleet_scheduler_caps_handshakes_and_retries(mock_wireless_gopro, gopro_manager, log_callback):
+    opened = []
+    flaky = {"cam3": 1}
+
+    def new_gopro(target, enable_wifi):
+        mock_gopro_obj = make_streaming_gopro()
+
+        async def open(retries):
+            opened.append(target)
+            await asyncio.sleep(0.01)
+            if flaky.get(target):
+                flaky[target] -= 1
+                raise Exception("Connection error")
+        mock_gopro_obj.open.side_effect = open
+        return mock_gopro_obj
+
+    mock_wireless_gopro.side_effect = new_gopro
+    cameras = [FleetCamera(f"stream{i}", f"cam{i}", priority=1 if i == 4 else 0) for i in range(6)]
+    scheduler = FleetScheduler(gopro_manager, max_handshakes=2, retry=RetryPolicy(attempts=3, base_delay=0.01))
+
+    report = await scheduler.bring_up(cameras, "test_ssid", "test_password", "test_server")
+
+    assert sorted(report.streaming()) == [f"cam{i}" for i in range(6)]
+    assert report.peak_handshakes == 2
+    assert opened[0] == "cam4"
+    assert len(report.setups["cam3"]) == 2
+    assert SetupState.CONNECTING in report.phase_totals()
+    assert any(call[0][0].startswith("cam3: Retrying setup in") for call in log_callback.call_args_list)
+    await gopro_manager.close()
+
+def test_retry_policy_backs_off_exponentially_with_jitter():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0, jitter=0.5)
+
+    for attempt, ceiling in [(0, 1.0), (1, 2.0), (2, 4.0), (5, 5.0)]:
+        assert ceiling * 0.5 <= policy.delay(attempt) <= ceiling
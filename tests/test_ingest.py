@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from unittest.mock import AsyncMock, MagicMock
+from compositor import CompositorFeed
+from ingest import IngestTimeout, IngestVerifier, amf_decode, amf_encode, rtmp_first_packet
+from metrics import Metrics
+from setup_state import CameraSetup, SetupState
+from stub_rtmp import StubRtmpServer
+
+
+@pytest_asyncio.fixture
+async def rtmp_server():
+    server = await StubRtmpServer({'a': 0.05, 'b': 0.0}).start()
+    yield server
+    await server.close()
+
+def test_amf_round_trip():
+    values = ['connect', 1.0, {'app': 'live', 'fpad': False, 'nested': {'x': None}}, None, 'name']
+    assert amf_decode(amf_encode(*values)) == values
+
+@pytest.mark.asyncio
+async def test_probe_returns_once_a_published_stream_arrives(rtmp_server):
+    await rtmp_first_packet(rtmp_server.url('a'), timeout=1.0)
+
+    started = asyncio.get_running_loop().time()
+    with pytest.raises(asyncio.TimeoutError):
+        await rtmp_first_packet(rtmp_server.url('missing'), timeout=0.1)
+    assert asyncio.get_running_loop().time() - started < 0.2
+    assert rtmp_server.plays == ['a', 'missing']
+
+@pytest.mark.asyncio
+async def test_verifier_measures_time_to_first_packet_and_retries(rtmp_server):
+    log_callback = MagicMock()
+    verifier = IngestVerifier(log_callback, Metrics(), timeout=0.05, retry_delay=0.01)
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.1, rtmp_server.publishing.__setitem__, 'late', 0.0)
+
+    first_packet = await verifier.wait_for_stream('cam1', rtmp_server.url('late'))
+
+    assert 0.1 <= first_packet < 1.0
+    assert verifier.metrics.snapshot()['counters']['ingest_checks']['cam1']['ok'] == 1
+    assert verifier.metrics.snapshot()['phases']['ingest_first_packet']['cam1']['count'] == 1
+    log_callback.assert_any_call(f"cam1: Stream is not arriving at {rtmp_server.url('late')} yet: TimeoutError")
+
+@pytest.mark.asyncio
+async def test_verifier_gives_up_after_max_wait(rtmp_server):
+    log_callback = MagicMock()
+    verifier = IngestVerifier(log_callback, Metrics(), timeout=0.05, retry_delay=0.01, max_wait=0.2)
+
+    started = asyncio.get_running_loop().time()
+    with pytest.raises(IngestTimeout):
+        await verifier.wait_for_stream('cam1', rtmp_server.url('missing'))
+
+    assert asyncio.get_running_loop().time() - started < 0.4
+    assert verifier.metrics.snapshot()['counters']['ingest_checks']['cam1']['timeout'] == 1
+    given_up = [call for call in log_callback.call_args_list if "giving up" in call.args[0]]
+    assert len(given_up) == 1 and given_up[0].args[0].startswith(f"cam1: Stream did not arrive at {rtmp_server.url('missing')} within 0.2s, giving up after")
+
+@pytest.mark.asyncio
+async def test_feed_only_sends_streams_that_arrive(rtmp_server):
+    manager = MagicMock()
+    manager.state_listeners = []
+    manager.run_script_on_server = AsyncMock()
+    verifier = IngestVerifier(MagicMock(), timeout=0.2, retry_delay=0.01, max_wait=0.15)
+    feed = CompositorFeed(manager, "server", ["a", "b", "c"], "rtmp://server/live/output", settle=0.01,
+                          input_url=rtmp_server.url, verifier=verifier)
+    feed.start()
+
+    for name in "abc":
+        setup = CameraSetup(name, f"cam_{name}")
+        setup.state = SetupState.STREAMING
+        for listener in list(manager.state_listeners):
+            listener(setup)
+    await asyncio.sleep(0.3)
+
+    assert manager.run_script_on_server.call_args.kwargs['input_streams'] == [rtmp_server.url('a'), rtmp_server.url('b')]
+    assert set(feed.first_packet) == {'a', 'b'} and feed.first_packet['a'] >= 0.05
+    # The stream that never arrives is given up on and left out
+    assert feed.live == {'a', 'b'} and not feed._verifying
+    await feed.close()
+
+@pytest.mark.asyncio
+async def test_feed_uses_streams_unverified_when_the_probe_breaks():
+    manager = MagicMock()
+    manager.state_listeners = []
+    manager.run_script_on_server = AsyncMock()
+
+    async def probe(url, timeout):
+        raise ValueError("malformed reply")
+    feed = CompositorFeed(manager, "server", ["a"], "rtmp://server/live/output", settle=0.01,
+                          verifier=IngestVerifier(MagicMock(), probe=probe, retry_delay=0.01))
+    feed.start()
+
+    setup = CameraSetup("a", "cam_a")
+    setup.state = SetupState.STREAMING
+    for listener in list(manager.state_listeners):
+        listener(setup)
+    await asyncio.sleep(0.05)
+
+    assert manager.run_script_on_server.call_args.kwargs['input_streams'] == ["rtmp://server/live/a"]
+    assert "a" not in feed.first_packet
+    manager.log.assert_any_call("cam_a: Could not verify the stream, using it unverified: ValueError('malformed reply')")
+    await feed.close()
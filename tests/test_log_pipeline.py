@@ -0,0 +1,59 @@
+import asyncio
+import threading
+import pytest
+from log_pipeline import LogPipeline, current_camera, current_phase
+
+
+def test_drain_returns_records_in_batches_across_threads():
+    pipeline = LogPipeline()
+    threads = [threading.Thread(target=lambda i=i: [pipeline(f"{i}-{n}") for n in range(100)]) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    first = pipeline.drain(max_records=300)
+    rest = pipeline.drain()
+
+    assert len(first) == 300 and len(rest) == 100
+    assert pipeline.drain() == []
+
+def test_full_queue_drops_new_records():
+    pipeline = LogPipeline(max_queued=2)
+
+    for n in range(5):
+        pipeline(str(n))
+
+    assert [record.message for record in pipeline.drain()] == ["0", "1"]
+    assert pipeline.dropped == 3
+
+@pytest.mark.asyncio
+async def test_records_carry_camera_and_phase_of_their_task():
+    pipeline = LogPipeline()
+
+    async def camera_task(target):
+        current_camera.set(target)
+        current_phase.set("connecting")
+        await asyncio.sleep(0)
+        pipeline(f"{target}: hello")
+
+    await asyncio.gather(camera_task("cam1"), camera_task("cam2"))
+    pipeline("global")
+
+    records = {record.message: record for record in pipeline.drain()}
+    assert (records["cam1: hello"].camera, records["cam1: hello"].phase) == ("cam1", "connecting")
+    assert records["cam2: hello"].camera == "cam2"
+    assert records["global"].camera is None
+
+def test_records_are_mirrored_to_rotating_file(tmp_path):
+    log_file = tmp_path / "relay.log"
+    pipeline = LogPipeline(buffered=False)
+    pipeline.set_log_file(str(log_file), max_bytes=200, backup_count=1)
+
+    for n in range(20):
+        pipeline(f"message {n}")
+    pipeline.set_log_file(None)
+
+    assert "message 19" in log_file.read_text()
+    assert (tmp_path / "relay.log.1").exists()
+    assert pipeline.drain() == []
@@ -0,0 +1,121 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from gopro_manager import GoProManager
+from media_harvest import MediaEndpoint, MediaHarvester
+from relay_controller import RelayController
+from simulated_gopro import SimulatedFleet, SimulationSettings
+from stub_media import StubMediaServer
+
+
+def media(seed: int, size: int) -> bytes:
+    return bytes((seed + i) % 251 for i in range(size))
+
+def read(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+@pytest.mark.asyncio
+async def test_harvest_downloads_cameras_concurrently_within_connection_limit(tmp_path):
+    first = {f"100GOPRO/GX0{i}.MP4": media(i, 40000) for i in range(4)}
+    second = {"100GOPRO/GX01.MP4": media(9, 30000), "101GOPRO/GX02.MP4": media(7, 1000)}
+    with StubMediaServer(first, delay=0.005) as one, StubMediaServer(second, delay=0.005) as two:
+        endpoints = {'cam1': MediaEndpoint(one.url), 'cam2': MediaEndpoint(two.url)}
+
+        async def resolve(target):
+            return endpoints[target]
+        harvester = MediaHarvester(MagicMock(), str(tmp_path), resolve, per_camera=2, chunk_size=4096)
+        report = await harvester.harvest({'cam1': 'a', 'cam2': 'b'})
+        again = await harvester.harvest({'cam1': 'a', 'cam2': 'b'})
+        harvester.close()
+
+    assert sorted(result.outcome for result in report.results) == ['downloaded'] * 6
+    assert report.received == 4 * 40000 + 31000
+    for name, files in (('a', first), ('b', second)):
+        for path, data in files.items():
+            assert read(os.path.join(tmp_path, name, *path.split('/'))) == data
+    assert one.peak == 2 and two.peak <= 2
+    # A second harvest finds every file complete and downloads nothing
+    assert [result.outcome for result in again.results] == ['skipped'] * 6
+    assert len(one.ranges) == 4 and len(two.ranges) == 2
+
+@pytest.mark.asyncio
+async def test_interrupted_download_resumes_with_range_request(tmp_path):
+    data = media(3, 100000)
+    with StubMediaServer({"100GOPRO/GX01.MP4": data}, drop={"100GOPRO/GX01.MP4": 40000}) as camera:
+        async def resolve(target):
+            return MediaEndpoint(camera.url)
+        # The first harvest gives up on the cut download and keeps the partial file
+        harvester = MediaHarvester(MagicMock(), str(tmp_path), resolve, attempts=1, chunk_size=4096)
+        failed = await harvester.harvest({'cam1': 'a'})
+        path = os.path.join(tmp_path, 'a', '100GOPRO', 'GX01.MP4')
+        partial = os.path.getsize(path + '.part')
+        assert not os.path.exists(path)
+        resumed = await harvester.harvest({'cam1': 'a'})
+        harvester.close()
+
+    assert [result.outcome for result in failed.results] == ['failed']
+    assert 0 < partial <= 40000
+    assert [result.outcome for result in resumed.results] == ['resumed']
+    assert resumed.received == len(data) - partial
+    assert camera.ranges == [("100GOPRO/GX01.MP4", None), ("100GOPRO/GX01.MP4", f"bytes={partial}-")]
+    assert read(path) == data and not os.path.exists(path + '.part')
+
+@pytest.mark.asyncio
+async def test_controller_harvests_configured_media_urls_and_reports_unreachable_cameras(tmp_path):
+    manager = GoProManager(MagicMock())
+    manager.media_endpoint = MagicMock(side_effect=OSError("no BLE"))
+    controller = RelayController(MagicMock(), manager)
+    # Large enough for a cut in the second chunk to leave the first one on disk
+    data = bytes(range(256)) * 12000
+    with StubMediaServer({"100GOPRO/GX01.MP4": data}, drop={"100GOPRO/GX01.MP4": 1500000}, chunk_size=1 << 16) as camera:
+        config = {'gopros': [{'name': 'a', 'target': 'cam1', 'media_url': camera.url}, {'name': 'b', 'target': 'cam2'}]}
+        report = await controller.harvest(config, str(tmp_path))
+
+    # The cut download is resumed by the next attempt of the same harvest
+    assert [result.outcome for result in report.results] == ['resumed']
+    assert read(os.path.join(tmp_path, 'a', '100GOPRO', 'GX01.MP4')) == data
+    assert report.errors == {'cam2': "no BLE"}
+    assert manager.metrics.snapshot()['counters']['harvest_files']['cam1'] == {'resumed': 1}
+    await controller.close()
+
+@pytest.mark.asyncio
+async def test_file_waiting_to_retry_frees_its_download_slot(tmp_path):
+    files = {"100GOPRO/GX01.MP4": media(1, 20000), "100GOPRO/GX02.MP4": media(2, 20000)}
+    with StubMediaServer(files, drop={"100GOPRO/GX01.MP4": 8192}) as camera:
+        async def resolve(target):
+            return MediaEndpoint(camera.url)
+        harvester = MediaHarvester(MagicMock(), str(tmp_path), resolve, max_downloads=1, per_camera=1, chunk_size=4096, retry_delay=0.2)
+        report = await harvester.harvest({'cam1': 'a'})
+        harvester.close()
+
+    # The second file is downloaded while the first one backs off before resuming
+    assert [path for path, _ in camera.ranges] == ["100GOPRO/GX01.MP4", "100GOPRO/GX02.MP4", "100GOPRO/GX01.MP4"]
+    assert sorted(result.outcome for result in report.results) == ['downloaded', 'resumed']
+
+@pytest.mark.asyncio
+async def test_unsafe_file_name_fails_only_that_file(tmp_path):
+    files = {"100GOPRO/..": media(1, 1000), "100GOPRO/GX01.MP4": media(2, 1000)}
+    with StubMediaServer(files) as camera:
+        async def resolve(target):
+            return MediaEndpoint(camera.url)
+        harvester = MediaHarvester(MagicMock(), str(tmp_path), resolve)
+        report = await harvester.harvest({'cam1': 'a'})
+        harvester.close()
+
+    outcomes = {result.file.name: (result.outcome, result.error) for result in report.results}
+    assert outcomes == {'..': ('failed', "Unsafe file name '..'"), 'GX01.MP4': ('downloaded', None)}
+    assert report.errors == {}
+    assert [path for path, _ in camera.ranges] == ["100GOPRO/GX01.MP4"]
+
+@pytest.mark.asyncio
+async def test_camera_without_cohn_or_media_url_reports_how_to_reach_it(tmp_path):
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = SimulatedFleet(SimulationSettings().scaled(0.001), seed=1)
+    controller = RelayController(MagicMock(), manager)
+
+    report = await controller.harvest({'gopros': [{'name': 'a', 'target': 'cam1'}]}, str(tmp_path))
+
+    assert report.results == []
+    assert report.errors == {'cam1': 'cam1 is not provisioned for camera on the home network (COHN), set "media_url" for it in the config'}
+    await controller.close()
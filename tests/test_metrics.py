@@ -0,0 +1,89 @@
+import asyncio
+import json
+import pytest
+import requests
+from unittest.mock import MagicMock
+from control_api import ControlAPI
+from control_client import ControlClient
+from gopro_manager import FleetCamera, FleetScheduler, GoProManager, RetryPolicy
+from metrics import Metrics
+from relay_controller import RelayController
+from simulated_gopro import SimulatedFleet, SimulationSettings
+
+FAST = SimulationSettings().scaled(0.002)
+
+
+def test_histogram_buckets_and_prometheus_text():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe('join_ap', 'cam1', 0.05)
+    metrics.observe('join_ap', 'cam1', 0.5)
+    metrics.count('setups', 'cam1', 'streaming')
+
+    text = metrics.prometheus()
+
+    assert 'gopro_relay_phase_seconds_bucket{phase="join_ap",camera="cam1",le="0.1"} 1' in text
+    assert 'gopro_relay_phase_seconds_bucket{phase="join_ap",camera="cam1",le="+Inf"} 2' in text
+    assert 'gopro_relay_phase_seconds_count{phase="join_ap",camera="cam1"} 2' in text
+    assert 'gopro_relay_setups_total{camera="cam1",outcome="streaming"} 1' in text
+    assert metrics.snapshot()['phases']['join_ap']['cam1']['buckets'] == {'0.1': 1, '1.0': 2}
+
+def test_timed_records_errors_on_the_timeline(tmp_path):
+    metrics = Metrics()
+    metrics.start_timeline()
+
+    with pytest.raises(ValueError):
+        with metrics.timed('set_livestream_mode', 'cam1'):
+            raise ValueError()
+    metrics.dump_timeline(str(tmp_path / "trace.json"))
+
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    spans = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert [(span['name'], span['cat']) for span in spans] == [('set_livestream_mode', 'error')]
+
+@pytest.mark.asyncio
+async def test_manager_records_phases_outcomes_and_retries(control_server):
+    manager = GoProManager(MagicMock(), control=ControlClient(port=control_server.port))
+    fleet = SimulatedFleet(FAST, seed=3)
+
+    def factory(target):
+        # The first connection to every camera fails to join the access point, the retry succeeds
+        first = target not in fleet.cameras
+        gopro = fleet(target)
+        if first:
+            gopro.settings = gopro.settings._replace(ap_failure_rate=1.0)
+        return gopro
+    manager.pool.factory = factory
+    scheduler = FleetScheduler(manager, retry=RetryPolicy(attempts=10, base_delay=0.001, jitter=0.0))
+
+    await scheduler.bring_up([FleetCamera(f"stream{i}", f"cam{i}") for i in range(4)], "ssid", "password", "server")
+    await manager.stop_live_stream("cam0")
+    await manager.run_script_on_server("stop", "127.0.0.1")
+
+    snapshot = manager.metrics.snapshot()
+    assert {'handshake_queue', 'ble_open', 'shutter_off', 'join_ap', 'set_livestream_mode', 'wait_ready',
+            'wait_streaming', 'setup', 'stop', 'server_stop'} <= set(snapshot['phases'])
+    assert snapshot['counters']['stops'] == {'cam0': {'ok': 1}}
+    assert snapshot['counters']['server_requests'] == {'server': {'ok': 1}}
+    setups = snapshot['counters']['setups']
+    retries = sum(sum(c.values()) for c in snapshot['counters'].get('retries', {}).values())
+    assert all(counts['streaming'] == 1 for counts in setups.values())
+    assert sum(counts.get('failed', 0) for counts in setups.values()) == retries == 4
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_control_api_serves_metrics(control_server):
+    manager = GoProManager(MagicMock(), control=ControlClient(port=control_server.port))
+    manager.metrics.observe('ble_open', 'cam1', 1.5)
+    controller = RelayController(MagicMock(), manager)
+    api = ControlAPI(controller, {}, port=0)
+    await api.start()
+    base = f"http://127.0.0.1:{api.port}"
+
+    text = await asyncio.to_thread(requests.get, base + "/metrics")
+    snapshot = await asyncio.to_thread(requests.get, base + "/metrics.json")
+
+    assert text.headers['Content-Type'].startswith('text/plain')
+    assert 'gopro_relay_phase_seconds_sum{phase="ble_open",camera="cam1"} 1.500000' in text.text
+    assert snapshot.json()['phases']['ble_open']['cam1']['count'] == 1
+    await api.close()
+    await controller.close()
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+from control_client import ControlClient
+from gopro_manager import FleetCamera, FleetScheduler, GoProManager
+from relay_controller import RelayController
+from setup_state import SetupState
+from simulated_gopro import SimulatedFleet, SimulationSettings
+from stub_rtmp import StubRtmpServer
+
+FAST = SimulationSettings().scaled(0.002)
+CAMERAS = [FleetCamera(f"stream{i}", f"cam{i}") for i in range(3)]
+
+
+@pytest.fixture
+def fleet():
+    return SimulatedFleet(FAST, seed=7)
+
+@pytest.fixture
+def manager(fleet):
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = fleet
+    return manager
+
+async def bring_up(manager, ssid="ssid"):
+    report = await FleetScheduler(manager).bring_up(CAMERAS, ssid, "password", "server", reconcile=True)
+    assert sorted(report.streaming()) == [camera.target for camera in CAMERAS]
+
+def clear_commands(fleet):
+    for gopro in fleet.cameras.values():
+        gopro.commands.clear()
+
+@pytest.mark.asyncio
+async def test_reconcile_leaves_a_streaming_rig_alone(manager, fleet):
+    await bring_up(manager)
+    clear_commands(fleet)
+
+    await bring_up(manager)
+
+    assert all(gopro.commands == ['register_livestream_status'] for gopro in fleet.cameras.values())
+    assert all(manager.get_state(camera.target) == SetupState.STREAMING for camera in CAMERAS)
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_reconcile_only_fixes_the_broken_cameras(manager, fleet):
+    await bring_up(manager)
+    clear_commands(fleet)
+    fleet.cameras["cam1"].livestream_status = 0  # Lost its livestream configuration
+    fleet.cameras["cam2"].reboot()
+
+    await bring_up(manager)
+
+    assert fleet.cameras["cam0"].commands == ['register_livestream_status']
+    assert fleet.cameras["cam1"].commands == ['register_livestream_status', 'set_shutter', 'set_livestream_mode', 'set_shutter']
+    assert 'connect_to_access_point' in fleet.cameras["cam2"].commands
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_reconcile_reconfigures_changed_settings(manager, fleet):
+    await bring_up(manager)
+    clear_commands(fleet)
+
+    await manager.setup_gopro("renamed", "cam0", "ssid", "password", "server", reconcile=True)
+    await bring_up(manager, ssid="other")
+
+    assert fleet.cameras["cam0"].livestream_url == "rtmp://server/live/stream0"
+    assert fleet.cameras["cam0"].commands.count('set_livestream_mode') == 2
+    assert all(gopro.connected_ssid == "other" for gopro in fleet.cameras.values())
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_ready_camera_only_needs_the_shutter(manager, fleet):
+    await manager.setup_gopro("stream0", "cam0", "ssid", "password", "server", arm=True)
+    clear_commands(fleet)
+
+    setup = await manager.setup_gopro("stream0", "cam0", "ssid", "password", "server", reconcile=True)
+
+    assert setup.state == SetupState.STREAMING
+    assert fleet.cameras["cam0"].commands == ['register_livestream_status', 'set_shutter']
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_starting_a_healthy_rig_again_leaves_the_compositor_alone(fleet, control_server):
+    relay = await StubRtmpServer({camera.name: 0.0 for camera in CAMERAS}).start()
+    manager = GoProManager(MagicMock(), control=ControlClient(port=control_server.port))
+    manager.pool.factory = fleet
+    controller = RelayController(MagicMock(), manager)
+    config = {'ssid': "ssid", 'password': "password", 'server_ip': "127.0.0.1", 'relays': [f"127.0.0.1:{relay.port}"],
+              'gopros': [{'name': camera.name, 'target': camera.target} for camera in CAMERAS]}
+
+    await controller.start(config)
+    await asyncio.sleep(0.8)
+    sent = list(control_server.requests)
+    assert sent[-1]['action'] == 'start' and len(sent[-1]) == 2 + len(CAMERAS)
+
+    report = await controller.start(config)
+    await asyncio.sleep(0.8)
+
+    # Reconciling streaming cameras neither drops them from the compositor nor verifies them again
+    assert sorted(report.streaming()) == [camera.target for camera in CAMERAS]
+    assert control_server.requests == sent
+    assert sorted(relay.plays) == [camera.name for camera in CAMERAS]
+    await controller.close()
+    await relay.close()
@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+import requests
+from unittest.mock import AsyncMock, MagicMock, patch
+from cli import main
+from control_api import ControlAPI
+from control_client import ControlClient
+from gopro_manager import GoProManager
+from relay_controller import RelayController
+from setup_state import CameraSetup, SetupState
+
+
+@pytest.fixture
+def config():
+    return {
+        'ssid': 'test_ssid', 'password': 'test_password', 'server_ip': '127.0.0.1', 'save_to_gopro': False, 'verify_ingest': False,
+        'gopros': [{'name': 'a', 'target': 'cam1'}, {'name': 'b', 'target': 'cam2'}],
+    }
+
+@pytest.fixture
+def controller(control_server):
+    manager = GoProManager(MagicMock(), control=ControlClient(port=control_server.port))
+    return RelayController(MagicMock(), manager)
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_start_and_stop_from_config(mock_wireless_gopro, controller, control_server, config):
+    async def setup_gopro(name, target, *args):
+        setup = CameraSetup(name, target, on_change=controller.manager._on_state_change)
+        controller.manager.setups[target] = setup
+        setup.transition(SetupState.STREAMING)
+        return setup
+    controller.manager.setup_gopro = AsyncMock(side_effect=setup_gopro)
+    controller.manager.stop_live_stream = AsyncMock()
+
+    await controller.start(config)
+    await controller.stop()
+
+    assert [c.args[:2] for c in controller.manager.setup_gopro.call_args_list] == [('a', 'cam1'), ('b', 'cam2')]
+    assert [c.args for c in controller.manager.stop_live_stream.call_args_list] == [('cam1',), ('cam2',)]
+    assert control_server.requests == [
+        {'action': 'start', 'input0': 'rtmp://127.0.0.1/live/a', 'input1': 'rtmp://127.0.0.1/live/b', 'output': 'rtmp://127.0.0.1/live/output'},
+        {'action': 'stop'},
+    ]
+    await controller.close()
+
+@pytest.mark.asyncio
+async def test_control_api_reports_status_and_runs_operations(controller, config):
+    controller.config = config
+    controller.start = AsyncMock()
+    api = ControlAPI(controller, config, port=0)
+    await api.start()
+    base = f"http://127.0.0.1:{api.port}"
+
+    status = await asyncio.to_thread(requests.get, base + "/status")
+    started = await asyncio.to_thread(requests.post, base + "/start")
+    missing = await asyncio.to_thread(requests.get, base + "/nope")
+    await api.operation
+
+    assert status.status_code == 200
+    assert [camera['state'] for camera in status.json()['cameras']] == ['idle', 'idle']
+    assert started.status_code == 202
+    controller.start.assert_called_once_with(config)
+    assert missing.status_code == 404
+    await api.close()
+    await controller.close()
+
+@pytest.mark.asyncio
+async def test_control_api_stop_supersedes_start_and_restarts_one_camera(controller, config):
+    async def start(config):
+        await asyncio.sleep(10)
+    controller.config = config
+    controller.start = AsyncMock(side_effect=start)
+    controller.stop = AsyncMock()
+    controller.restart_camera = AsyncMock()
+    api = ControlAPI(controller, config, port=0)
+    await api.start()
+    base = f"http://127.0.0.1:{api.port}"
+
+    await asyncio.to_thread(requests.post, base + "/start")
+    start = api.operation
+    stopped = await asyncio.to_thread(requests.post, base + "/stop")
+    await api.operation
+    restarted = await asyncio.to_thread(requests.post, base + "/restart/cam1")
+    await api.operation
+    unknown = await asyncio.to_thread(requests.post, base + "/restart/cam9")
+    cancelled = await asyncio.to_thread(requests.post, base + "/cancel")
+
+    assert start.cancelled() and stopped.status_code == 202
+    controller.stop.assert_called_once_with(config)
+    assert restarted.status_code == 202
+    controller.restart_camera.assert_called_once_with('cam1')
+    assert unknown.status_code == 404
+    assert cancelled.json() == {'cancelled': 0}
+    await api.close()
+    await controller.close()
+
+def test_cli_requires_config_without_api():
+    with pytest.raises(SystemExit):
+        main(['start'])
@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from control_client import ControlClient
+from gopro_manager import GoProManager
+from relay_controller import RelayController
+from relay_pool import Relay, RelayPool, rtmp_probe
+from setup_state import CameraSetup, SetupState
+from stub_server import StubControlServer
+
+
+def make_pool(*relays, down=(), control=None):
+    async def probe(address, timeout):
+        if address in down:
+            raise OSError("Connection refused")
+    return RelayPool(MagicMock(), list(relays), control, probe)
+
+@pytest.mark.asyncio
+async def test_probe_accepts_bracketed_ipv6_addresses():
+    try:
+        server = await asyncio.start_server(lambda reader, writer: writer.close(), '::1', 0)
+    except OSError:
+        pytest.skip("no IPv6 loopback")
+    port = server.sockets[0].getsockname()[1]
+
+    await rtmp_probe(f"[::1]:{port}", timeout=1.0)
+    with pytest.raises(OSError, match="invalid address"):
+        await rtmp_probe("relay:rtmp", timeout=1.0)
+    server.close()
+    await server.wait_closed()
+
+def test_streams_fill_relays_by_capacity_and_stay_placed():
+    pool = make_pool(Relay("a", capacity=2), Relay("b", capacity=4))
+
+    placement = pool.place([f"s{i}" for i in range(6)])
+    assert sorted(placement.values()) == ["a", "a", "b", "b", "b", "b"]
+
+    assert pool.place([f"s{i}" for i in range(6)]) == placement
+
+    pool.release("s0")
+    assert pool.place(["s6"])["s6"] == placement["s0"]
+    assert [relay.used for relay in pool.relays] == [2, 4]
+    assert pool.input_url("s1") == f"rtmp://{placement['s1']}/live/s1"
+
+@pytest.mark.asyncio
+async def test_reported_load_and_unreachable_relays_are_avoided():
+    down = set()
+    with StubControlServer(body="3") as server:
+        pool = make_pool(Relay("127.0.0.1", capacity=4, report_load=True), Relay("b", capacity=4), Relay("c", capacity=4), down=down,
+                         control=ControlClient(port=server.port))
+        await pool.check()
+        placement = pool.place([f"s{i}" for i in range(7)])
+
+        assert server.requests == [{'action': 'load'}]
+        assert list(placement.values()).count("127.0.0.1") == 1
+
+        down.add("b")
+        lost = await pool.check()
+        moved = pool.place(lost)
+
+    assert sorted(lost) == sorted(name for name, address in placement.items() if address == "b")
+    assert all(moved[name] != "b" for name in moved)
+    assert pool.snapshot()[1] == {'address': 'b', 'capacity': 4, 'load': None, 'streams': [], 'reachable': False}
+
+@pytest.mark.asyncio
+async def test_controller_fails_streams_over_to_another_relay(control_server):
+    relays = [await asyncio.start_server(lambda reader, writer: writer.close(), "127.0.0.1", 0) for _ in range(2)]
+    addresses = [f"127.0.0.1:{relay.sockets[0].getsockname()[1]}" for relay in relays]
+    config = {
+        'ssid': 'ssid', 'password': 'password', 'server_ip': '127.0.0.1', 'save_to_gopro': False, 'verify_ingest': False,
+        'relays': [{'address': address, 'capacity': 2} for address in addresses],
+        'gopros': [{'name': 'a', 'target': 'cam1'}, {'name': 'b', 'target': 'cam2'}, {'name': 'c', 'target': 'cam3'}],
+    }
+    controller = RelayController(MagicMock(), GoProManager(MagicMock(), control=ControlClient(port=control_server.port)))
+    servers = {}
+
+    async def setup_gopro(name, target, ssid, password, server_address, *args):
+        servers[name] = server_address
+        setup = CameraSetup(name, target, on_change=controller.manager._on_state_change)
+        controller.manager.setups[target] = setup
+        setup.transition(SetupState.STREAMING)
+        return setup
+    controller.manager.setup_gopro = AsyncMock(side_effect=setup_gopro)
+    controller.monitor.start = MagicMock()
+
+    await controller.start(config)
+    first = dict(servers)
+    assert sorted(servers.values()) == sorted([addresses[0], addresses[0], addresses[1]])
+    assert control_server.requests[-1] == {'action': 'start', 'output': 'rtmp://127.0.0.1/live/output',
+                                           **{f'input{i}': f"rtmp://{servers[name]}/live/{name}" for i, name in enumerate("abc")}}
+
+    relays[0].close()
+    await relays[0].wait_closed()
+    moved = await controller.fail_over()
+
+    assert sorted(moved) == [name for name in "abc" if first[name] == addresses[0]]
+    assert set(servers.values()) == {addresses[1]}
+    assert control_server.requests[-1]['input0'] == f"rtmp://{addresses[1]}/live/a"
+    assert [relay['reachable'] for relay in controller.status()['relays']] == [False, True]
+    relays[1].close()
+    await controller.close()
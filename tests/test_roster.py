@@ -0,0 +1,69 @@
+import json
+import tkinter
+import pytest
+from roster import RosterTable, diff_roster, load_roster
+
+
+def test_load_roster_from_csv_keeps_extra_columns(tmp_path):
+    path = tmp_path / "cameras.csv"
+    path.write_text("name,target,priority\nfront, GoPro 0001 ,2\nback,GoPro 0002,\n")
+
+    assert load_roster(str(path)) == [
+        {'name': 'front', 'target': 'GoPro 0001', 'priority': 2},
+        {'name': 'back', 'target': 'GoPro 0002'},
+    ]
+
+def test_load_roster_from_json_list_or_config(tmp_path):
+    cameras = [{'name': 'front', 'target': 'GoPro 0001', 'bitrate': {'max': 4000}}]
+    (tmp_path / "list.json").write_text(json.dumps(cameras))
+    (tmp_path / "config.json").write_text(json.dumps({'ssid': 'x', 'gopros': cameras}))
+
+    assert load_roster(str(tmp_path / "list.json")) == cameras
+    assert load_roster(str(tmp_path / "config.json")) == cameras
+
+@pytest.mark.parametrize("file_name, rows, error", [
+    ("cameras.csv", "name,target\nfront,\n", "Camera 1 needs both a name and a target"),
+    ("cameras.csv", "name,target\nfront,GoPro 0001\nback,GoPro 0001\n", "Camera 2 repeats target GoPro 0001"),
+    ("cameras.json", '[{"name": "front", "target": "GoPro 0001"}, "GoPro 0002"]', "Camera 2 must be an object with a name and a target"),
+    ("cameras.json", '{"gopros": {"name": "front", "target": "GoPro 0001"}}', "Cameras must be a list, not dict"),
+    ("cameras.json", '"GoPro 0001"', "Cameras must be a list, not str"),
+])
+def test_load_roster_rejects_bad_rows(tmp_path, file_name, rows, error):
+    path = tmp_path / file_name
+    path.write_text(rows)
+
+    with pytest.raises(ValueError, match=error):
+        load_roster(str(path))
+
+def test_diff_roster_only_reports_rows_that_differ():
+    current = {f"cam{i}": {'name': f"s{i}", 'target': f"cam{i}"} for i in range(100)}
+    cameras = [dict(row) for row in current.values() if row['target'] != 'cam5'] + [{'name': 'new', 'target': 'cam100'}]
+    cameras[0]['name'] = 'renamed'
+
+    diff = diff_roster(current, cameras)
+
+    assert diff.added == [{'name': 'new', 'target': 'cam100'}]
+    assert diff.removed == ['cam5']
+    assert diff.changed == [{'name': 'renamed', 'target': 'cam0'}]
+    assert not diff_roster(current, list(current.values()))
+
+@pytest.fixture
+def root():
+    try:
+        root = tkinter.Tk()
+    except tkinter.TclError:
+        pytest.skip("no display")
+    yield root
+    root.destroy()
+
+def test_roster_table_applies_diffs(root):
+    table = RosterTable(root)
+    cameras = [{'name': f"s{i}", 'target': f"cam{i}"} for i in range(150)]
+    table.set_cameras(cameras)
+
+    diff = table.set_cameras(list(reversed(cameras[1:])))
+    table.update_status({'cam2': ('streaming', 'STREAMING, drops 0')})
+
+    assert diff.removed == ['cam0'] and not diff.added and not diff.changed
+    assert table.targets() == [f"cam{i}" for i in range(149, 0, -1)]
+    assert table.tree.set('cam2', 'state') == 'streaming'
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock
+from open_gopro import proto
+from control_client import ControlClient
+from gopro_manager import FleetCamera, FleetScheduler, GoProManager
+from relay_controller import RelayController
+from runtime import CommandQueue, RelayRuntime
+from setup_state import SetupState
+from simulated_gopro import SimulatedFleet, SimulationSettings
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+
+    def command(self, name, duration=0.0):
+        async def run():
+            self.events.append(f"{name} started")
+            try:
+                await asyncio.sleep(duration)
+            except asyncio.CancelledError:
+                self.events.append(f"{name} cancelled")
+                raise
+            self.events.append(f"{name} done")
+            return name
+        return run
+
+@pytest.mark.asyncio
+async def test_stop_supersedes_a_running_start_and_queued_duplicates():
+    recorder = Recorder()
+    queue = CommandQueue(MagicMock())
+
+    start = queue.submit('start', recorder.command('start', 10))
+    await asyncio.sleep(0.01)
+    again = queue.submit('start', recorder.command('start again', 10))
+    stop = queue.submit('stop', recorder.command('stop'))
+
+    assert await stop == 'stop'
+    assert start.cancelled() and again.cancelled()
+    assert recorder.events == ['start started', 'start cancelled', 'stop started', 'stop done']
+    assert not queue.busy
+    await queue.close()
+
+@pytest.mark.asyncio
+async def test_camera_commands_and_live_wait_their_turn():
+    recorder = Recorder()
+    queue = CommandQueue(MagicMock())
+
+    arm = queue.submit('arm', recorder.command('arm', 0.05))
+    live = queue.submit('live', recorder.command('live'), supersede=False)
+    first = queue.submit('restart cam1', recorder.command('restart cam1', 10), scope='cam1')
+    second = queue.submit('restart cam1', recorder.command('restart cam1 again'), scope='cam1')
+    other = queue.submit('restart cam2', recorder.command('restart cam2'), scope='cam2')
+
+    assert await asyncio.gather(arm, live, second, other) == ['arm', 'live', 'restart cam1 again', 'restart cam2']
+    assert first.cancelled()
+    assert recorder.events == ['arm started', 'arm done', 'live started', 'live done', 'restart cam1 again started',
+                               'restart cam1 again done', 'restart cam2 started', 'restart cam2 done']
+    await queue.close()
+
+def test_runtime_runs_commands_on_one_long_lived_thread():
+    runtime = RelayRuntime(MagicMock())
+    threads = []
+
+    async def record():
+        threads.append(threading.current_thread())
+        return asyncio.get_running_loop()
+
+    loops = [runtime.submit(f'command {i}', record).result(timeout=1) for i in range(3)]
+    runtime.shutdown(record)
+    runtime._thread.join(timeout=1)
+
+    assert len(set(loops)) == 1 and len(set(threads)) == 1 and threads[0].name == "gopro-loop"
+    assert len(threads) == 4 and not runtime._thread.is_alive()
+
+@pytest.mark.asyncio
+async def test_cancelled_setup_fails_cameras_and_keeps_connections():
+    fleet = SimulatedFleet(SimulationSettings().scaled(0.02), seed=2)
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = fleet
+    queue = CommandQueue(MagicMock())
+    cameras = [FleetCamera(f"stream{i}", f"cam{i}") for i in range(3)]
+
+    start = queue.submit('start', lambda: FleetScheduler(manager).bring_up(cameras, "ssid", "password", "server"))
+    await asyncio.sleep(0.15)
+    stop = queue.submit('stop', lambda: asyncio.gather(*(manager.stop_live_stream(camera.target) for camera in cameras)))
+    await stop
+
+    assert start.cancelled()
+    assert manager.metrics.snapshot()['counters']['setups']['cam0'] == {'cancelled': 1}
+    assert all(manager.get_state(camera.target) == SetupState.IDLE for camera in cameras)
+    assert not any(gopro.streaming for gopro in fleet.cameras.values())
+    await queue.close()
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_stop_cancels_a_rearm_in_flight(control_server):
+    fleet = SimulatedFleet(SimulationSettings().scaled(0.002), seed=3)
+    manager = GoProManager(MagicMock(), control=ControlClient(port=control_server.port))
+    manager.pool.factory = fleet
+    controller = RelayController(MagicMock(), manager)
+    config = {'ssid': "ssid", 'password': "password", 'server_ip': "127.0.0.1", 'verify_ingest': False,
+              'gopros': [{'name': "a", 'target': "cam1"}]}
+    await controller.start(config)
+    await asyncio.sleep(0.01)
+
+    # The feed drops and the re-arm is still joining the access point when Stop is pressed
+    gopro = fleet.cameras["cam1"]
+    gopro.settings = gopro.settings._replace(ap_join_time=10.0)
+    await gopro.notify(proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_FAILED_STAY_ON)
+    await asyncio.sleep(0.05)
+    assert manager.get_state("cam1") == SetupState.JOINING_AP
+    await controller.stop()
+
+    assert manager.metrics.snapshot()['counters']['setups']['cam1'] == {'streaming': 1, 'cancelled': 1}
+    assert manager.get_state("cam1") == SetupState.IDLE and not gopro.streaming
+    assert not controller.monitor.snapshot()[0].rearming
+    await controller.close()
@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from session_pool import GoProSessionPool
+
+
+def make_gopro(connected=True):
+    gopro_obj = AsyncMock()
+    gopro_obj.is_ble_connected = connected
+    return gopro_obj
+
+@pytest.fixture
+def log_callback():
+    return MagicMock()
+
+@pytest.mark.asyncio
+async def test_acquire_reuses_live_session(log_callback):
+    factory = MagicMock(side_effect=lambda target: make_gopro())
+    pool = GoProSessionPool(factory, log_callback)
+
+    first = await pool.acquire("cam1")
+    second = await pool.acquire("cam1")
+
+    assert first is second
+    factory.assert_called_once_with("cam1")
+    first.open.assert_called_once_with(retries=5)
+    await pool.close_all()
+    first.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_acquire_reconnects_dead_session(log_callback):
+    factory = MagicMock(side_effect=lambda target: make_gopro())
+    pool = GoProSessionPool(factory, log_callback)
+
+    first = await pool.acquire("cam1")
+    first.is_ble_connected = False
+    second = await pool.acquire("cam1")
+
+    assert first is not second
+    first.close.assert_called_once()
+    log_callback.assert_any_call("cam1: Connection lost, reconnecting...")
+    await pool.close_all()
+
+@pytest.mark.asyncio
+async def test_evict_idle_closes_unused_sessions(log_callback):
+    factory = MagicMock(side_effect=lambda target: make_gopro())
+    pool = GoProSessionPool(factory, log_callback, idle_timeout=0)
+
+    gopro_obj = await pool.acquire("cam1")
+    async with pool.session("cam2"):
+        await pool.evict_idle()
+        assert "cam2" in pool
+
+    assert "cam1" not in pool
+    gopro_obj.close.assert_called_once()
+    await pool.close_all()
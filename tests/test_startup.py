@@ -0,0 +1,25 @@
+import subprocess
+import sys
+import pytest
+from benchmark_startup import ROOT, parse_importtime
+
+CAMERA_STACK = ('open_gopro', 'bleak', 'relay_controller')
+
+
+@pytest.mark.parametrize("module", ["gui", "cli"])
+def test_entry_points_do_not_import_the_camera_stack(module):
+    code = f"import sys, {module}; print(' '.join(name for name in {CAMERA_STACK!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+def test_parse_importtime_attributes_direct_imports():
+    output = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       100 |        100 |     proto",
+        "import time:       200 |        300 |   open_gopro",
+        "import time:        50 |         50 |   json",
+        "import time:       400 |        750 | gui",
+    ])
+
+    assert parse_importtime(output) == {'gui': {'open_gopro': 0.0003, 'json': 0.00005, 'gui': 0.00075}}
@@ -0,0 +1,169 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from open_gopro import constants, proto
+from open_gopro.proto.live_streaming_pb2 import EnumLiveStreamError
+from gopro_manager import GoProManager
+from setup_state import CameraSetup, SetupState
+from simulated_gopro import SimulatedFleet, SimulationSettings
+from stream_monitor import CameraHealth, StreamMonitor
+
+
+def notify(gopro_obj, **fields):
+    """Deliver a livestream status notification to every callback registered for it."""
+    update = proto.NotifyLiveStreamStatus(**fields)
+    callbacks = [callback for callback, kind in gopro_obj.listeners if kind == constants.ActionId.LIVESTREAM_STATUS_NOTIF]
+    return asyncio.gather(*(callback(None, update) for callback in callbacks))
+
+@pytest.fixture
+def gopro_obj():
+    gopro_obj = AsyncMock()
+    gopro_obj.is_ble_connected = True
+    gopro_obj.listeners = []
+    gopro_obj.register_update = MagicMock(side_effect=lambda callback, kind: gopro_obj.listeners.append((callback, kind)))
+
+    def unregister_update(callback, kind=None):
+        gopro_obj.listeners[:] = [entry for entry in gopro_obj.listeners if entry[0] is not callback or kind not in (None, entry[1])]
+    gopro_obj.unregister_update = MagicMock(side_effect=unregister_update)
+    return gopro_obj
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_monitor_rearms_failed_feed(mock_wireless_gopro, gopro_obj):
+    mock_wireless_gopro.return_value = gopro_obj
+    manager = GoProManager(MagicMock())
+
+    async def rearm(name, target):
+        setup = CameraSetup(name, target, on_change=manager._on_state_change)
+        manager.setups[target] = setup
+        setup.transition(SetupState.STREAMING)
+        return setup
+
+    monitor = StreamMonitor(manager, rearm, check_interval=60)
+    monitor.start()
+    await rearm("stream", "cam1")
+    await asyncio.sleep(0.01)
+
+    await notify(gopro_obj, live_stream_status=proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_STREAMING, live_stream_bitrate=4200)
+    health = monitor.snapshot()[0]
+    assert health.streaming and health.bitrate == 4200
+
+    await notify(gopro_obj, live_stream_status=proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_FAILED_STAY_ON,
+                 live_stream_error=EnumLiveStreamError.LIVE_STREAM_ERROR_NETWORK)
+    await asyncio.sleep(0.01)
+
+    assert not health.rearming
+    assert health.drops == 1
+    assert len(health.recovery_times) == 1
+    assert monitor.mean_time_to_recover() is not None
+    assert health.samples[-1].error == EnumLiveStreamError.LIVE_STREAM_ERROR_NETWORK
+    assert health.describe().startswith("stream (cam1): STREAMING")
+    await monitor.close()
+    await manager.close()
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_monitor_ignores_stopped_cameras_and_waits_for_reconnect(mock_wireless_gopro, gopro_obj):
+    mock_wireless_gopro.return_value = gopro_obj
+    manager = GoProManager(MagicMock())
+    rearm = AsyncMock()
+    monitor = StreamMonitor(manager, rearm, check_interval=60, reconnect_grace=0)
+    monitor.start()
+    setup = CameraSetup("stream", "cam1", on_change=manager._on_state_change)
+    manager.setups["cam1"] = setup
+    setup.transition(SetupState.STREAMING)
+    await asyncio.sleep(0.01)
+
+    await notify(gopro_obj, live_stream_status=proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_RECONNECTING)
+    rearm.assert_not_called()
+    monitor.check()
+    await asyncio.sleep(0.01)
+    rearm.assert_called_once_with("stream", "cam1")
+
+    rearm.reset_mock()
+    await manager.stop_live_stream("cam1")
+    await notify(gopro_obj, live_stream_status=proto.EnumLiveStreamStatus.LIVE_STREAM_STATE_COMPLETE_STAY_ON)
+    rearm.assert_not_called()
+    # Only the monitor's own registrations are removed
+    assert [call.args[1] for call in gopro_obj.unregister_update.call_args_list] == [
+        constants.ActionId.LIVESTREAM_STATUS_NOTIF, constants.StatusId.OVERHEATING]
+    await monitor.close()
+    await manager.close()
+
+@patch('gopro_manager.WirelessGoPro')
+@pytest.mark.asyncio
+async def test_rearm_logs_recovery_when_the_drop_was_already_cleared(mock_wireless_gopro, gopro_obj):
+    mock_wireless_gopro.return_value = gopro_obj
+    manager = GoProManager(MagicMock())
+
+    async def rearm(name, target):
+        # A STREAMING update arriving during the re-arm already marks the feed recovered
+        monitor.health[target].dropped_at = None
+        setup = CameraSetup(name, target)
+        setup.state = SetupState.STREAMING
+        return setup
+
+    monitor = StreamMonitor(manager, rearm, check_interval=60)
+    await manager.pool.acquire("cam1")
+    monitor.health["cam1"] = health = CameraHealth("stream", "cam1")
+    monitor._trigger_rearm(health, "connection lost")
+    await asyncio.sleep(0.01)
+
+    assert health.recovery_times == [] and not health.rearming
+    assert any(call.args[0].startswith("cam1: Feed recovered in") for call in manager.log.call_args_list)
+    await monitor.close()
+    await manager.close()
+
+def test_camera_health_keeps_bounded_history():
+    health = CameraHealth("stream", "cam1", history=3)
+
+    for bitrate in range(5):
+        health.record(proto.NotifyLiveStreamStatus(live_stream_bitrate=bitrate))
+
+    assert [sample.bitrate for sample in health.samples] == [2, 3, 4]
+
+@pytest.mark.asyncio
+async def test_monitor_keeps_streaming_cameras_connected_past_idle_timeout():
+    fleet = SimulatedFleet(SimulationSettings().scaled(0.002), seed=2)
+    manager = GoProManager(MagicMock(), idle_timeout=0.05)
+    manager.pool.factory = fleet
+    rearm = AsyncMock()
+    monitor = StreamMonitor(manager, rearm, check_interval=60)
+    monitor.start()
+    await manager.setup_gopro("stream", "cam1", "ssid", "password", "server")
+    await asyncio.sleep(0.1)
+
+    await manager.pool.evict_idle()
+    monitor.check()
+    await asyncio.sleep(0.01)
+
+    assert "cam1" in manager.pool
+    rearm.assert_not_called()
+    # Once stopped the camera is no longer held and its idle connection is closed
+    await manager.stop_live_stream("cam1")
+    await asyncio.sleep(0.1)
+    await manager.pool.evict_idle()
+    assert "cam1" not in manager.pool
+    await monitor.close()
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_watching_again_does_not_stack_registrations():
+    fleet = SimulatedFleet(SimulationSettings().scaled(0.002), seed=3)
+    manager = GoProManager(MagicMock())
+    manager.pool.factory = fleet
+    monitor = StreamMonitor(manager, AsyncMock(), check_interval=60)
+    await manager.setup_gopro("stream", "cam1", "ssid", "password", "server")
+    gopro = manager.pool.get("cam1").gopro
+
+    await monitor.watch("stream", "cam1")
+    await monitor.unwatch("cam1")
+    assert gopro.ble_status.overheating.callbacks == []
+    assert gopro._listeners[constants.ActionId.LIVESTREAM_STATUS_NOTIF] == []
+
+    await monitor.watch("stream", "cam1")
+    assert len(gopro.ble_status.overheating.callbacks) == 1
+    assert len(gopro._listeners[constants.ActionId.LIVESTREAM_STATUS_NOTIF]) == 1
+    await monitor.close()
+    assert gopro.ble_status.overheating.callbacks == []
+    await manager.close()